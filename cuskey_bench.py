@@ -0,0 +1,275 @@
+"""
+基本部品のマイクロベンチマーク
+メインループ（cuskey_runtime.AppHost.loop）と各アプリが 1 回のループで使う部品を 1 つずつ繰り返し呼び、
+1 秒あたりの回数・1 回あたりの時間・1 回あたりに確保するメモリを測る
+    pin: ボタンのピン値の読み取り（DigitalInOut.value）
+    debounce: チャタリング除去（cuskey_input.Debouncer.update）
+    gesture: 押し方の判定（cuskey_input.SequenceGesture、押す・離す・確定で 1 回）
+    dispatch: ボタン操作のアプリへの振り分け（AppHost.foreground・on_press・on_hold・on_release・tick_all）
+    report: キーボードのレポート送信（cuskey_hid.HidOutput。空のレポートなのでホストには何も入力されない）
+    trace: 入力トレースのリングバッファへの記録（cuskey_trace.TraceRecorder.sample）
+
+実機: tools/bench_code.py を CIRCUITPY の code.py としてコピーすると、結果をシリアルに表示する
+PC: tools/micro_bench.py（シミュレーターの仮想ピン・仮想 USB で実行し、前回の結果と比べる）
+
+1 回あたりの時間は空の関数を呼ぶループの時間を差し引いたもの。差し引いた値が計測の分解能（時刻の刻みを
+呼び出し回数で割った値・空のループの時間のばらつき・空のループの時間の NOISE_RATIO 倍のうち最大）より
+小さい部品は「< 分解能」と表示し、回数/秒は出さない（差し引く前の時間は「計測値」の列に出す）
+確保するメモリは、実機では GC を止めて gc.mem_alloc の増加を、CPython では tracemalloc で
+1 回の呼び出し中に確保した量の最大を数える（どちらも測れない環境では None）
+"""
+
+import gc
+
+import cuskey_hid
+import cuskey_input
+import cuskey_clock
+import cuskey_runtime
+import cuskey_trace
+
+# 計測する部品（表示順）
+NAMES = ("pin", "debounce", "gesture", "dispatch", "report", "trace")
+
+# 確保するメモリを数える呼び出し回数（実機では GC を止めるので、ヒープが足りる程度にする）
+ALLOC_CALLS = 100
+
+# 空のループの時間を測る回数（ばらつきを分解能に含める）
+OVERHEAD_RUNS = 3
+
+# 計測ごとの空のループの時間の揺れ（キャッシュ・割り込みなど）の見込み（空のループの時間に対する割合）
+NOISE_RATIO = 0.25
+
+
+def _empty():
+    pass
+
+
+class _BenchApp(cuskey_runtime.App):
+    """ボタン操作を数えるだけのアプリ（振り分けの計測用）"""
+
+    TITLE = "ベンチマーク"
+
+    def __init__(self, ctx):
+        super().__init__(ctx)
+        self.calls = 0
+
+    def on_press(self, now):
+        self.calls += 1
+
+    def on_hold(self, now):
+        self.calls += 1
+
+    def on_release(self, now):
+        self.calls += 1
+
+
+#
+# 計測する部品（1 回分の操作をする関数を返す）
+#
+def _pin(ctx):
+    button = ctx.hw.button
+
+    def run():
+        return button.value
+    return run
+
+
+def _debounce(ctx):
+    debouncer = cuskey_input.Debouncer(0.005)
+    state = [0.0, True]
+
+    def run():
+        # 安定時間ごとにピン値が変わる（毎回状態が確定する）
+        state[0] += 0.005
+        state[1] = not state[1]
+        return debouncer.update(state[1], state[0])
+    return run
+
+
+def _gesture(ctx):
+    actions = []
+    gesture = cuskey_input.SequenceGesture(0.05, 0.3, 0.3, lambda action, now: actions.append(action))
+    root = cuskey_input.compile_gestures({"S": "single", "SS": "double", "L": "hold"})
+    state = [0.0]
+
+    def run():
+        # シングルクリック: 押して 0.1 秒で離し、ダブルクリックの待ち時間を過ぎて確定
+        now = state[0]
+        gesture.press(now, root)
+        gesture.hold(now + 0.05)
+        gesture.release(now + 0.1)
+        gesture.poll(now + 0.5)
+        state[0] = now + 1.0
+        if actions:
+            actions.pop()
+    return run
+
+
+def _dispatch(ctx):
+    host = cuskey_runtime.AppHost(ctx)
+    host.add(_BenchApp(ctx))
+    host.add(_BenchApp(ctx))
+    state = [0.0]
+
+    def run():
+        now = state[0]
+        app = host.foreground()
+        app.on_press(now)
+        app.on_hold(now)
+        app.on_release(now)
+        host.tick_all(now)
+        state[0] = now + 0.01
+    return run
+
+
+def _report(ctx):
+    if not cuskey_hid.usb_connected():
+        return None
+    keyboard = cuskey_hid.HidOutput(frame_interval=0.0).keyboard
+
+    def run():
+        # キーを指定しない release は押しているキーのないレポートを送る（Keyboard の生成は初回の呼び出し）
+        keyboard.release()
+    return run
+
+
+def _trace(ctx):
+    recorder = cuskey_trace.TraceRecorder(256)
+    state = [True]
+
+    def run():
+        # 毎回ピン値が変わる（毎回記録する）
+        state[0] = not state[0]
+        recorder.sample(state[0], False)
+    return run
+
+
+CASES = {
+    "pin": _pin,
+    "debounce": _debounce,
+    "gesture": _gesture,
+    "dispatch": _dispatch,
+    "report": _report,
+    "trace": _trace,
+}
+
+
+#
+# 計測
+#
+def _elapsed_ns(func, count):
+    gc.collect()
+    start = cuskey_clock.now_ns()
+    for _ in range(count):
+        func()
+    return cuskey_clock.now_ns() - start
+
+
+def _timer_tick_ns():
+    """now_ns の刻み（値が変わるまで読み続けたときの増分の最小）"""
+    best = None
+    for _ in range(5):
+        start = now = cuskey_clock.now_ns()
+        while now == start:
+            now = cuskey_clock.now_ns()
+        if best is None or now - start < best:
+            best = now - start
+    return best
+
+
+def overhead(count):
+    """空の関数を count 回呼ぶループの 1 回あたりの時間と、計測の分解能を返す（どちらも ns）"""
+    samples = [_elapsed_ns(_empty, count) / count for _ in range(OVERHEAD_RUNS)]
+    base = min(samples)
+    return base, max(_timer_tick_ns() / count, max(samples) - base, base * NOISE_RATIO)
+
+
+def _traced(func, count):
+    """CPython: tracemalloc で 1 回の呼び出し中に確保した量の最大を数え、1 回あたりの平均を返す"""
+    try:
+        import tracemalloc
+    except ImportError:
+        return None
+    tracemalloc.start()
+    total = 0
+    try:
+        for _ in range(count):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            func()
+            total += tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+    return total / count
+
+
+def _allocated(func, count):
+    """1 回の呼び出しで確保するメモリ（bytes、測れない環境では None）"""
+    try:
+        mem_alloc = gc.mem_alloc
+    except AttributeError:
+        return _traced(func, count)
+    gc.collect()
+    gc.disable()
+    try:
+        before = mem_alloc()
+        for _ in range(count):
+            func()
+        after = mem_alloc()
+    finally:
+        gc.enable()
+    return (after - before) / count
+
+
+def measure(func, count, overhead_ns=0, resolution_ns=0):
+    """func を count 回呼び、(回数/秒, 1 回の時間 ns, 1 回に確保するバイト数, 計測値 ns, 分解能 ns) を返す
+
+    1 回の時間は計測値から overhead_ns を差し引いたもの。分解能より小さいときは回数/秒を None にする
+    """
+    # 初回の呼び出し（遅延初期化など）は計測から外す
+    func()
+    raw = _elapsed_ns(func, count) / count
+    per_call = raw - overhead_ns
+    allocated = _allocated(func, ALLOC_CALLS)
+    baseline = _allocated(_empty, ALLOC_CALLS)
+    if allocated is not None and baseline is not None:
+        allocated = max(allocated - baseline, 0.0)
+    rate = 1000000000 / per_call if per_call >= resolution_ns and per_call > 0 else None
+    return rate, per_call, allocated, raw, resolution_ns
+
+
+def run(ctx, count=1000, names=NAMES):
+    """部品ごとに計測し、{名前: measure の結果} を返す（計測できない部品は None）"""
+    overhead_ns, resolution_ns = overhead(count)
+    results = {}
+    for name in names:
+        func = CASES[name](ctx)
+        results[name] = None if func is None else measure(func, count, overhead_ns, resolution_ns)
+    return results
+
+
+def report(results, write=print):
+    """計測結果を表で表示（計測値は空のループの時間を差し引く前の 1 回の時間）"""
+    write(f"{'部品':<10} {'回数/秒':>12} {'1 回(us)':>10} {'計測値(us)':>10} {'確保(bytes/回)':>15}")
+    for name, result in results.items():
+        if result is None:
+            write(f"{name:<10} {'-':>12} {'-':>10} {'-':>10} {'-':>15}（USB 未接続などで計測できません）")
+            continue
+        rate, per_call, allocated, raw, resolution = result
+        allocated = "-" if allocated is None else f"{allocated:.1f}"
+        if rate is None:
+            rate = "-"
+            per_call = f"< {resolution / 1000:.3f}"
+        else:
+            rate = f"{rate:.0f}"
+            per_call = f"{per_call / 1000:.2f}"
+        write(f"{name:<10} {rate:>12} {per_call:>10} {raw / 1000:10.2f} {allocated:>15}")
+
+
+def main(count=1000):
+    """実機用: ピン・HID 出力を初期化して全部品を計測し、結果をシリアルに表示"""
+    ctx = cuskey_runtime.Context()
+    gc.collect()
+    free = gc.mem_free() if hasattr(gc, "mem_free") else None
+    print(f"=== {ctx.board_name} マイクロベンチマーク（{count} 回、空きメモリ: {free} bytes）===")
+    report(run(ctx, count))
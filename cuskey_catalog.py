@@ -0,0 +1,53 @@
+"""
+メッセージカタログ
+tools/strip_messages.py で文字列を取り除いたビルドでは、print("...") が say(番号, 値...) に置き換わる。
+メッセージの本文は CIRCUITPY のカタログファイルに置き、表示するときだけファイルから 1 件読み出す
+（本文がバイトコード・RAM に載らない）。カタログがなければ "#番号<TAB>値..." と表示し、
+PC で本文に戻す（python tools/strip_messages.py --decode build/catalog.json < serial.log）
+
+カタログの形式（数値はリトルエンディアン）:
+    0  マジック "CM"（2 バイト）
+    2  メッセージ数 N（2 バイト）
+    4  索引: N + 1 個の本文の位置（先頭からのオフセット、各 4 バイト。最後は終端）
+    本文: str.format の書式（"{}" に値が入る）の UTF-8
+"""
+
+MAGIC = b"CM"
+HEADER_SIZE = 4
+
+# 索引を読むバッファ（本文の開始・終了位置）
+_index = bytearray(8)
+_missing = False
+
+
+def _read(number):
+    """カタログから number 番のメッセージの書式を読む（読めなければ None）"""
+    global _missing
+    import cuskey_settings
+    path = getattr(cuskey_settings, "MESSAGE_CATALOG", None)
+    if path is None or _missing:
+        return None
+    try:
+        with open(path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+            if header[:2] != MAGIC or number >= header[2] | (header[3] << 8):
+                return None
+            f.seek(HEADER_SIZE + 4 * number)
+            f.readinto(_index)
+            start = int.from_bytes(_index[:4], "little")
+            end = int.from_bytes(_index[4:], "little")
+            f.seek(start)
+            return f.read(end - start).decode()
+    except OSError:
+        # ファイルがなければ以後は開かない（番号で表示）
+        _missing = True
+        return None
+
+
+def say(number, *values, **kwargs):
+    """number 番のメッセージを values で埋めて表示（print の代わり、kwargs は print にそのまま渡す）"""
+    text = _read(number)
+    if text is None:
+        print(f"#{number}", *values, sep="\t", **kwargs)
+    else:
+        print(text.format(*values), **kwargs)
@@ -0,0 +1,15 @@
+"""
+時刻の計測
+所要時間・遅延の計測に使うナノ秒単位の時刻
+省電力ガバナー（cuskey_power）などの機能を読み込まなくても使えるよう、単独の小さなモジュールにしている
+"""
+
+import time
+
+
+def now_ns():
+    """ナノ秒単位の単調増加時刻を返す（monotonic_ns が無い環境では monotonic から換算）"""
+    try:
+        return time.monotonic_ns()
+    except AttributeError:
+        return int(time.monotonic() * 1000000000)
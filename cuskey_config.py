@@ -0,0 +1,202 @@
+"""
+配布設定（microcontroller.nvm）
+PC の tools/cuskey_deploy.py が設定ファイルから作ったバイナリ（アプリの定数・名前付きマクロ）を
+データチャンネル（cuskey_link）経由で NVM に書き込み、起動時にアプリの定数へ反映する
+（優先順位は APP_SETTINGS < 配布設定 < 調整値ファイル）
+
+バイナリの形式（数値はリトルエンディアン、ヘッダーは cuskey_preset と同じ並び）:
+    0  マジック "CC"（2 バイト）
+    2  形式のバージョン（1 バイト）
+    3  レコード数（1 バイト）
+    4  全体の長さ（2 バイト）
+    6  8 バイト目以降の CRC-16/CCITT（2 バイト）
+    8  レコード: 種類(1) に続けて
+         CONSTANT: アプリ名, 定数名（それぞれ 1 バイトの長さ + 本体）, 値（encode_value）
+         MACRO: マクロ名（1 バイトの長さ + 本体）, 長さ(2), 手順（cuskey_link の MACRO と同じ形式）
+
+値の形式: 型(1) + 本体
+    b: 真偽値(1)  i: 整数(符号付き 4)  f: 実数(float32)  s: 文字列(長さ 1 + UTF-8)
+    n: None  l: タプル(個数 1 + 値...)  d: 辞書(個数 1 + (キーの値, 値)...)
+"""
+
+import struct
+
+from cuskey_preset import crc16
+
+MAGIC = b"CC"
+VERSION = 1
+HEADER_SIZE = 8
+
+# レコードの種類
+CONSTANT = 0
+MACRO = 1
+
+
+def _field(data):
+    return bytes((len(data),)) + data
+
+
+def encode_value(value):
+    """定数の値を 型(1) + 本体 にする"""
+    if value is None:
+        return b"n"
+    if isinstance(value, bool):
+        return b"b" + bytes((1 if value else 0,))
+    if isinstance(value, int):
+        return b"i" + struct.pack("<i", value)
+    if isinstance(value, float):
+        return b"f" + struct.pack("<f", value)
+    if isinstance(value, (list, tuple)):
+        return b"l" + bytes((len(value),)) + b"".join(encode_value(item) for item in value)
+    if isinstance(value, dict):
+        return b"d" + bytes((len(value),)) + b"".join(encode_value(key) + encode_value(item)
+                                                      for key, item in value.items())
+    return b"s" + _field(str(value).encode())
+
+
+def decode_field(data, position):
+    """長さ(1) + UTF-8 の文字列を読む（文字列, 次の位置）"""
+    size = data[position]
+    end = position + 1 + size
+    if end > len(data):
+        raise ValueError("データが短すぎます")
+    return bytes(data[position + 1:end]).decode(), end
+
+
+def decode_value(data, position):
+    """encode_value の逆（値, 次の位置）"""
+    kind = data[position]
+    position += 1
+    if kind == 0x6E:  # n
+        return None, position
+    if kind == 0x62:  # b
+        return bool(data[position]), position + 1
+    if kind == 0x69:  # i
+        return struct.unpack_from("<i", data, position)[0], position + 4
+    if kind == 0x66:  # f
+        # float32 の丸め誤差を小数 6 桁で落とす（0.35 が 0.3499999940395355 にならないように）
+        return round(struct.unpack_from("<f", data, position)[0], 6), position + 4
+    if kind == 0x73:  # s
+        return decode_field(data, position)
+    if kind == 0x6C:  # l
+        items = []
+        count = data[position]
+        position += 1
+        for _ in range(count):
+            item, position = decode_value(data, position)
+            items.append(item)
+        return tuple(items), position
+    if kind == 0x64:  # d
+        items = {}
+        count = data[position]
+        position += 1
+        for _ in range(count):
+            key, position = decode_value(data, position)
+            items[key], position = decode_value(data, position)
+        return items, position
+    raise ValueError("不明な値の型")
+
+
+def pack(constants, macros):
+    """[(アプリ名, 定数名, 値), ...] と [(マクロ名, 手順のバイト列), ...] をバイナリにする"""
+    records = []
+    for app, key, value in constants:
+        records.append(bytes((CONSTANT,)) + _field(app.encode()) + _field(key.encode()) + encode_value(value))
+    for name, steps in macros:
+        records.append(bytes((MACRO,)) + _field(name.encode()) + len(steps).to_bytes(2, "little") + steps)
+    body = b"".join(records)
+    length = HEADER_SIZE + len(body)
+    if len(records) > 255 or length > 0xFFFF:
+        raise ValueError("設定が多すぎます")
+    header = MAGIC + bytes((VERSION, len(records))) + length.to_bytes(2, "little") \
+        + crc16(body).to_bytes(2, "little")
+    return header + body
+
+
+class ConfigStore:
+    """NVM（または bytes）上の配布設定を読み出す
+
+    buffer: microcontroller.nvm など、offset から配布設定のバイナリが入っているバッファ
+    """
+
+    def __init__(self, buffer, offset=0):
+        self.buffer = buffer
+        self.offset = offset
+        self.reload()
+
+    def reload(self):
+        """バッファの内容を検査し直す（書き換えた後に呼ぶ）"""
+        self.count = self.buffer[self.offset + 3] if self.valid() else 0
+
+    def valid(self):
+        """マジック・バージョン・CRC が正しいか"""
+        buffer = self.buffer
+        offset = self.offset
+        if len(buffer) < offset + HEADER_SIZE or buffer[offset:offset + 2] != MAGIC \
+                or buffer[offset + 2] != VERSION:
+            return False
+        length = buffer[offset + 4] | (buffer[offset + 5] << 8)
+        if length < HEADER_SIZE or offset + length > len(buffer):
+            return False
+        return crc16(buffer[offset + HEADER_SIZE:offset + length]) \
+            == buffer[offset + 6] | (buffer[offset + 7] << 8)
+
+    def records(self):
+        """(種類, 名前 1, 名前 2 または None, 値または手順の memoryview) を順に返す"""
+        buffer = self.buffer
+        position = self.offset + HEADER_SIZE
+        for _ in range(self.count):
+            kind = buffer[position]
+            first, position = decode_field(buffer, position + 1)
+            if kind == CONSTANT:
+                second, position = decode_field(buffer, position)
+                value, position = decode_value(buffer, position)
+                yield kind, first, second, value
+            else:
+                size = buffer[position] | (buffer[position + 1] << 8)
+                position += 2
+                yield kind, first, None, memoryview(buffer)[position:position + size]
+                position += size
+
+    def constants(self, app):
+        """アプリ app の (定数名, 値) を順に返す"""
+        for kind, name, key, value in self.records():
+            if kind == CONSTANT and name == app:
+                yield key, value
+
+    def macro(self, name):
+        """名前付きマクロの手順（なければ None）"""
+        for kind, macro_name, _, steps in self.records():
+            if kind == MACRO and macro_name == name:
+                return steps
+        return None
+
+    def apply(self, app, module, exclude=()):
+        """アプリのモジュールに配布設定の定数を反映し、変わった定数名のリストを返す
+
+        exclude: 反映しない定数名（調整値ファイルで上書きしている定数）
+        """
+        changed = []
+        for key, value in self.constants(app):
+            if key in exclude:
+                continue
+            if not hasattr(module, key):
+                print(f"[WARN] 配布設定: {app} に {key} はありません")
+                continue
+            if getattr(module, key) != value:
+                setattr(module, key, value)
+                changed.append(key)
+        return changed
+
+
+def open_store(settings):
+    """NVM の配布設定を開く（NVM が使えない環境では空の設定）"""
+    try:
+        import microcontroller
+        nvm = microcontroller.nvm
+    except (ImportError, AttributeError):
+        nvm = None
+    offset = settings.NVM_CONFIG_OFFSET
+    if nvm is None or offset + settings.NVM_CONFIG_SIZE > len(nvm):
+        return ConfigStore(b"")
+    return ConfigStore(nvm, offset)
@@ -0,0 +1,268 @@
+"""
+USB HID 出力
+Keyboard / ConsumerControl / Mouse を最初に使われた時点で初期化し、
+レポート送信のたびに通知フックを呼び出す
+USB ホストとの接続（エニュメレーション）が完了する前の操作や、ホストのスリープなどで
+送信に失敗（OSError）した操作はキューにためておき、間隔を延ばしながら順番に再送する
+キューは上限付きで、マウス移動・ホイールや同じコンシューマーコード（音量など）の連続は 1 件にまとめる
+送信は USB のポーリング間隔（フレーム）に合わせ、デバイスごとに 1 フレーム 1 レポートまでに抑える
+"""
+
+import time
+import usb_hid
+
+try:
+    import supervisor
+except ImportError:
+    supervisor = None
+
+
+def usb_connected():
+    """USB ホストに接続済み（エニュメレーション完了）かを返す（判定できない環境では True）"""
+    if supervisor is None:
+        return True
+    return supervisor.runtime.usb_connected
+
+
+class _KeyboardOutput:
+    """adafruit_hid.keyboard.Keyboard の遅延初期化ラッパー"""
+
+    def __init__(self, output):
+        self._output = output
+        self._device = None
+        self._next_frame = 0.0  # 次のレポートを送れる時刻（フレーム単位のペース配分）
+
+    def _dev(self):
+        if self._device is None:
+            from adafruit_hid.keyboard import Keyboard
+            self._device = Keyboard(usb_hid.devices)
+        return self._device
+
+    def send(self, *keycodes):
+        # 押す・離すを別のレポートとして送る（同じフレームに 2 つ送ると send_report が前のレポートの受け取りを待って止まる）
+        self._output.submit(self, "press", keycodes)
+        self._output.submit(self, "release_all", ())
+
+    def press(self, *keycodes):
+        self._output.submit(self, "press", keycodes)
+
+    def release(self, *keycodes):
+        self._output.submit(self, "release", keycodes)
+
+    def release_all(self):
+        if self._device is not None or self._output.queue:
+            self._output.submit(self, "release_all", ())
+
+
+class _ConsumerControlOutput:
+    """adafruit_hid.consumer_control.ConsumerControl の遅延初期化ラッパー"""
+
+    def __init__(self, output):
+        self._output = output
+        self._device = None
+        self._next_frame = 0.0  # 次のレポートを送れる時刻（フレーム単位のペース配分）
+
+    def _dev(self):
+        if self._device is None:
+            from adafruit_hid.consumer_control import ConsumerControl
+            self._device = ConsumerControl(usb_hid.devices)
+        return self._device
+
+    def send(self, consumer_code):
+        self._output.submit(self, "send", (consumer_code,))
+
+    def release_all(self):
+        if self._device is not None or self._output.queue:
+            self._output.submit(self, "release", ())
+
+
+class _MouseOutput:
+    """adafruit_hid.mouse.Mouse の遅延初期化ラッパー"""
+
+    def __init__(self, output):
+        self._output = output
+        self._device = None
+        self._next_frame = 0.0  # 次のレポートを送れる時刻（フレーム単位のペース配分）
+
+    def _dev(self):
+        if self._device is None:
+            from adafruit_hid.mouse import Mouse
+            self._device = Mouse(usb_hid.devices)
+        return self._device
+
+    def move(self, x=0, y=0, wheel=0):
+        self._output.submit(self, "move", (x, y, wheel))
+
+    def release_all(self):
+        if self._device is not None or self._output.queue:
+            self._output.submit(self, "release_all", ())
+
+
+# 送信できなくても破棄しない操作（押しっぱなしを防ぐため、キーやボタンを離す操作は必ず送る）
+_RELEASE_METHODS = ("release", "release_all")
+
+
+def _report_count(method, args):
+    """操作 1 件で送られるレポート数（send は押下と解放の 2 回、move は ±127 ごとに分割）"""
+    if method == "send":
+        return 2
+    if method == "move":
+        largest = max(abs(args[0]), abs(args[1]), abs(args[2]))
+        return max(1, (largest + 126) // 127)
+    return 1
+
+
+class HidOutput:
+    """アプリから使う HID デバイス一式（on_report: レポート送信後に呼ぶ関数）
+
+    queue_size: キューに保持する操作の上限（超えた操作は破棄。離す操作は常に保持）
+    max_age: この秒数より古い操作は送信せずに破棄（離す操作を除く、None で無期限）
+    retry_delay / retry_max_delay: 送信失敗時の再送間隔（失敗が続くと倍々に延長）
+    frame_interval: USB のポーリング間隔（秒）。デバイスごとに 1 フレーム 1 レポートまで（0 で無効）
+    """
+
+    def __init__(self, on_report=None, queue_size=32, max_age=None, retry_delay=0.02, retry_max_delay=1.0,
+                 frame_interval=0.0):
+        self.on_report = on_report
+        self.frame_interval = frame_interval
+        self.keyboard = _KeyboardOutput(self)
+        self.consumer_control = _ConsumerControlOutput(self)
+        self.mouse = _MouseOutput(self)
+        self.queue_size = queue_size
+        self.max_age = max_age
+        self.retry_delay = retry_delay
+        self.retry_max_delay = retry_max_delay
+        # 送信待ちの操作 [[デバイス, メソッド名, 引数, 回数, 追加時刻], ...]（古い順）
+        self.queue = []
+        self.backoff = 0.0  # 現在の再送間隔（0 なら失敗していない）
+        self.retry_time = 0.0  # 次に再送を試みる時刻
+        self.first_report_time = None  # 最初にレポートを送信した時刻（time.monotonic）
+        # 統計
+        self.queued_total = 0  # キューに入れた操作の累計
+        self.merged = 0  # 前の操作にまとめた件数
+        self.dropped = 0  # 上限超過・期限切れで破棄した件数
+        self.errors = 0  # 送信失敗（OSError）の回数
+        self.queue_peak = 0  # キューの最大長
+
+    def submit(self, target, method, args):
+        """操作を送信（接続前・再送待ち、または先に待っている操作があればキューへ）"""
+        now = time.monotonic()
+        if not self.queue and now >= self.retry_time and usb_connected():
+            if now < target._next_frame:
+                # フレーム待ちの間はキューに入れ、メインループが次のフレームで送る（ループを止めない）
+                # マウス移動・コンシューマーコードは次のフレームまでの分をまとめる
+                self._enqueue(target, method, args, now)
+                return
+            if self._send(target, method, args, now):
+                return
+            # 失敗した操作はキューの先頭で再送を待つ
+            self._append(target, method, args, now)
+            return
+        self._enqueue(target, method, args, now)
+
+    def _enqueue(self, target, method, args, now):
+        queue = self.queue
+        if queue:
+            last = queue[-1]
+            if last[0] is target and last[1] == method:
+                # マウス移動・ホイールは移動量を合算（adafruit_hid が ±127 ずつ分割して送る）
+                if method == "move":
+                    x, y, wheel = last[2]
+                    last[2] = (x + args[0], y + args[1], wheel + args[2])
+                    self.merged += 1
+                    return
+                # 同じコンシューマーコード（音量の連続など）は回数だけ増やす
+                if target is self.consumer_control and method == "send" and last[2] == args:
+                    last[3] += 1
+                    self.merged += 1
+                    return
+        if len(queue) >= self.queue_size and method not in _RELEASE_METHODS:
+            self.dropped += 1
+            return
+        self._append(target, method, args, now)
+
+    def _append(self, target, method, args, now):
+        self.queue.append([target, method, args, 1, now])
+        self.queued_total += 1
+        if len(self.queue) > self.queue_peak:
+            self.queue_peak = len(self.queue)
+
+    def flush(self):
+        """キューの操作を順番に送信（メインループから毎回呼ぶ。失敗したら再送間隔を空ける）"""
+        queue = self.queue
+        now = time.monotonic()
+        while queue and now >= self.retry_time and usb_connected():
+            entry = queue[0]
+            target, method, args, count, queued_at = entry
+            if self.max_age is not None and now - queued_at > self.max_age and method not in _RELEASE_METHODS:
+                queue.pop(0)
+                self.dropped += count
+                continue
+            if now < target._next_frame:
+                return
+            if not self._send(target, method, args, now):
+                return
+            if count > 1:
+                entry[3] = count - 1
+            else:
+                queue.pop(0)
+
+    def _send(self, target, method, args, now):
+        """1 件送信（失敗したら再送間隔を延ばして False を返す）"""
+        try:
+            # デバイスの生成（adafruit_hid は生成時にもレポートを送る）も接続後に行う
+            getattr(target._dev(), method)(*args)
+        except OSError:
+            self.errors += 1
+            self.backoff = min(self.backoff * 2, self.retry_max_delay) if self.backoff else self.retry_delay
+            self.retry_time = now + self.backoff
+            return False
+        self.backoff = 0.0
+        if self.frame_interval:
+            target._next_frame = now + _report_count(method, args) * self.frame_interval
+        if self.first_report_time is None:
+            self.first_report_time = time.monotonic()
+        self.reported()
+        return True
+
+    def ready(self, target, now):
+        """target に今すぐ直接送信できるか（キューが空で、再送待ち・フレーム待ちでなく接続済み）"""
+        return not self.queue and now >= self.retry_time and now >= target._next_frame and usb_connected()
+
+    def ready_time(self, target):
+        """target に次に送信できる見込みの時刻"""
+        return max(self.retry_time, target._next_frame)
+
+    def deadline(self):
+        """キューの先頭を次に送れる時刻（キューが空なら None）"""
+        if not self.queue:
+            return None
+        return max(self.retry_time, self.queue[0][0]._next_frame)
+
+    def reported(self):
+        """レポート送信の通知"""
+        if self.on_report is not None:
+            self.on_report()
+
+    def release_all(self):
+        """押しっぱなしのキー・ボタンをすべて離す（アプリ切替時など）"""
+        self.keyboard.release_all()
+        self.consumer_control.release_all()
+        self.mouse.release_all()
+
+    def report(self):
+        """送信キューの統計を表示"""
+        print(f"[HID] 待ち {len(self.queue)}件（最大 {self.queue_peak}）/ まとめ {self.merged} / "
+              f"破棄 {self.dropped} / 送信失敗 {self.errors}")
+
+
+def create_output(settings, on_report=None):
+    """cuskey_settings の設定から HID 出力を生成"""
+    return HidOutput(
+        on_report,
+        queue_size=settings.HID_QUEUE_SIZE,
+        max_age=settings.HID_QUEUE_MAX_AGE,
+        retry_delay=settings.HID_RETRY_DELAY,
+        retry_max_delay=settings.HID_RETRY_MAX_DELAY,
+        frame_interval=settings.HID_FRAME_INTERVAL,
+    )
@@ -0,0 +1,155 @@
+"""
+ボタン入力の前処理とジェスチャー判定
+ピンの生の値からチャタリング（接点バウンス）やノイズを取り除き、
+押下・解放のタイミングから短押し・長押しの列（クリック回数など）を判定する
+"""
+
+
+class Debouncer:
+    """生のピン値が stable_time 秒以上変化しなかったときだけ状態を更新する
+
+    lockout: 状態を更新してからこの秒数は次の変化を無視する（エッジ直後の接点バウンス対策。ループは止めない）
+    """
+
+    def __init__(self, stable_time, value=True, lockout=0.0):
+        self.stable_time = stable_time
+        self.lockout = lockout
+        self.value = value  # 確定した状態（プルアップなので通常はTrue）
+        self._raw = value
+        self._changed_at = 0.0
+        self._locked_until = 0.0
+
+    def update(self, raw, now):
+        """生のピン値を渡し、チャタリング除去後の状態を返す"""
+        if raw != self._raw:
+            self._raw = raw
+            self._changed_at = now
+        if raw != self.value and now - self._changed_at >= self.stable_time and now >= self._locked_until:
+            self.value = raw
+            self._locked_until = now + self.lockout
+        return self.value
+
+
+def create_debouncer(settings):
+    """cuskey_settings の設定からボタン用のデバウンサーを生成"""
+    return Debouncer(settings.DEBOUNCE_STABLE_TIME, lockout=settings.DEBOUNCE_TIME)
+
+
+# 押し方の種類（ジェスチャーの列の 1 文字）
+SHORT = "S"  # 短押し（クリック）
+LONG = "L"  # 長押し
+
+
+def compile_gestures(patterns):
+    """{押し方の列: 動作} を木（トライ）にする
+
+    押し方の列は S（短押し）と L（長押し）を並べた文字列（例: "SS" = ダブルクリック、"SL" = 短押しの後に長押し）
+    木の節点は [動作（なければ None）, {次の押し方: 節点}]
+    """
+    root = [None, {}]
+    for sequence, action in patterns.items():
+        node = root
+        for element in sequence:
+            if element not in (SHORT, LONG):
+                raise ValueError(f"不明な押し方: {sequence}")
+            node = node[1].setdefault(element, [None, {}])
+        node[0] = action
+    return root
+
+
+class SequenceGesture:
+    """短押し・長押しの列を compile_gestures の木でたどって動作を判定する
+
+    押し方を 1 つ受け取るたびに木をたどり、その先に続く列がなければ待たずにすぐ確定する。
+    続く列がある場合は、最後に離してから multi_click 秒以内に次の押下がなければそこまでの動作で確定し、
+    木にない押し方が続いたときはそこまでの動作で確定してから最初の押し方としてたどり直す。
+    長押しは押している間に long_press 秒を超えた時点で判定する（押している間だけの動作向け）。
+    確定した動作は on_action(動作, 時刻) で通知する。
+    speculative=True で列を始めた場合、最初の短押しに動作があれば待たずに通知し（先行送信）、
+    後の押下で別の動作になったときは superseded を True にしてから通知する
+    """
+
+    def __init__(self, min_press, long_press, multi_click, on_action):
+        self.min_press = min_press
+        self.long_press = long_press
+        self.multi_click = multi_click
+        self.on_action = on_action
+        self.root = None  # 列を始めたときのモードの木
+        self.node = None  # たどっている節点（None なら列の途中ではない）
+        self.press_time = None
+        self.is_long = False
+        self.speculative = False
+        self.fired = None  # 先行送信した節点
+        self.superseded = False  # 通知中の動作が先行送信を取り消すものか
+        self.last_release_time = 0.0
+
+    def press(self, now, root, speculative=False):
+        """ボタンを押した（root: 今のモードの木。列の途中なら列を始めたときの木のまま）"""
+        if self.node is not None and now - self.last_release_time > self.multi_click:
+            self.flush(now)
+        if self.node is None:
+            self.root = root
+            self.speculative = speculative
+        self.press_time = now
+        self.is_long = False
+
+    def hold(self, now):
+        """押している間に呼ぶ（長押しになった瞬間だけ True）"""
+        if self.is_long or self.press_time is None or now - self.press_time < self.long_press:
+            return False
+        self.is_long = True
+        self._step(LONG, now)
+        return True
+
+    def release(self, now):
+        """ボタンを離した"""
+        if self.press_time is None:
+            return
+        duration = now - self.press_time
+        self.press_time = None
+        self.last_release_time = now
+        if self.is_long or duration < self.min_press:
+            return
+        self._step(LONG if duration >= self.long_press else SHORT, now)
+
+    def _step(self, element, now):
+        """押し方を 1 つ進める"""
+        node = self.node
+        child = node[1].get(element) if node is not None else None
+        if child is None:
+            # 続きの列がなければここまでの動作で確定し、最初の押し方としてたどり直す
+            self.flush(now)
+            node = self.root
+            child = node[1].get(element)
+            if child is None:
+                return
+        self.node = child
+        if not child[1]:
+            # 先に続く列がないので待たずに確定
+            self.flush(now)
+        elif self.speculative and node is self.root and child[0] is not None:
+            self.fired = child
+            self.on_action(child[0], now)
+
+    def poll(self, now):
+        """待ち時間を過ぎた列を確定する（ループごとに呼ぶ）"""
+        if self.node is not None and self.press_time is None and now - self.last_release_time > self.multi_click:
+            self.flush(now)
+
+    def flush(self, now):
+        """確定待ちの列を今すぐ確定する（モード切替時など）"""
+        node = self.node
+        fired = self.fired
+        self.node = None
+        self.fired = None
+        if node is None or node is fired or node[0] is None:
+            return
+        self.superseded = fired is not None
+        self.on_action(node[0], now)
+        self.superseded = False
+
+    def deadline(self):
+        """列が確定する予定の時刻（確定待ちがなければ None）"""
+        if self.node is None or self.press_time is not None:
+            return None
+        return self.last_release_time + self.multi_click
@@ -0,0 +1,19 @@
+"""
+キーボード配列表（JIS 配列）
+tools/gen_layouts.py で生成（直接編集しない）
+KEYMAP: ASCII コード（0〜127）ごとに 2 バイト（修飾キー, HID キーコード）。キーコード 0 は入力できない文字
+EXTRA: ASCII 以外の文字 → (修飾キー, HID キーコード)
+"""
+
+KEYMAP = (
+    b"\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x2b\x00\x28\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00"
+    b"\x00\x2c\xe1\x1e\xe1\x1f\xe1\x20\xe1\x21\xe1\x22\xe1\x23\xe1\x24\xe1\x25\xe1\x26\xe1\x34\xe1\x33\x00\x36\x00\x2d\x00\x37\x00\x38"
+    b"\x00\x27\x00\x1e\x00\x1f\x00\x20\x00\x21\x00\x22\x00\x23\x00\x24\x00\x25\x00\x26\x00\x34\x00\x33\xe1\x36\xe1\x2d\xe1\x37\xe1\x38"
+    b"\x00\x2f\xe1\x04\xe1\x05\xe1\x06\xe1\x07\xe1\x08\xe1\x09\xe1\x0a\xe1\x0b\xe1\x0c\xe1\x0d\xe1\x0e\xe1\x0f\xe1\x10\xe1\x11\xe1\x12"
+    b"\xe1\x13\xe1\x14\xe1\x15\xe1\x16\xe1\x17\xe1\x18\xe1\x19\xe1\x1a\xe1\x1b\xe1\x1c\xe1\x1d\x00\x30\x00\x87\x00\x32\x00\x2e\xe1\x87"
+    b"\xe1\x2f\x00\x04\x00\x05\x00\x06\x00\x07\x00\x08\x00\x09\x00\x0a\x00\x0b\x00\x0c\x00\x0d\x00\x0e\x00\x0f\x00\x10\x00\x11\x00\x12"
+    b"\x00\x13\x00\x14\x00\x15\x00\x16\x00\x17\x00\x18\x00\x19\x00\x1a\x00\x1b\x00\x1c\x00\x1d\xe1\x30\xe1\x89\xe1\x32\xe1\x2e\x00\x00"
+)
+
+EXTRA = {0x00a5: (0x00, 0x89)}
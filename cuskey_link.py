@@ -0,0 +1,476 @@
+"""
+設定・問い合わせ用のバイナリプロトコル（usb_cdc.data）
+2 つ目の USB シリアル（データチャンネル）でフレームを受け取り、アプリの定数の変更・プリセットの選択・
+マクロの送信・統計やトレースの読み出しに応答する。CIRCUITPY の .py を書き換えずに調整・確認できる
+受信は tick ごとに届いた分（最大 LINK_CHUNK バイト）だけを読んで少しずつ解析し、メインループを止めない
+
+フレームの形式（数値はリトルエンディアン）:
+    0  同期バイト 0xA5
+    1  コマンド（応答はコマンド | 0x80）
+    2  通し番号（応答は要求と同じ番号）
+    3  ペイロードの長さ（2 バイト、MAX_PAYLOAD まで）
+    5  ペイロード
+       CRC-16/CCITT（コマンドからペイロードの終わりまで、2 バイト）
+応答のペイロードは先頭 1 バイトが結果（OK / ERR_*）、続いてコマンドごとのデータ
+ホスト側の送受信は tools/linkctl.py（フレームの組み立て・解析はこのモジュールを共用）
+
+WRITE・CHECK・COMMIT は NVM の領域（プリセット・配布設定）を書き換える（tools/cuskey_deploy.py）。
+WRITE は RAM の作業領域に書き、COMMIT で CRC を確かめてから NVM に 1 回で書き込む
+（途中で切れても NVM は元のまま。CHECK でブロックごとの CRC を比べ、違うブロックだけ送り直す）
+"""
+
+import struct
+
+import cuskey_clock
+from cuskey_config import decode_field, decode_value, encode_value
+from cuskey_preset import crc16
+
+SYNC = 0xA5
+HEADER_SIZE = 5
+MAX_PAYLOAD = 512
+PROTOCOL_VERSION = 2
+
+# 応答のコマンドに付けるビット
+RESPONSE = 0x80
+
+# コマンド
+PING = 0x01  # 応答: バージョン, MAX_PAYLOAD(2), ボード名, 動作中のアプリ名（","区切り）
+SET = 0x02  # 要求: アプリ名, 定数名, 値（encode_value）
+PRESET = 0x03  # 要求: プリセット名
+MACRO = 0x04  # 要求: マクロの手順（encode_macro）。応答: 予約した手順の数(2)
+STATS = 0x05  # 応答: (名前, 値(符号なし 4 バイト)) の並び
+TRACE = 0x06  # 要求: 開始位置(2)。応答: 件数(2), 開始位置(2), (時刻 us(4), 状態(1)) の並び
+WRITE = 0x07  # 要求: 領域(1), 位置(2), データ。作業領域に書く
+CHECK = 0x08  # 要求: 領域(1), 位置(2), 長さ(2), ブロックの大きさ(2)。応答: ブロックごとの CRC(2) の並び
+COMMIT = 0x09  # 要求: 領域(1), 長さ(2), CRC(2)。応答: NVM に書き込んだら 1（内容が同じなら 0）
+PLAY = 0x0A  # 要求: 配布設定・マクロライブラリのマクロ名。応答: 予約した手順の数(2、ライブラリは 0)
+
+# 書き換えられる NVM の領域
+REGION_PRESETS = 0  # プリセットストア（cuskey_preset）
+REGION_CONFIG = 1  # 配布設定（cuskey_config）
+
+# 結果
+OK = 0
+ERR_CRC = 1  # CRC が一致しない（同じ通し番号で送り直す）
+ERR_COMMAND = 2  # 未対応のコマンド
+ERR_ARGUMENT = 3  # ペイロードが正しくない・対象がない
+ERR_BUSY = 4  # 処理できない状態（トレース無効・NVM がないなど）
+ERR_VERIFY = 5  # COMMIT の CRC が作業領域の内容と一致しない（CHECK で確かめて送り直す）
+
+# マクロの手順の種類（cuskey_macro の TEXT / KEY / WAIT）
+MACRO_TEXT = 0  # 長さ(1), UTF-8 の文字列
+MACRO_KEY = 1  # 個数(1), キーコード
+MACRO_WAIT = 2  # 待ち時間 ms(2)
+
+# 途中まで受け取ったフレームをこの秒数で破棄（ホストが送信の途中で止まった場合）
+FRAME_TIMEOUT = 0.5
+
+# 1 件のトレースの大きさ
+TRACE_ENTRY_SIZE = 5
+
+
+def encode_frame(command, seq, payload=b""):
+    """フレームを組み立てる"""
+    body = bytes((command, seq & 0xFF)) + len(payload).to_bytes(2, "little") + bytes(payload)
+    return bytes((SYNC,)) + body + crc16(body).to_bytes(2, "little")
+
+
+def _field(data):
+    return bytes((len(data),)) + data
+
+
+def encode_set(app, key, value):
+    """SET のペイロード"""
+    return _field(app.encode()) + _field(key.encode()) + encode_value(value)
+
+
+def encode_macro(steps):
+    """[(MACRO_TEXT, 文字列) / (MACRO_KEY, (キーコード, ...)) / (MACRO_WAIT, 秒)] を MACRO のペイロードにする"""
+    data = bytearray()
+    for kind, value in steps:
+        if kind == MACRO_TEXT:
+            data += bytes((MACRO_TEXT,)) + _field(value.encode())
+        elif kind == MACRO_KEY:
+            data += bytes((MACRO_KEY, len(value))) + bytes(value)
+        else:
+            data += bytes((MACRO_WAIT,)) + int(value * 1000).to_bytes(2, "little")
+    return bytes(data)
+
+
+def decode_macro(data):
+    """encode_macro の逆（先に全体を読むので、途中に誤りがあれば ValueError で何も返さない）"""
+    steps = []
+    position = 0
+    while position < len(data):
+        kind = data[position]
+        if kind == MACRO_TEXT:
+            text, position = decode_field(data, position + 1)
+            steps.append((MACRO_TEXT, text))
+        elif kind == MACRO_KEY:
+            count = data[position + 1]
+            keys = tuple(data[position + 2:position + 2 + count])
+            if len(keys) != count:
+                raise ValueError("キーコードが足りません")
+            steps.append((MACRO_KEY, keys))
+            position += 2 + count
+        elif kind == MACRO_WAIT:
+            steps.append((MACRO_WAIT, (data[position + 1] | (data[position + 2] << 8)) / 1000))
+            position += 3
+        else:
+            raise ValueError("不明な手順")
+    return steps
+
+
+class FrameParser:
+    """受信したバイト列からフレームを取り出す（受信バッファは固定長、少しずつ渡してよい）"""
+
+    def __init__(self, max_payload=MAX_PAYLOAD):
+        self.max_payload = max_payload
+        self.buffer = bytearray(HEADER_SIZE + max_payload + 2)
+        self.view = memoryview(self.buffer)
+        self.reset()
+        self.errors = 0  # CRC 不一致・長すぎるフレームの数
+
+    def reset(self):
+        """次のフレームの同期バイトを待つ"""
+        self.fill = 0  # buffer に入っているバイト数
+        self.need = 1  # フレームを完成させるのに必要なバイト数（同期バイトを含む）
+        self.ready = False
+        self.error = None  # 直前のフレームの誤り（ERR_CRC）
+
+    @property
+    def command(self):
+        return self.buffer[1]
+
+    @property
+    def seq(self):
+        return self.buffer[2]
+
+    def payload(self):
+        """受け取ったフレームのペイロード（バッファを指すので次の feed までに使う）"""
+        length = self.buffer[3] | (self.buffer[4] << 8)
+        return self.view[HEADER_SIZE:HEADER_SIZE + length]
+
+    def feed(self, data, position=0):
+        """data[position:] を読み進め、フレームが完成するか data を読み切った位置を返す
+
+        完成したら ready が True（CRC が合わなければ error も設定）。処理したら reset を呼ぶ
+        """
+        buffer = self.buffer
+        end = len(data)
+        while position < end and not self.ready:
+            if self.fill == 0:
+                # 同期バイトを探す
+                if data[position] == SYNC:
+                    buffer[0] = SYNC
+                    self.fill = 1
+                    self.need = HEADER_SIZE
+                position += 1
+                continue
+            count = min(self.need - self.fill, end - position)
+            buffer[self.fill:self.fill + count] = data[position:position + count]
+            self.fill += count
+            position += count
+            if self.fill < self.need:
+                continue
+            if self.need == HEADER_SIZE:
+                length = buffer[3] | (buffer[4] << 8)
+                if length > self.max_payload:
+                    self.errors += 1
+                    self.fill = 0
+                    continue
+                self.need = HEADER_SIZE + length + 2
+                continue
+            self.ready = True
+            crc_position = self.need - 2
+            if crc16(self.view[1:crc_position]) != buffer[crc_position] | (buffer[crc_position + 1] << 8):
+                self.errors += 1
+                self.error = ERR_CRC
+        return position
+
+
+class Link:
+    """データチャンネルのフレームを受け取り、コマンドを実行して応答する
+
+    serial: usb_cdc.data（in_waiting・read・write を持つもの）
+    host: cuskey_runtime.AppHost（アプリ・統計・トレースの参照先）
+    chunk: 1 回の poll で読むバイト数の上限
+    macro: cuskey_macro.MacroPlayer（MACRO・PLAY の送信）
+    nvm: microcontroller.nvm（None なら WRITE・CHECK・COMMIT は ERR_BUSY）
+    regions: 領域ごとの (NVM の位置, 大きさ)
+    """
+
+    def __init__(self, serial, host, chunk, macro, nvm=None, regions=()):
+        self.serial = serial
+        self.host = host
+        self.chunk = chunk
+        self.macro = macro
+        self.nvm = nvm
+        self.regions = regions
+        self.parser = FrameParser()
+        self.last_byte_time = 0.0
+        # WRITE の作業領域（最初の WRITE で NVM の内容から作り、COMMIT で NVM に書き込んで手放す）
+        self.staging = None
+        self.staging_region = None
+        self.handlers = {
+            PING: self.do_ping,
+            SET: self.do_set,
+            PRESET: self.do_preset,
+            MACRO: self.do_macro,
+            STATS: self.do_stats,
+            TRACE: self.do_trace,
+            WRITE: self.do_write,
+            CHECK: self.do_check,
+            COMMIT: self.do_commit,
+            PLAY: self.do_play,
+        }
+        # 統計
+        self.frames = 0
+        self.nvm_writes = 0
+
+    def poll(self, now):
+        """届いている分を読んで解析し、完成したフレームのコマンドを実行（メインループから毎回呼ぶ）"""
+        parser = self.parser
+        waiting = self.serial.in_waiting
+        if not waiting:
+            if parser.fill and now - self.last_byte_time >= FRAME_TIMEOUT:
+                parser.reset()
+            return
+        data = self.serial.read(min(waiting, self.chunk))
+        self.last_byte_time = now
+        position = 0
+        while position < len(data):
+            position = parser.feed(data, position)
+            if parser.ready:
+                self.frames += 1
+                if parser.error is not None:
+                    self.reply(parser.error)
+                else:
+                    self.dispatch(parser.command, parser.payload(), now)
+                parser.reset()
+
+    def reply(self, status, data=b""):
+        """直前に受け取ったフレームへ応答"""
+        parser = self.parser
+        self.serial.write(encode_frame(parser.command | RESPONSE, parser.seq, bytes((status,)) + data))
+
+    def dispatch(self, command, payload, now):
+        handler = self.handlers.get(command)
+        if handler is None:
+            self.reply(ERR_COMMAND)
+            return
+        try:
+            handler(payload, now)
+        except (ValueError, IndexError, UnicodeError) as e:
+            print(f"[WARN] データチャンネル: コマンド 0x{command:02x} の引数が正しくありません: {e}")
+            self.reply(ERR_ARGUMENT)
+
+    def do_ping(self, payload, now):
+        names = ",".join(app.NAME or "" for app in self.host.apps)
+        self.reply(OK, bytes((PROTOCOL_VERSION,)) + MAX_PAYLOAD.to_bytes(2, "little")
+                   + _field(self.host.ctx.board_name.encode()) + names.encode())
+
+    def do_set(self, payload, now):
+        app, position = decode_field(payload, 0)
+        key, position = decode_field(payload, position)
+        value, _ = decode_value(payload, position)
+        if not self.host.set_constant(app, key, value):
+            self.reply(ERR_ARGUMENT)
+            return
+        print(f"[設定] {app}.{key} = {value!r}（データチャンネル）")
+        self.reply(OK)
+
+    def do_preset(self, payload, now):
+        name = bytes(payload).decode()
+        for app in self.host.apps:
+            load_preset = getattr(app, "load_preset", None)
+            if load_preset is not None and load_preset(name):
+                self.reply(OK)
+                return
+        self.reply(ERR_ARGUMENT)
+
+    def queue_macro(self, steps):
+        """手順をマクロの送信に予約"""
+        macro = self.macro
+        for kind, value in steps:
+            if kind == MACRO_TEXT:
+                macro.type_text(value)
+            elif kind == MACRO_KEY:
+                macro.key(*value)
+            else:
+                macro.wait(value)
+        self.reply(OK, len(steps).to_bytes(2, "little"))
+
+    def do_macro(self, payload, now):
+        self.queue_macro(decode_macro(payload))
+
+    def do_play(self, payload, now):
+        name = bytes(payload).decode()
+        steps = self.host.ctx.config.macro(name)
+        if steps is not None:
+            self.queue_macro(decode_macro(steps))
+        elif self.macro.play(name):
+            # マクロライブラリ（ファイル）のマクロは読み込みながら再生するので、手順の数は分からない
+            self.reply(OK, bytes(2))
+        else:
+            self.reply(ERR_ARGUMENT)
+
+    def _region(self, payload):
+        """ペイロード先頭の領域番号から (NVM の位置, 大きさ) を返す"""
+        region = payload[0]
+        if region >= len(self.regions):
+            raise ValueError("不明な領域")
+        return region, self.regions[region]
+
+    def do_write(self, payload, now):
+        if self.nvm is None:
+            self.reply(ERR_BUSY)
+            return
+        region, (offset, size) = self._region(payload)
+        start = payload[1] | (payload[2] << 8)
+        data = payload[3:]
+        if start + len(data) > size:
+            raise ValueError("領域の外への書き込み")
+        if self.staging_region != region:
+            self.staging = bytearray(self.nvm[offset:offset + size])
+            self.staging_region = region
+        self.staging[start:start + len(data)] = data
+        self.reply(OK)
+
+    def do_check(self, payload, now):
+        if self.nvm is None:
+            self.reply(ERR_BUSY)
+            return
+        region, (offset, size) = self._region(payload)
+        start = payload[1] | (payload[2] << 8)
+        length = payload[3] | (payload[4] << 8)
+        block = payload[5] | (payload[6] << 8)
+        if not block or start + length > size or (length + block - 1) // block * 2 > MAX_PAYLOAD - 1:
+            raise ValueError("範囲が正しくありません")
+        # 書き込み途中なら作業領域、そうでなければ NVM の内容
+        if self.staging_region == region:
+            source = memoryview(self.staging)
+        else:
+            source = memoryview(self.nvm[offset:offset + size])
+        data = bytearray()
+        for position in range(start, start + length, block):
+            data += crc16(source[position:min(position + block, start + length)]).to_bytes(2, "little")
+        self.reply(OK, data)
+
+    def do_commit(self, payload, now):
+        if self.nvm is None:
+            self.reply(ERR_BUSY)
+            return
+        region, (offset, size) = self._region(payload)
+        length = payload[1] | (payload[2] << 8)
+        crc = payload[3] | (payload[4] << 8)
+        if length > size:
+            raise ValueError("領域より長い")
+        nvm = self.nvm
+        data = self.staging if self.staging_region == region else nvm[offset:offset + size]
+        if crc16(memoryview(data)[:length]) != crc:
+            self.reply(ERR_VERIFY)
+            return
+        written = nvm[offset:offset + length] != data[:length]
+        if written:
+            # NVM はセクタ全体を消去・書き込みするので、まとめて 1 回で書き込む
+            nvm[offset:offset + length] = data[:length]
+            self.nvm_writes += 1
+        self.staging = None
+        self.staging_region = None
+        self.reply(OK, bytes((1 if written else 0,)))
+        if written:
+            print(f"[NVM] データチャンネルから領域 {region} を書き込みました（{length} bytes）")
+            self.region_changed(region)
+
+    def region_changed(self, region):
+        """書き換えた領域を動作中のアプリに反映"""
+        host = self.host
+        if region == REGION_CONFIG:
+            host.config_changed()
+            return
+        for app in host.apps:
+            presets_changed = getattr(app, "presets_changed", None)
+            if presets_changed is not None:
+                presets_changed()
+
+    def stats(self):
+        """STATS で返す (名前, 値) の並び"""
+        host = self.host
+        ctx = host.ctx
+        hid = ctx.hid
+        items = [
+            ("uptime_ms", int(cuskey_clock.now_ns() // 1000000)),
+            ("hid.queued", hid.queued_total),
+            ("hid.merged", hid.merged),
+            ("hid.dropped", hid.dropped),
+            ("hid.errors", hid.errors),
+            ("hid.queue_peak", hid.queue_peak),
+            ("link.frames", self.frames),
+            ("link.errors", self.parser.errors),
+            ("link.nvm_writes", self.nvm_writes),
+            ("macro.typed", self.macro.typed),
+        ]
+        if ctx.state is not None:
+            items.append(("state.writes", ctx.state.writes))
+            items.append(("state.erases", ctx.state.erases))
+        for app, (count, total, worst) in zip(host.apps, host.tick_stats):
+            if count:
+                items.append((f"tick.{app.NAME}.avg_us", total // count // 1000))
+                items.append((f"tick.{app.NAME}.max_us", worst // 1000))
+        return items
+
+    def do_stats(self, payload, now):
+        data = bytearray()
+        for name, value in self.stats():
+            data += _field(name.encode()) + struct.pack("<I", value & 0xFFFFFFFF)
+        self.reply(OK, data)
+
+    def do_trace(self, payload, now):
+        trace = self.host.ctx.trace
+        if trace is None:
+            self.reply(ERR_BUSY)
+            return
+        start = payload[0] | (payload[1] << 8) if len(payload) >= 2 else 0
+        count = trace.count
+        if start > count:
+            self.reply(ERR_ARGUMENT)
+            return
+        # 応答に入る分だけ返す（続きはホストが開始位置をずらして要求する）
+        end = min(count, start + (MAX_PAYLOAD - 5) // TRACE_ENTRY_SIZE)
+        data = bytearray(count.to_bytes(2, "little") + start.to_bytes(2, "little"))
+        for index in range(start, end):
+            t_us, state = trace.entry(index)
+            data += t_us.to_bytes(4, "little") + bytes((state,))
+        self.reply(OK, data)
+
+    def tick(self, now):
+        """データチャンネルから予約したマクロを送信し、次の送信予定時刻を返す（メインループから毎回呼ぶ）"""
+        return self.macro.tick(now)
+
+
+def create_link(settings, host):
+    """cuskey_settings の設定からデータチャンネルを生成（無効・usb_cdc.data がなければ None）"""
+    if not settings.LINK_ENABLED:
+        return None
+    try:
+        import usb_cdc
+        serial = usb_cdc.data
+    except (ImportError, AttributeError):
+        serial = None
+    if serial is None:
+        print("[WARN] usb_cdc.data が無効です（boot.py で usb_cdc.enable(data=True)、tools/gen_boot.py --link）")
+        return None
+    serial.timeout = 0
+    try:
+        import microcontroller
+        nvm = microcontroller.nvm
+    except (ImportError, AttributeError):
+        nvm = None
+    regions = (
+        (settings.NVM_PRESET_OFFSET, settings.NVM_PRESET_SIZE),
+        (settings.NVM_CONFIG_OFFSET, settings.NVM_CONFIG_SIZE),
+    )
+    import cuskey_macro
+    return Link(serial, host, settings.LINK_CHUNK, cuskey_macro.create_player(settings, host.ctx.hid),
+                nvm, regions)
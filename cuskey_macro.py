@@ -0,0 +1,422 @@
+"""
+キー入力マクロの再生
+文字列の入力・キー送信・待機を手順としてためておき、メインループの tick で少しずつ送信する
+（送信中もボタン入力を止めない）
+文字はキーボード配列表（cuskey_layout_us.py / cuskey_layout_jis.py、tools/gen_layouts.py で生成）で
+修飾キーと HID キーコードに変換するので、数字以外の英字・記号も入力できる
+
+長いマクロは CIRCUITPY のマクロライブラリ（tools/gen_macros.py で生成）に置き、名前で再生する。
+ライブラリは固定長のバッファに readinto で少しずつ読み込みながら送信するので、
+マクロの長さによらず使うメモリは一定（空きメモリより長い定型文も再生できる）
+
+マクロライブラリの形式（数値はリトルエンディアン）:
+    0  マジック "ML"（2 バイト）
+    2  形式のバージョン（1 バイト）
+    3  マクロ数 N（1 バイト）
+    4  索引: N 個の (名前の CRC-16(2), 手順の位置(4), 手順の長さ(4))
+    手順: 種類(1) に続けて
+        TEXT: 長さ(1), UTF-8 の文字列（LIBRARY_TEXT_MAX バイトまで）
+        KEY: 個数(1), キーコード（同時に押して離す）
+        WAIT: 待ち時間 ms(2)
+        PRESS: 個数(1), キーコード（押したままにする）
+        RELEASE: 個数(1), キーコード（離す。個数 0 ですべて離す）
+        DELAY: 待ち時間 ms（可変長整数）
+        REPEAT: 回数（可変長整数）。続く手順 1 つを回数だけ繰り返す
+    TEXT・KEY・WAIT は cuskey_link の MACRO と同じ（バージョン 1 はこの 3 つだけ）
+    可変長整数は下位から 7 ビットずつ、続きがあるバイトは最上位ビットを立てる（127 までは 1 バイト）
+    1 レポートごとに 8 バイトのレポートを置く代わりに、変化したキー（押す・離す）だけと繰り返しの回数を置くので、
+    1 手順あたり数バイト（文字列は 1 文字 1 バイト）で済む（tools/macro_bench.py で確認）
+"""
+
+from cuskey_preset import crc16
+
+# 手順の種類
+TEXT = 0  # 文字列を 1 文字ずつ入力
+KEY = 1  # キーコードを同時に押して離す
+WAIT = 2  # 指定秒数待つ
+STREAM = 3  # マクロライブラリのマクロを読み込みながら再生
+
+# マクロライブラリだけで使う手順の種類
+PRESS = 4  # キーを押したままにする
+RELEASE = 5  # キーを離す
+DELAY = 6  # 指定ミリ秒待つ（可変長整数）
+REPEAT = 7  # 続く手順を繰り返す
+
+LIBRARY_MAGIC = b"ML"
+LIBRARY_VERSION = 2
+LIBRARY_HEADER_SIZE = 4
+LIBRARY_ENTRY_SIZE = 10
+
+# ライブラリの TEXT 1 つの上限（bytes、これより長い文字列は分けて収録する）
+LIBRARY_TEXT_MAX = 64
+
+# 読み込みバッファの最小の大きさ（最も長い手順が入る大きさ）
+STREAM_BUFFER_MIN = 2 + LIBRARY_TEXT_MAX
+
+
+def load_layout(name):
+    """キーボード配列表（cuskey_layout_<name>）を読み込む"""
+    return __import__("cuskey_layout_" + name)
+
+
+def lookup(layout, char):
+    """1 文字を (修飾キー, キーコード) に変換（配列表にない文字は None）"""
+    return lookup_code(layout, ord(char))
+
+
+def lookup_code(layout, code):
+    """文字コードを (修飾キー, キーコード) に変換（配列表にない文字は None）"""
+    if code < 128:
+        keycode = layout.KEYMAP[code * 2 + 1]
+        if keycode:
+            return layout.KEYMAP[code * 2], keycode
+        return None
+    return layout.EXTRA.get(code)
+
+
+class MacroStream:
+    """マクロライブラリのマクロを固定長のバッファに少しずつ読み込みながら再生する
+
+    player: 送信に使う MacroPlayer（キーボード・配列表・入力速度・予定時刻を共用）
+    path: マクロライブラリのファイル
+    size: 読み込みバッファの大きさ（bytes）
+    """
+
+    def __init__(self, player, path, size):
+        self.player = player
+        self.path = path
+        self.buffer = bytearray(max(size, STREAM_BUFFER_MIN))
+        self.view = memoryview(self.buffer)
+        self.file = None
+        self.remaining = 0  # ファイルから読んでいない手順のバイト数
+        self.fill = 0  # buffer に読み込んだバイト数
+        self.pos = 0  # 次の手順の位置（buffer 内）
+        self.text_pos = 0  # 入力中の文字列の位置（buffer 内）
+        self.text_end = 0
+        self.repeat = 0  # 繰り返し中の手順の残り回数
+        self.held = []  # PRESS で押したままのキー
+        # 統計
+        self.reads = 0  # readinto の回数
+
+    def find(self, name):
+        """ライブラリからマクロを探し、(手順の位置, 長さ) を返す（なければ None）"""
+        key = crc16(name.encode())
+        view = self.view
+        try:
+            with open(self.path, "rb") as f:
+                f.readinto(view[:LIBRARY_HEADER_SIZE])
+                if self.buffer[:2] != LIBRARY_MAGIC or not 1 <= view[2] <= LIBRARY_VERSION:
+                    print(f"[WARN] マクロライブラリ {self.path} の形式が正しくありません")
+                    return None
+                for _ in range(view[3]):
+                    f.readinto(view[:LIBRARY_ENTRY_SIZE])
+                    if view[0] | (view[1] << 8) == key:
+                        return (int.from_bytes(view[2:6], "little"), int.from_bytes(view[6:10], "little"))
+        except OSError:
+            print(f"[WARN] マクロライブラリ {self.path} を開けません")
+        return None
+
+    def start(self, offset, length):
+        """offset から length バイトの手順の再生を始める"""
+        self.close()
+        try:
+            self.file = open(self.path, "rb")
+        except OSError:
+            return False
+        self.file.seek(offset)
+        self.remaining = length
+        self.fill = self.pos = self.text_pos = self.text_end = self.repeat = 0
+        return True
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        # 途中で止めたときもキーを押したままにしない
+        if self.held:
+            self.player.keyboard.release_all()
+            self.held = []
+
+    def _fill(self, need):
+        """buffer[pos:pos + need] を読み込み済みにする（手順の終わりに達していれば False）"""
+        available = self.fill - self.pos
+        if available >= need:
+            return True
+        buffer = self.buffer
+        # 読み残しを先頭に詰めてから続きを読む
+        pos = self.pos
+        for i in range(available):
+            buffer[i] = buffer[pos + i]
+        self.pos = 0
+        self.fill = available
+        count = min(len(buffer) - available, self.remaining)
+        if count:
+            count = self.file.readinto(self.view[available:available + count])
+            self.fill += count
+            self.remaining -= count
+            self.reads += 1
+        return self.fill >= need
+
+    def _varint(self, start):
+        """buffer[pos + start] からの可変長整数を読み、(値, 次の手順の位置) を返す"""
+        value = 0
+        shift = 0
+        while True:
+            if not self._fill(start + 1):
+                raise ValueError("マクロが途中で終わっています")
+            byte = self.buffer[self.pos + start]
+            value |= (byte & 0x7F) << shift
+            start += 1
+            if byte < 0x80:
+                return value, self.pos + start
+            shift += 7
+
+    def _advance(self, end):
+        """手順を 1 つ終えて次の手順に進む（繰り返し中は同じ手順をもう一度実行する）"""
+        if self.repeat:
+            self.repeat -= 1
+        else:
+            self.pos = end
+
+    def _next_char(self):
+        """入力中の文字列から UTF-8 の 1 文字を読んで文字コードを返す"""
+        buffer = self.buffer
+        pos = self.text_pos
+        code = buffer[pos]
+        if code < 0x80:
+            size = 1
+        elif code < 0xE0:
+            code &= 0x1F
+            size = 2
+        elif code < 0xF0:
+            code &= 0x0F
+            size = 3
+        else:
+            code &= 0x07
+            size = 4
+        for i in range(1, size):
+            code = (code << 6) | (buffer[pos + i] & 0x3F)
+        self.text_pos = pos + size
+        return code
+
+    def step(self, now, interval):
+        """1 文字（1 キー・1 待機）を実行
+
+        None: マクロの終わり、False: 待機を設定した（続けて次を実行してよい）、True: 送信した・送信待ち
+        """
+        player = self.player
+        if self.text_pos < self.text_end:
+            if not player.hid.ready(player.keyboard, now):
+                return True
+            return player.type_code(self._next_char(), now, interval, self.held)
+        if not self._fill(1):
+            self.close()
+            return None
+        buffer = self.buffer
+        kind = buffer[self.pos]
+        if kind == DELAY:
+            ms, end = self._varint(1)
+            player.next_time = now + ms / 1000
+            self._advance(end)
+            return False
+        if kind == REPEAT:
+            count, end = self._varint(1)
+            if not count:
+                raise ValueError("繰り返しの回数が 0 です")
+            # 続く手順を 1 回実行した後、残り count - 1 回は同じ位置から実行する
+            self.pos = end
+            self.repeat = count - 1
+            return False
+        if kind == WAIT:
+            if not self._fill(3):
+                raise ValueError("マクロが途中で終わっています")
+            pos = self.pos
+            player.next_time = now + (buffer[pos + 1] | (buffer[pos + 2] << 8)) / 1000
+            self._advance(pos + 3)
+            return False
+        if not self._fill(2) or not self._fill(2 + buffer[self.pos + 1]):
+            raise ValueError("マクロが途中で終わっています")
+        pos = self.pos
+        end = pos + 2 + buffer[pos + 1]
+        if kind == TEXT:
+            self.text_pos = pos + 2
+            self.text_end = end
+            self._advance(end)
+            return False
+        if not player.hid.ready(player.keyboard, now):
+            return True
+        keyboard = player.keyboard
+        if kind == KEY:
+            player.tap(self.view[pos + 2:end], self.held)
+        elif kind == PRESS:
+            keys = self.view[pos + 2:end]
+            keyboard.press(*keys)
+            for key in keys:
+                if key not in self.held:
+                    self.held.append(key)
+        elif kind == RELEASE:
+            if end == pos + 2:
+                keyboard.release_all()
+                self.held = []
+            else:
+                keys = self.view[pos + 2:end]
+                keyboard.release(*keys)
+                for key in keys:
+                    if key in self.held:
+                        self.held.remove(key)
+        else:
+            raise ValueError("不明な手順")
+        self._advance(end)
+        return True
+
+
+class MacroPlayer:
+    """キー入力の手順をキューにため、tick のたびに 1 文字（1 キー）ずつ送信する
+
+    hid: cuskey_hid.HidOutput
+    layout: キーボード配列表のモジュール
+    rate: 文字列の入力速度（文字/秒）の既定値
+    library: マクロライブラリのファイル（None なら play は使えない）
+    buffer_size: マクロライブラリの読み込みバッファの大きさ（bytes）
+    """
+
+    def __init__(self, hid, layout, rate, library=None, buffer_size=128):
+        self.hid = hid
+        self.keyboard = hid.keyboard
+        self.layout = layout
+        self.rate = rate
+        self.steps = []  # [(種類, 値, 次の手順までの秒数), ...]
+        self.pos = 0  # 入力中の文字列の位置
+        self.next_time = 0.0  # 次の手順を実行できる時刻
+        self.stream = MacroStream(self, library, buffer_size) if library is not None else None
+        # 統計
+        self.typed = 0  # 入力した文字数
+        self.skipped = 0  # 配列表にないため入力できなかった文字数
+
+    def type_text(self, text, rate=None):
+        """文字列の入力を予約（rate: 入力速度（文字/秒）、省略時は既定値）"""
+        if text:
+            self.steps.append((TEXT, text, 1.0 / (rate or self.rate)))
+
+    def key(self, *keycodes):
+        """キーの送信（同時に押して離す）を予約"""
+        self.steps.append((KEY, keycodes, 0.0))
+
+    def wait(self, seconds):
+        """待機を予約"""
+        self.steps.append((WAIT, seconds, 0.0))
+
+    def play(self, name, rate=None):
+        """マクロライブラリのマクロの再生を予約（見つからなければ False）"""
+        if self.stream is None:
+            print("[WARN] マクロライブラリが設定されていません（MACRO_LIBRARY）")
+            return False
+        location = self.stream.find(name)
+        if location is None:
+            print(f"[WARN] マクロライブラリに {name} はありません")
+            return False
+        self.steps.append((STREAM, location, 1.0 / (rate or self.rate)))
+        return True
+
+    def busy(self):
+        """送信待ちの手順があるか"""
+        return bool(self.steps)
+
+    def clear(self):
+        """送信待ちの手順をすべて取り消す"""
+        self.steps = []
+        self.pos = 0
+        if self.stream is not None:
+            self.stream.close()
+
+    def tap(self, keys, held=None):
+        """キーを同時に押して離す
+
+        held: 押したままのキー（マクロライブラリの PRESS）。send は全キーを離すので、
+        押したままのキーがあるときは keys だけを押し、held にないキーだけを離す
+        """
+        if held:
+            self.keyboard.press(*keys)
+            self.keyboard.release(*[key for key in keys if key not in held])
+        else:
+            self.keyboard.send(*keys)
+
+    def type_code(self, code, now, interval, held=None):
+        """文字コード 1 文字を入力し、次の文字の予定時刻を進める（配列表になければ False）
+
+        held: 押したままのキー（tap を参照）
+        """
+        keys = lookup_code(self.layout, code)
+        if keys is None:
+            self.skipped += 1
+            print(f"  警告：'{chr(code)}' はキーボード配列表にないため入力できません")
+            return False
+        modifier, keycode = keys
+        if modifier:
+            self.tap((modifier, keycode), held)
+        else:
+            self.tap((keycode,), held)
+        self.typed += 1
+        # 予定時刻から数えて平均の速さを保つ（ループ間隔のずれをためない。大きく遅れたら今から数え直す）
+        if now - self.next_time >= interval:
+            self.next_time = now
+        self.next_time += interval
+        return True
+
+    def tick(self, now):
+        """予定時刻になった手順を実行し、次の予定時刻を返す（メインループから毎回呼ぶ）
+
+        1 回の呼び出しで送るのは 1 文字（1 キー）まで。キーボードのフレーム待ち・再送待ちの間は
+        送信せずに待つので、入力が HID キューにたまったり、ループが止まったりしない
+        """
+        steps = self.steps
+        while steps and now >= self.next_time:
+            kind, value, interval = steps[0]
+            if kind == WAIT:
+                steps.pop(0)
+                self.next_time = now + value
+                continue
+            if kind == STREAM:
+                stream = self.stream
+                if stream.file is None and not stream.start(*value):
+                    steps.pop(0)
+                    continue
+                try:
+                    result = stream.step(now, interval)
+                except ValueError as e:
+                    print(f"[WARN] マクロライブラリ: {e}")
+                    stream.close()
+                    result = None
+                if result is None:
+                    steps.pop(0)
+                    continue
+                if result:
+                    break
+                continue
+            if not self.hid.ready(self.keyboard, now):
+                break
+            if kind == KEY:
+                steps.pop(0)
+                self.keyboard.send(*value)
+                break
+            char = value[self.pos]
+            self.pos += 1
+            if self.pos >= len(value):
+                steps.pop(0)
+                self.pos = 0
+            if not self.type_code(ord(char), now, interval):
+                continue
+            break
+        return self.deadline()
+
+    def deadline(self):
+        """次の手順を実行する予定の時刻（手順がなければ None）"""
+        if not self.steps:
+            return None
+        return max(self.next_time, self.hid.ready_time(self.keyboard))
+
+
+def create_player(settings, hid):
+    """cuskey_settings の設定（KEYBOARD_LAYOUT・TYPING_RATE・MACRO_LIBRARY）からマクロ再生を生成"""
+    return MacroPlayer(hid, load_layout(settings.KEYBOARD_LAYOUT), settings.TYPING_RATE,
+                       settings.MACRO_LIBRARY, settings.MACRO_STREAM_BUFFER)
@@ -0,0 +1,177 @@
+"""
+なめらかなマウス移動
+1 回の移動を加減速（イーズイン・アウト）と軽い弧を描く経路に分け、USB のフレームごとに少しずつ送る
+経路は事前に計算した固定小数点の表から求め、送信済みの位置との差だけを送るので端数がたまらず、
+区間の終点にはぴったり到達する（往復させれば元の位置に戻る）
+乱数は random モジュールの代わりに 16 ビットの xorshift を使う（小さい整数だけで計算しメモリを確保しない）
+"""
+
+# 経路の表の区間数（表の要素数は +1）
+TABLE_STEPS = 64
+
+# 表の値の 1.0 に当たる値（12 ビット固定小数点）
+TABLE_ONE = 4096
+
+# 加減速の表: (1 - cos(π t)) / 2 を 0〜4096 で表したもの（t = i / 64）
+EASE = (
+    0, 2, 10, 22, 39, 61, 88, 120, 156, 197, 242, 291, 345, 403, 465, 531,
+    600, 673, 749, 828, 910, 995, 1083, 1172, 1264, 1358, 1453, 1550, 1648, 1747, 1847, 1948,
+    2048, 2148, 2249, 2349, 2448, 2546, 2643, 2738, 2832, 2924, 3013, 3101, 3186, 3268, 3347, 3423,
+    3496, 3565, 3631, 3693, 3751, 3805, 3854, 3899, 3940, 3976, 4008, 4035, 4057, 4074, 4086, 4094,
+    4096,
+)
+
+# 弧の表: sin(π t) を 0〜4096 で表したもの（始点と終点で 0 なので終点の位置は変わらない）
+ARC = (
+    0, 201, 401, 601, 799, 995, 1189, 1380, 1567, 1751, 1931, 2106, 2276, 2440, 2598, 2751,
+    2896, 3035, 3166, 3290, 3406, 3513, 3612, 3703, 3784, 3857, 3920, 3973, 4017, 4052, 4076, 4091,
+    4096, 4091, 4076, 4052, 4017, 3973, 3920, 3857, 3784, 3703, 3612, 3513, 3406, 3290, 3166, 3035,
+    2896, 2751, 2598, 2440, 2276, 2106, 1931, 1751, 1567, 1380, 1189, 995, 799, 601, 401, 201,
+    0,
+)
+
+# 弧のふくらみ bend の 1.0 に当たる値（bend = 64 で移動距離と同じだけ横にふくらむ）
+BEND_ONE = 64
+
+# 1 区間の最小フレーム数（短い移動でも瞬間移動にしない）
+MIN_FRAMES = 4
+
+# HID_FRAME_INTERVAL が 0（ペース配分なし）のときに使うフレーム間隔（秒）
+DEFAULT_FRAME_INTERVAL = 0.008
+
+
+class XorShift16:
+    """16 ビット xorshift 乱数（周期 65535、seed は 0 以外）"""
+
+    def __init__(self, seed):
+        self.state = (seed & 0xFFFF) or 1
+
+    def next(self):
+        """1〜65535 の乱数"""
+        x = self.state
+        x ^= (x << 7) & 0xFFFF
+        x ^= x >> 9
+        x ^= (x << 8) & 0xFFFF
+        self.state = x
+        return x
+
+    def randint(self, low, high):
+        """low 以上 high 以下の整数"""
+        return low + ((self.next() * (high - low + 1)) >> 16)
+
+    def uniform(self, low, high):
+        """low 以上 high 未満の実数"""
+        return low + (high - low) * self.next() / 65536
+
+
+def distance(dx, dy):
+    """移動距離の近似値（平方根を使わない八角形近似、誤差 12% 以内）"""
+    a = abs(dx)
+    b = abs(dy)
+    return a + (b >> 1) if a > b else b + (a >> 1)
+
+
+class MouseMotion:
+    """マウスの移動を区間ごとになめらかな経路で送信する
+
+    hid: cuskey_hid.HidOutput
+    speed: 移動の平均速度（ピクセル/秒）
+    frame_interval: 送信間隔（秒、USB のポーリング間隔）
+    """
+
+    def __init__(self, hid, speed, frame_interval):
+        self.hid = hid
+        self.mouse = hid.mouse
+        self.speed = speed
+        self.frame_interval = frame_interval or DEFAULT_FRAME_INTERVAL
+        self.segments = []  # 予約した区間 [(dx, dy, bend, フレーム数, 開始前の待ち秒数), ...]
+        # 移動中の区間
+        self.dx = 0
+        self.dy = 0
+        self.bend = 0
+        self.frames = 0
+        self.start_time = None  # 区間の開始時刻（None なら区間の開始待ち）
+        self.sent_x = 0  # 区間内で送信済みの位置
+        self.sent_y = 0
+        self.next_time = 0.0  # 次に送信できる時刻
+        # 最後に home() してからの移動量の合計（送信済み）
+        self.offset_x = 0
+        self.offset_y = 0
+
+    def move(self, dx, dy, bend=0, pause=0.0):
+        """(dx, dy) への移動を予約（bend: 弧のふくらみ、正で進行方向の左、pause: 開始前の待ち秒数）"""
+        frames = int(distance(dx, dy) / self.speed / self.frame_interval)
+        if frames < MIN_FRAMES:
+            frames = MIN_FRAMES
+        self.segments.append((dx, dy, bend, frames, pause))
+
+    def home(self):
+        """予約した区間を取り消し、送信済みの移動を打ち消して元の位置へ戻る移動を予約"""
+        self.clear()
+        if self.offset_x or self.offset_y:
+            self.move(-self.offset_x, -self.offset_y)
+
+    def clear(self):
+        """予約した区間と移動中の区間を取り消す（送信済みの分はそのまま）"""
+        self.segments = []
+        self.start_time = None
+        self.frames = 0
+
+    def busy(self):
+        """移動中・移動待ちの区間があるか"""
+        return bool(self.frames or self.segments)
+
+    def _position(self, frame):
+        """区間の開始から frame フレーム目の位置（送信するべき位置）"""
+        # 表の位置を 8 ビットの端数付きで求め、隣の要素と直線補間する
+        p = (frame * TABLE_STEPS << 8) // self.frames
+        i = p >> 8
+        if i >= TABLE_STEPS:
+            return self.dx, self.dy
+        frac = p & 0xFF
+        e = EASE[i] + (((EASE[i + 1] - EASE[i]) * frac) >> 8)
+        a = ARC[i] + (((ARC[i + 1] - ARC[i]) * frac) >> 8)
+        # 進行方向の位置 (dx, dy) * e と、垂直方向 (-dy, dx) * bend * a のふくらみを足す
+        side = self.bend * a
+        x = (self.dx * e * BEND_ONE - self.dy * side) >> 18
+        y = (self.dy * e * BEND_ONE + self.dx * side) >> 18
+        return x, y
+
+    def poll(self, now):
+        """予定時刻になっていれば 1 フレーム分を送信し、次の予定時刻を返す（メインループから毎回呼ぶ）"""
+        if not self.frames:
+            if not self.segments:
+                return None
+            self.dx, self.dy, self.bend, self.frames, pause = self.segments.pop(0)
+            self.start_time = now + pause
+            self.sent_x = 0
+            self.sent_y = 0
+        if now < self.start_time or now < self.next_time:
+            return self.deadline()
+        # マウスのフレームが空いていなければ見送る（位置は時刻から求めるので次のフレームで追いつく）
+        if not self.hid.ready(self.mouse, now):
+            return self.deadline()
+        frame = int((now - self.start_time) / self.frame_interval) + 1
+        if frame > self.frames:
+            frame = self.frames
+        x, y = self._position(frame)
+        step_x = x - self.sent_x
+        step_y = y - self.sent_y
+        if step_x or step_y:
+            self.mouse.move(x=step_x, y=step_y)
+            self.sent_x = x
+            self.sent_y = y
+            self.offset_x += step_x
+            self.offset_y += step_y
+            self.next_time = now + self.frame_interval
+        if frame >= self.frames:
+            self.frames = 0
+        return self.deadline()
+
+    def deadline(self):
+        """次に送信する予定の時刻（区間がなければ None）"""
+        if not self.frames:
+            if not self.segments:
+                return None
+            return self.next_time
+        return max(self.start_time, self.next_time, self.hid.ready_time(self.mouse))
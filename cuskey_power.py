@@ -0,0 +1,128 @@
+"""
+省電力ガバナー
+入力待ちの間は microcontroller.cpu.frequency を段階的に下げ、
+ボタンのエッジや予定された送信時刻で元のクロックに戻す
+設定は cuskey_settings.py で管理
+"""
+
+import time
+
+import cuskey_clock
+
+try:
+    import microcontroller
+except ImportError:
+    microcontroller = None
+
+
+class PowerGovernor:
+    """無操作時間に応じて CPU クロックを下げ、操作時に復帰させるガバナー"""
+
+    def __init__(self, steps, wake_lead=0.0, enabled=True, debug=False, on_sleep=None):
+        # steps: ((無操作秒数, 周波数Hz), ...) を無操作秒数の昇順で指定
+        # on_sleep: フルクロックから下げる直前に時刻を渡して呼ぶ関数（書き込み時刻を過ぎた状態の保存など）
+        self.on_sleep = on_sleep
+        self.steps = tuple(sorted(steps))
+        self.wake_lead = wake_lead
+        self.debug = debug
+        self.enabled = enabled and microcontroller is not None and len(self.steps) > 0
+        self.full_frequency = microcontroller.cpu.frequency if self.enabled else 0
+        self.current_frequency = self.full_frequency
+        self.step = -1  # -1 = フルクロック、0 以上 = steps のインデックス
+        self.last_activity = time.monotonic()
+
+        # 復帰からレポート送信までの遅延計測用
+        self.edge_ns = None
+        self.wake_from = None
+        self.latency_stats = {}  # 周波数 -> [回数, 合計ns, 最大ns]
+
+    def _set_frequency(self, frequency):
+        """CPU クロックを変更（未対応の周波数ならガバナーを無効化）"""
+        try:
+            microcontroller.cpu.frequency = frequency
+        except (AttributeError, NotImplementedError, ValueError) as e:
+            print(f"[WARN] CPU クロックを {frequency}Hz に変更できません: {e} -> 省電力を無効化します")
+            self.enabled = False
+            return False
+        self.current_frequency = frequency
+        return True
+
+    def wake(self):
+        """フルクロックに復帰"""
+        if self.step >= 0:
+            self.step = -1
+            self._set_frequency(self.full_frequency)
+
+    def activity(self, now):
+        """ボタンのエッジを検出したときに呼ぶ（クロック復帰と遅延計測の開始）"""
+        self.last_activity = now
+        if not self.enabled:
+            return
+        if self.wake_from is None:
+            self.wake_from = self.current_frequency
+        self.edge_ns = cuskey_clock.now_ns()
+        self.wake()
+
+    def reported(self):
+        """HID レポートを送信した直後に呼ぶ（復帰からの遅延を記録）"""
+        if self.edge_ns is None:
+            return
+        latency = cuskey_clock.now_ns() - self.edge_ns
+        stats = self.latency_stats.get(self.wake_from)
+        if stats is None:
+            stats = [0, 0, 0]
+            self.latency_stats[self.wake_from] = stats
+        stats[0] += 1
+        stats[1] += latency
+        if latency > stats[2]:
+            stats[2] = latency
+        self.edge_ns = None
+        self.wake_from = None
+
+    def tick(self, now, deadline=None):
+        """メインループから毎回呼ぶ（deadline: 次に送信予定の時刻）"""
+        if not self.enabled:
+            return
+        # 予定された送信時刻が近ければ先にフルクロックへ戻す
+        if deadline is not None and deadline - now <= self.wake_lead:
+            self.last_activity = now
+            self.wake()
+            return
+
+        idle = now - self.last_activity
+        step = -1
+        for i, (idle_time, _) in enumerate(self.steps):
+            if idle >= idle_time:
+                step = i
+        if step > self.step:
+            if self.step < 0 and self.on_sleep is not None:
+                self.on_sleep(now)
+            if self._set_frequency(self.steps[step][1]):
+                self.step = step
+                # レポートを伴わなかったエッジの計測は破棄
+                self.edge_ns = None
+                self.wake_from = None
+                if self.debug:
+                    print(f"[DEBUG] 省電力: {idle:.1f}秒無操作 → CPU {self.current_frequency // 1000000}MHz")
+                    self.report()
+
+    def report(self):
+        """周波数ステップごとの復帰→レポート送信遅延を表示"""
+        if not self.latency_stats:
+            return
+        print("[省電力] 復帰→レポート送信遅延:")
+        for frequency in sorted(self.latency_stats, reverse=True):
+            count, total, worst = self.latency_stats[frequency]
+            print(f"  {frequency // 1000000:4d}MHz: {count}回 平均 {total / count / 1000000:.2f}ms 最大 {worst / 1000000:.2f}ms")
+
+
+def create_governor(settings, features, on_sleep=None):
+    """cuskey_settings の設定からガバナーを生成（無効なら None）"""
+    if not settings.POWER_SAVE_ENABLED:
+        return None
+    return PowerGovernor(
+        settings.POWER_FREQUENCY_STEPS,
+        wake_lead=settings.POWER_WAKE_LEAD,
+        debug=features["debug_enabled"],
+        on_sleep=on_sleep,
+    )
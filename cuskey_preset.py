@@ -0,0 +1,172 @@
+"""
+プリセットストア（microcontroller.nvm）
+ショートカットのプリセット（キーの組み合わせ・表示名・対象アプリ名）を詰めたバイナリを NVM に置き、
+先頭の固定長の索引から番号で直接読み出す（プリセットの数が増えても RAM の使用量は増えない）
+
+バイナリの形式（数値はリトルエンディアン）:
+    0  マジック "CP"（2 バイト）
+    2  形式のバージョン（1 バイト、最上位ビットは DEPLOYED）
+    3  プリセット数 N（1 バイト）
+    4  全体の長さ（2 バイト）
+    6  8 バイト目以降の CRC-16/CCITT（2 バイト）
+    8  索引: N 個のレコード位置（先頭からのオフセット、各 2 バイト）
+    レコード: 名前, キーコード列, ショートカットの表示名, 対象アプリ名（それぞれ 1 バイトの長さ + 本体）
+プリセットのバイナリは tools/gen_presets.py で cuskey_presets.py（IMAGE）として生成する
+tools/cuskey_deploy.py がデータチャンネルで書き込んだものは DEPLOYED 付きで、cuskey_presets.py より優先する
+"""
+
+import gc
+import sys
+
+MAGIC = b"CP"
+VERSION = 1
+HEADER_SIZE = 8
+
+# バージョンに付けるビット（tools/cuskey_deploy.py で書き込んだプリセット）
+DEPLOYED = 0x80
+
+# 生成したバイナリを持つモジュール（NVM へ書き込んだ後は RAM から外す）
+IMAGE_MODULE = "cuskey_presets"
+
+
+def crc16(data, crc=0xFFFF):
+    """CRC-16/CCITT-FALSE"""
+    for byte in data:
+        crc ^= byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) & 0xFFFF if crc & 0x8000 else (crc << 1) & 0xFFFF
+    return crc
+
+
+def _field(data):
+    return bytes((len(data),)) + data
+
+
+def pack(presets, deployed=False):
+    """[(名前, キーコード列, 表示名, 対象アプリ名), ...] をバイナリにする"""
+    records = []
+    for name, keys, label, app_label in presets:
+        records.append(_field(name.encode()) + _field(bytes(keys)) + _field(label.encode())
+                       + _field(app_label.encode()))
+    index = bytearray()
+    offset = HEADER_SIZE + 2 * len(records)
+    for record in records:
+        index += offset.to_bytes(2, "little")
+        offset += len(record)
+    body = bytes(index) + b"".join(records)
+    length = HEADER_SIZE + len(body)
+    if len(records) > 255 or length > 0xFFFF:
+        raise ValueError("プリセットが多すぎます")
+    version = VERSION | DEPLOYED if deployed else VERSION
+    header = MAGIC + bytes((version, len(records))) + length.to_bytes(2, "little") \
+        + crc16(body).to_bytes(2, "little")
+    return header + body
+
+
+class PresetStore:
+    """NVM（または bytes）上のプリセットを番号で読み出す
+
+    buffer: microcontroller.nvm など、offset からプリセットのバイナリが入っているバッファ
+    """
+
+    def __init__(self, buffer, offset=0):
+        self.buffer = buffer
+        self.offset = offset
+        self.count = 0
+        if self.valid():
+            self.count = buffer[offset + 3]
+
+    def _u16(self, position):
+        buffer = self.buffer
+        position += self.offset
+        return buffer[position] | (buffer[position + 1] << 8)
+
+    def valid(self):
+        """マジック・バージョン・CRC が正しいか"""
+        buffer = self.buffer
+        offset = self.offset
+        if len(buffer) < offset + HEADER_SIZE or buffer[offset:offset + 2] != MAGIC \
+                or buffer[offset + 2] & ~DEPLOYED != VERSION:
+            return False
+        length = self._u16(4)
+        if length < HEADER_SIZE or offset + length > len(buffer):
+            return False
+        return crc16(buffer[offset + HEADER_SIZE:offset + length]) == self._u16(6)
+
+    def deployed(self):
+        """tools/cuskey_deploy.py で書き込んだプリセットか"""
+        return self.valid() and bool(self.buffer[self.offset + 2] & DEPLOYED)
+
+    def _record(self, index):
+        """index 番目のレコードの先頭位置（索引から直接求める）"""
+        if not 0 <= index < self.count:
+            raise IndexError("プリセット番号が範囲外です")
+        return self.offset + self._u16(HEADER_SIZE + 2 * index)
+
+    def _read_field(self, position):
+        size = self.buffer[position]
+        return self.buffer[position + 1:position + 1 + size], position + 1 + size
+
+    def name(self, index):
+        """index 番目のプリセット名"""
+        data, _ = self._read_field(self._record(index))
+        return bytes(data).decode()
+
+    def load(self, index):
+        """index 番目のプリセットを (キーコードのタプル, 表示名, 対象アプリ名) で返す"""
+        position = self._record(index)
+        _, position = self._read_field(position)
+        keys, position = self._read_field(position)
+        label, position = self._read_field(position)
+        app_label, _ = self._read_field(position)
+        return tuple(keys), bytes(label).decode(), bytes(app_label).decode()
+
+    def find(self, name):
+        """プリセット名の番号（なければ None）"""
+        encoded = name.encode()
+        for index in range(self.count):
+            data, _ = self._read_field(self._record(index))
+            if data == encoded:
+                return index
+        return None
+
+
+def open_store(settings):
+    """NVM のプリセットストアを開く
+
+    cuskey_presets.py（tools/gen_presets.py で生成）があり、NVM の内容と違えば NVM に書き込む
+    （同じなら書き込まないので、起動のたびにフラッシュを消耗しない）。書き込んだ後はモジュールを RAM から外す
+    NVM に tools/cuskey_deploy.py で書き込んだプリセットがあれば、cuskey_presets.py では上書きしない
+    NVM が使えない・入りきらない環境では生成したバイナリをそのまま使う
+    """
+    try:
+        import microcontroller
+        nvm = microcontroller.nvm
+    except (ImportError, AttributeError):
+        nvm = None
+    offset = settings.NVM_PRESET_OFFSET
+    size = settings.NVM_PRESET_SIZE
+
+    try:
+        image = __import__(IMAGE_MODULE).IMAGE
+    except ImportError:
+        image = None
+
+    if image is not None:
+        if nvm is None or len(image) > size or offset + len(image) > len(nvm):
+            if nvm is not None:
+                print(f"[WARN] プリセット（{len(image)} bytes）が NVM の領域（{size} bytes）に入りません")
+            return PresetStore(image)
+        if PresetStore(nvm, offset).deployed():
+            print("[NVM] 配布されたプリセットを使います（cuskey_presets.py は書き込みません）")
+        elif nvm[offset:offset + len(image)] != image:
+            nvm[offset:offset + len(image)] = image
+            print(f"[NVM] プリセットを書き込みました（{len(image)} bytes）")
+        # 以後は NVM から読むので、生成したモジュールを RAM から外す
+        image = None
+        sys.modules.pop(IMAGE_MODULE, None)
+        gc.collect()
+
+    if nvm is None:
+        return PresetStore(b"")
+    return PresetStore(nvm, offset)
@@ -0,0 +1,24 @@
+"""
+ミュート切り替えショートカットのプリセット（10 件、536 bytes）
+tools/gen_presets.py で生成（直接編集しない）。形式は cuskey_preset を参照
+"""
+
+IMAGE = (
+    b"\x43\x50\x01\x0a\x18\x02\x1e\x34\x1c\x00\x53\x00\x94\x00\xbe\x00\xe7\x00\x1d\x01\x57\x01\x88\x01\xc3\x01\xef\x01\x0b\x73\x6c\x61"
+    b"\x63\x6b\x5f\x6d\x61\x63\x6f\x73\x03\xe3\xe1\x2c\x13\x43\x6f\x6d\x6d\x61\x6e\x64\x2b\x53\x68\x69\x66\x74\x2b\x53\x70\x61\x63\x65"
+    b"\x12\x53\x6c\x61\x63\x6b\x20\x48\x75\x64\x64\x6c\x65\x20\x6d\x61\x63\x4f\x53\x0d\x73\x6c\x61\x63\x6b\x5f\x77\x69\x6e\x64\x6f\x77"
+    b"\x73\x03\xe0\xe1\x2c\x13\x43\x6f\x6e\x74\x72\x6f\x6c\x2b\x53\x68\x69\x66\x74\x2b\x53\x70\x61\x63\x65\x1a\x53\x6c\x61\x63\x6b\x20"
+    b"\x48\x75\x64\x64\x6c\x65\x20\x57\x69\x6e\x64\x6f\x77\x73\x2f\x4c\x69\x6e\x75\x78\x0a\x7a\x6f\x6f\x6d\x5f\x6d\x61\x63\x6f\x73\x03"
+    b"\xe3\xe1\x04\x0f\x43\x6f\x6d\x6d\x61\x6e\x64\x2b\x53\x68\x69\x66\x74\x2b\x41\x0a\x5a\x6f\x6f\x6d\x20\x6d\x61\x63\x4f\x53\x0c\x7a"
+    b"\x6f\x6f\x6d\x5f\x77\x69\x6e\x64\x6f\x77\x73\x02\xe2\x04\x05\x41\x6c\x74\x2b\x41\x12\x5a\x6f\x6f\x6d\x20\x57\x69\x6e\x64\x6f\x77"
+    b"\x73\x2f\x4c\x69\x6e\x75\x78\x0b\x74\x65\x61\x6d\x73\x5f\x6d\x61\x63\x6f\x73\x03\xe3\xe1\x10\x0f\x43\x6f\x6d\x6d\x61\x6e\x64\x2b"
+    b"\x53\x68\x69\x66\x74\x2b\x4d\x15\x4d\x69\x63\x72\x6f\x73\x6f\x66\x74\x20\x54\x65\x61\x6d\x73\x20\x6d\x61\x63\x4f\x53\x0d\x74\x65"
+    b"\x61\x6d\x73\x5f\x77\x69\x6e\x64\x6f\x77\x73\x03\xe0\xe1\x10\x0f\x43\x6f\x6e\x74\x72\x6f\x6c\x2b\x53\x68\x69\x66\x74\x2b\x4d\x17"
+    b"\x4d\x69\x63\x72\x6f\x73\x6f\x66\x74\x20\x54\x65\x61\x6d\x73\x20\x57\x69\x6e\x64\x6f\x77\x73\x11\x67\x6f\x6f\x67\x6c\x65\x5f\x6d"
+    b"\x65\x65\x74\x5f\x6d\x61\x63\x6f\x73\x02\xe3\x07\x09\x43\x6f\x6d\x6d\x61\x6e\x64\x2b\x44\x11\x47\x6f\x6f\x67\x6c\x65\x20\x4d\x65"
+    b"\x65\x74\x20\x6d\x61\x63\x4f\x53\x13\x67\x6f\x6f\x67\x6c\x65\x5f\x6d\x65\x65\x74\x5f\x77\x69\x6e\x64\x6f\x77\x73\x02\xe0\x07\x09"
+    b"\x43\x6f\x6e\x74\x72\x6f\x6c\x2b\x44\x19\x47\x6f\x6f\x67\x6c\x65\x20\x4d\x65\x65\x74\x20\x57\x69\x6e\x64\x6f\x77\x73\x2f\x4c\x69"
+    b"\x6e\x75\x78\x0b\x77\x65\x62\x65\x78\x5f\x6d\x61\x63\x6f\x73\x03\xe3\xe1\x10\x0f\x43\x6f\x6d\x6d\x61\x6e\x64\x2b\x53\x68\x69\x66"
+    b"\x74\x2b\x4d\x0b\x57\x65\x62\x65\x78\x20\x6d\x61\x63\x4f\x53\x0d\x77\x65\x62\x65\x78\x5f\x77\x69\x6e\x64\x6f\x77\x73\x02\xe0\x10"
+    b"\x09\x43\x6f\x6e\x74\x72\x6f\x6c\x2b\x4d\x0d\x57\x65\x62\x65\x78\x20\x57\x69\x6e\x64\x6f\x77\x73"
+)
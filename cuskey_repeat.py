@@ -0,0 +1,73 @@
+"""
+長押し中の連続送信（タイプマティック）
+開始直後に 1 回、初回遅延の後は開始レートから加速しながら最大レートまで速くして繰り返す
+ホイールスクロールや音量変更など、アプリごとの長押しリピートで共通に使う
+"""
+
+# ループが遅れたときに一度に追いつく回数の上限（超えた分は捨てて今の時刻から数え直す）
+MAX_CATCH_UP = 10
+
+
+class Repeater:
+    """長押しリピートのタイミングを計算する
+
+    initial_delay: 1 回目から 2 回目までの時間（秒）
+    start_rate: 2 回目以降の開始レート（回/秒）
+    accel: レートの増加量（回/秒²、0 で一定間隔）
+    max_rate: レートの上限（回/秒）
+    """
+
+    def __init__(self, initial_delay, start_rate, accel=0.0, max_rate=None):
+        self.initial_delay = initial_delay
+        self.start_rate = start_rate
+        self.accel = accel
+        self.max_rate = max_rate if max_rate is not None else start_rate
+        self.active = False
+        self.start_time = 0.0
+        self.next_time = 0.0
+        self.count = 0  # 開始からの送信回数
+
+    def start(self, now):
+        """リピート開始（直後の poll で 1 回目を返す）"""
+        self.active = True
+        self.start_time = now
+        self.next_time = now
+        self.count = 0
+
+    def stop(self):
+        """リピート終了"""
+        self.active = False
+
+    def rate(self, t):
+        """時刻 t のレート（回/秒）"""
+        elapsed = t - self.start_time - self.initial_delay
+        rate = self.start_rate + self.accel * elapsed if elapsed > 0 else self.start_rate
+        return min(rate, self.max_rate)
+
+    def poll(self, now):
+        """now までに送るべき回数を返す（ループごとに呼ぶ）"""
+        if not self.active:
+            return 0
+        steps = 0
+        while now >= self.next_time:
+            steps += 1
+            self.count += 1
+            if self.count == 1:
+                self.next_time += self.initial_delay
+            else:
+                self.next_time += 1.0 / self.rate(self.next_time)
+            if steps >= MAX_CATCH_UP:
+                if now >= self.next_time:
+                    self.next_time = now + 1.0 / self.rate(now)
+                break
+        return steps
+
+    def deadline(self):
+        """次に送る予定の時刻（動作中でなければ None）"""
+        return self.next_time if self.active else None
+
+
+def create_repeater(settings, name):
+    """cuskey_settings.REPEAT_SETTINGS の設定からリピーターを生成"""
+    initial_delay, start_rate, accel, max_rate = settings.REPEAT_SETTINGS[name]
+    return Repeater(initial_delay, start_rate, accel, max_rate)
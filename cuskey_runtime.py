@@ -0,0 +1,531 @@
+"""
+cuskey 共通ランタイム
+ピン初期化・HID 出力・アプリの読み込みとメインループを共通化
+examples/ の各スクリプトは App クラスとしてこのランタイム上で動作する
+"""
+
+import gc
+import os
+import sys
+import time
+import digitalio
+
+# ボード設定をインポート
+import cuskey_settings
+import cuskey_clock
+import cuskey_config
+import cuskey_hid
+import cuskey_input
+
+# cuskey_link・cuskey_power・cuskey_state・cuskey_trace・cuskey_tuning は、設定で有効なときだけ読み込む
+# （無効な機能はモジュールごと RAM に置かない。Context・AppHost の属性は None になる）
+
+# アプリを格納しているパッケージ（CIRCUITPY にコピーした examples/ フォルダ）
+APP_PACKAGE = "examples"
+
+# 統合ファームウェアで選択できるアプリ
+APP_NAMES = (
+    "auto_keysend",
+    "meeting_controller",
+    "pin_sender",
+    "ptt_key",
+    "random_mouse",
+    "youtube_controller",
+)
+
+
+def _mem_free():
+    """空きヒープ量を返す（gc.mem_free が無い環境では None）"""
+    try:
+        return gc.mem_free()
+    except AttributeError:
+        return None
+
+
+def _exists(path):
+    """ファイルがあるか"""
+    try:
+        os.stat(path)
+    except OSError:
+        return False
+    return True
+
+
+def _gnd_pin(pin):
+    """GND 用の出力ピンを Low に設定して返す"""
+    gnd = digitalio.DigitalInOut(pin)
+    gnd.direction = digitalio.Direction.OUTPUT
+    gnd.value = False  # GND（Low）に設定
+    return gnd
+
+
+def _input_pin(pin):
+    """プルアップ入力ピンを設定して返す"""
+    io = digitalio.DigitalInOut(pin)
+    io.direction = digitalio.Direction.INPUT
+    io.pull = digitalio.Pull.UP
+    return io
+
+
+class Hardware:
+    """ボタンとモードスイッチのピンを初期化して保持する"""
+
+    def __init__(self, pins, features):
+        # モード切替用GNDピンの設定
+        self.mode_gnd = _gnd_pin(pins["mode_gnd"]) if pins["mode_gnd"] else None
+        # MODE_A ピンの設定
+        self.mode_a = _input_pin(pins["mode_a"])
+        # MODE_B ピンの設定（使用する場合）
+        self.mode_b = None
+        if features["dual_mode"] and pins["mode_b"]:
+            self.mode_b = _input_pin(pins["mode_b"])
+
+        # ボタン用GNDピンの設定
+        self.button_gnd = _gnd_pin(pins["button_gnd"]) if pins["button_gnd"] else None
+        # ボタン入力ピンの設定
+        self.button = _input_pin(pins["button"])
+
+
+class Context:
+    """アプリに渡す実行環境（ピン・HID 出力・ボード設定・省電力ガバナー・トレース記録・状態の保存・配布設定・調整値ファイル）
+
+    省電力ガバナー・トレース記録・状態の保存・調整値ファイルは、設定で無効なら None
+    """
+
+    def __init__(self):
+        self.settings = cuskey_settings
+        self.pins = cuskey_settings.get_pins()
+        self.features = cuskey_settings.get_features()
+        self.board_name = cuskey_settings.get_board_name()
+        self.hw = Hardware(self.pins, self.features)
+        self.debouncer = cuskey_input.create_debouncer(cuskey_settings)
+        self.state = None
+        if cuskey_settings.STATE_SAVE_ENABLED:
+            import cuskey_state
+            self.state = cuskey_state.create_store(cuskey_settings, self.features)
+        self.governor = None
+        if cuskey_settings.POWER_SAVE_ENABLED:
+            import cuskey_power
+            on_sleep = self.state.poll if self.state is not None else None
+            self.governor = cuskey_power.create_governor(cuskey_settings, self.features, on_sleep)
+        on_report = self.governor.reported if self.governor is not None else None
+        self.hid = cuskey_hid.create_output(cuskey_settings, on_report)
+        self.trace = None
+        if cuskey_settings.TRACE_ENABLED:
+            import cuskey_trace
+            self.trace = cuskey_trace.create_recorder(cuskey_settings)
+        self.config = cuskey_config.open_store(cuskey_settings)
+        # 調整値ファイルは起動時にあるときだけ監視する（後から作ったときは自動リロードで再起動する）
+        self.tuning = None
+        if cuskey_settings.TUNING_FILE is not None and _exists(cuskey_settings.TUNING_FILE):
+            import cuskey_tuning
+            self.tuning = cuskey_tuning.create_watcher(cuskey_settings)
+
+    def read_mode(self):
+        """モードスイッチの状態を返す（False=Mode A, True=Mode B）"""
+        return self.hw.mode_a.value
+
+
+class App:
+    """アプリの共通インターフェース（必要なメソッドだけ上書きする）"""
+
+    # 起動メッセージなどで使うアプリ名
+    TITLE = ""
+
+    # examples/ のファイル名（cuskey_settings.APP_SETTINGS の検索に使う）
+    NAME = None
+
+    # 使う HID デバイス（cuskey_hid.HidOutput の属性名。tools/gen_boot.py が boot.py で有効にするデバイスを決める）
+    HID_DEVICES = ()
+
+    # メインループの待機時間（秒）
+    loop_delay = cuskey_settings.LOOP_DELAY
+
+    def __init__(self, ctx):
+        self.ctx = ctx
+        self.features = ctx.features
+        self.debug = ctx.features["debug_enabled"]
+
+    def banner(self):
+        """起動メッセージを表示"""
+        print(f"=== {self.ctx.board_name} {self.TITLE}起動 ===")
+        print(f"ボードタイプ: {cuskey_settings.BOARD_TYPE}")
+        print(f"デバッグモード: {self.debug}")
+
+    def on_press(self, now):
+        """ボタンが押された瞬間（High → Low）"""
+
+    def on_hold(self, now):
+        """ボタンが押されている間、ループごと"""
+
+    def on_release(self, now):
+        """ボタンが離された瞬間（Low → High）"""
+
+    def tick(self, now):
+        """ループごとに呼ばれる（次に送信予定の時刻があれば返す）"""
+        return None
+
+    def settings_changed(self, names):
+        """調整値ファイルでモジュールの定数が変わったとき（names: 変わった定数名のリスト）
+
+        定数は呼び出し前にモジュールへ反映済み。__init__ で読み込んで保持している値があれば更新する
+        """
+
+    def deinit(self):
+        """アプリ終了時の後片付け（押しっぱなしのキーを離す）"""
+        self.ctx.hid.release_all()
+
+
+def load_app(name):
+    """アプリモジュールを読み込んで App クラスを返す"""
+    if name not in APP_NAMES:
+        raise ValueError(f"不明なアプリ: {name}")
+    module_name = APP_PACKAGE + "." + name
+    __import__(module_name)
+    module = sys.modules[module_name]
+    apply_app_settings(module, name)
+    return module.App
+
+
+def apply_app_settings(module, name):
+    """cuskey_settings.APP_SETTINGS のアプリ別の値でモジュールの定数を上書き"""
+    for key, value in cuskey_settings.APP_SETTINGS.get(name, {}).items():
+        if not hasattr(module, key):
+            print(f"[WARN] APP_SETTINGS: {name} に {key} はありません")
+            continue
+        setattr(module, key, value)
+
+
+def unload_app(name):
+    """アプリモジュールを sys.modules から外してメモリを解放"""
+    module_name = APP_PACKAGE + "." + name
+    if module_name in sys.modules:
+        del sys.modules[module_name]
+    package = sys.modules.get(APP_PACKAGE)
+    if package is not None and hasattr(package, name):
+        try:
+            delattr(package, name)
+        except (AttributeError, TypeError):
+            pass
+    gc.collect()
+
+
+def select_app(ctx, default, at_boot=True):
+    """起動時にボタンが押されていればアプリ選択モード（離したアプリを選択）
+
+    起動時に Mode B でボタンを押していた場合は、boot.py（tools/gen_boot.py）のセットアップモードの操作なので
+    アプリは選ばず、ボタンを離すのを待って default を返す
+    """
+    button = ctx.hw.button
+    if button.value:
+        return default
+
+    if at_boot and ctx.read_mode():
+        print("【セットアップモード】ボタンを離すとアプリが起動します")
+        while not button.value:
+            time.sleep(cuskey_settings.LOOP_DELAY)
+        time.sleep(cuskey_settings.DEBOUNCE_TIME)
+        return default
+
+    # 2 つ指定（タプル）の場合は 1 番目から選び始め、そのまま離せば元の組み合わせで起動
+    first = default if isinstance(default, str) else default[0]
+    index = APP_NAMES.index(first) if first in APP_NAMES else 0
+    print("【アプリ選択】押している間アプリが切り替わります。離すと決定")
+    print(f"  → {first if isinstance(default, str) else ' + '.join(default)}")
+    last_step_time = time.monotonic()
+    while not button.value:
+        now = time.monotonic()
+        if now - last_step_time >= cuskey_settings.APP_SELECT_INTERVAL:
+            index = (index + 1) % len(APP_NAMES)
+            last_step_time = now
+            print(f"  → {APP_NAMES[index]}")
+        time.sleep(cuskey_settings.LOOP_DELAY)
+
+    # チャタリング防止のため少し待機
+    time.sleep(cuskey_settings.DEBOUNCE_TIME)
+    if APP_NAMES[index] == first:
+        return default
+    return APP_NAMES[index]
+
+
+class AppHost:
+    """読み込んだアプリを 1 つのメインループで動かす
+
+    アプリを複数指定した場合は、ボタン入力をモードスイッチで振り分ける
+    （Mode A → 1 番目、Mode B → 2 番目）。前面にないアプリの tick も毎回呼ぶため、
+    自動送信などのタイマーはバックグラウンドでも動き続ける
+    """
+
+    def __init__(self, ctx):
+        self.ctx = ctx
+        self.names = ()
+        self.apps = []
+        # アプリごとの tick 計測 [回数, 合計ns, 最大ns]
+        self.tick_stats = []
+        self.last_stats_time = time.monotonic()
+        # 設定・問い合わせ用のデータチャンネル（無効なら None）
+        self.link = None
+        if cuskey_settings.LINK_ENABLED:
+            import cuskey_link
+            self.link = cuskey_link.create_link(cuskey_settings, self)
+        # tick の所要時間は、表示するデバッグモード・問い合わせに答えるデータチャンネルのときだけ測る
+        self.now_ns = None
+        if ctx.features["debug_enabled"] or self.link is not None:
+            self.now_ns = cuskey_clock.now_ns
+
+    def start(self, names):
+        """アプリを読み込んで起動メッセージを表示（names: アプリ名またはそのタプル）"""
+        if isinstance(names, str):
+            names = (names,)
+        self.names = tuple(names)
+        for name in self.names:
+            app_class = load_app(name)
+            module = sys.modules[app_class.__module__]
+            # APP_SETTINGS < 配布設定 < 調整値ファイル の順に上書き
+            self.ctx.config.apply(name, module)
+            if self.ctx.tuning is not None:
+                self.ctx.tuning.attach(name, module)
+            self.add(app_class(self.ctx))
+            if self.ctx.features["debug_enabled"]:
+                print(f"[DEBUG] アプリ読み込み: {name}（空きメモリ: {_mem_free()}）")
+        for app in self.apps:
+            app.banner()
+        if len(self.apps) > 1:
+            print("【ボタンの割り当て】")
+            print(f"  Mode A（スイッチON）: {self.apps[0].TITLE}")
+            print(f"  Mode B（スイッチOFF）: {self.apps[1].TITLE}")
+            print("-" * 50)
+
+    def add(self, app):
+        """生成済みのアプリを追加"""
+        self.apps.append(app)
+        self.tick_stats.append([0, 0, 0])
+
+    def stop(self):
+        """読み込んだアプリを終了してモジュールを解放"""
+        for app in self.apps:
+            app.deinit()
+        # 終了したアプリの状態を保存
+        if self.ctx.state is not None:
+            self.ctx.state.flush()
+        self.apps = []
+        self.tick_stats = []
+        for name in self.names:
+            if self.ctx.tuning is not None:
+                self.ctx.tuning.detach(name)
+            unload_app(name)
+        self.names = ()
+
+    def switch(self, names):
+        """現在のアプリを終了・解放してから別のアプリを起動"""
+        self.stop()
+        self.start(names)
+
+    def run(self, names):
+        """アプリを起動してメインループを回す"""
+        self.switch(names)
+        self.loop()
+
+    def set_constant(self, name, key, value):
+        """動作中のアプリ name のモジュールの定数 key を value に変更（アプリがなければ False）"""
+        for app in self.apps:
+            if app.NAME != name:
+                continue
+            module = sys.modules[type(app).__module__]
+            if not hasattr(module, key):
+                return False
+            setattr(module, key, value)
+            app.settings_changed([key])
+            return True
+        return False
+
+    def config_changed(self):
+        """配布設定が書き換えられたら、動作中のアプリの定数に反映（調整値ファイルで上書き中の定数は除く）"""
+        ctx = self.ctx
+        ctx.config.reload()
+        for app in self.apps:
+            module = sys.modules[type(app).__module__]
+            exclude = ctx.tuning.applied.get(app.NAME, {}) if ctx.tuning is not None else ()
+            changed = ctx.config.apply(app.NAME, module, exclude)
+            if changed:
+                for key in changed:
+                    print(f"[設定] {app.NAME}.{key} = {getattr(module, key)!r}（配布設定）")
+                app.settings_changed(changed)
+
+    def foreground(self):
+        """ボタン入力を受け取るアプリを返す"""
+        if len(self.apps) > 1 and self.ctx.read_mode():
+            return self.apps[1]
+        return self.apps[0]
+
+    def tick_all(self, now):
+        """全アプリの tick を呼び、最も近い送信予定時刻を返す"""
+        deadline = None
+        stats = self.tick_stats
+        now_ns = self.now_ns
+        for i, app in enumerate(self.apps):
+            if now_ns is None:
+                app_deadline = app.tick(now)
+            else:
+                start_ns = now_ns()
+                app_deadline = app.tick(now)
+                elapsed = now_ns() - start_ns
+                app_stats = stats[i]
+                app_stats[0] += 1
+                app_stats[1] += elapsed
+                if elapsed > app_stats[2]:
+                    app_stats[2] = elapsed
+            if app_deadline is not None and (deadline is None or app_deadline < deadline):
+                deadline = app_deadline
+        return deadline
+
+    def report(self):
+        """アプリごとの tick 所要時間（平均・最大）を表示"""
+        budget_ns = cuskey_settings.APP_TICK_BUDGET_US * 1000
+        print("[アプリ] tick 所要時間:")
+        for app, (count, total, worst) in zip(self.apps, self.tick_stats):
+            if count == 0:
+                continue
+            over = " ※予算超過" if worst > budget_ns else ""
+            print(f"  {app.TITLE}: 平均 {total / count / 1000:.1f}us 最大 {worst / 1000:.1f}us（{count}回）{over}")
+        self.ctx.hid.report()
+
+    def loop(self):
+        """メインループ"""
+        ctx = self.ctx
+        button = ctx.hw.button
+        governor = ctx.governor
+        state = ctx.state
+        trace = ctx.trace
+        tuning = ctx.tuning
+        link = self.link
+        debouncer = ctx.debouncer
+        debug = ctx.features["debug_enabled"]
+        switch_hold_time = cuskey_settings.APP_SWITCH_HOLD_TIME
+        stats_interval = cuskey_settings.APP_STATS_INTERVAL
+        last_button_state = True  # プルアップなので通常はTrue
+        press_time = None
+        pressed_app = None  # 押下を受け取ったアプリ（離すまで固定）
+        hid = ctx.hid
+        usb_pending = debug  # デバッグモード: USB 接続までの時間を 1 回だけ表示
+        first_report_pending = debug  # デバッグモード: 最初のレポート送信までの時間を 1 回だけ表示
+
+        while True:
+            now = time.monotonic()
+
+            # ボタンの現在の状態を読み取り
+            raw_button_state = button.value
+
+            # トレース記録（有効な場合のみ）
+            if trace is not None:
+                trace.sample(raw_button_state, ctx.read_mode())
+                trace.poll_command()
+
+            # チャタリング・ノイズ除去
+            current_button_state = debouncer.update(raw_button_state, now)
+
+            # ボタンが押された瞬間を検出（High → Low）
+            if last_button_state and not current_button_state:
+                if governor is not None:
+                    governor.activity(now)
+                press_time = now
+                pressed_app = self.foreground()
+                pressed_app.on_press(now)
+
+            # ボタンが離された瞬間を検出（Low → High）
+            elif not last_button_state and current_button_state:
+                if governor is not None:
+                    governor.activity(now)
+                press_time = None
+                if pressed_app is not None:
+                    pressed_app.on_release(now)
+                    pressed_app = None
+
+            # ボタンが押されている間の処理
+            elif not current_button_state and pressed_app is not None:
+                pressed_app.on_hold(now)
+                # 長時間押し続けたら動作中のアプリ選択（単一アプリの場合のみ）
+                if switch_hold_time is not None and len(self.names) == 1 \
+                        and press_time is not None and now - press_time >= switch_hold_time:
+                    press_time = None
+                    pressed_app = None
+                    current_name = self.names[0]
+                    self.stop()
+                    self.start(select_app(ctx, current_name, at_boot=False))
+                    last_button_state = True
+                    continue
+
+            # 前回の状態を更新
+            last_button_state = current_button_state
+
+            # 全アプリのタイマー処理（前面にないアプリも含む）
+            deadline = self.tick_all(now)
+
+            # データチャンネルのコマンドを処理（届いた分だけ解析）
+            if link is not None:
+                link.poll(now)
+                link_deadline = link.tick(now)
+                if link_deadline is not None and (deadline is None or link_deadline < deadline):
+                    deadline = link_deadline
+
+            # キューにためていた HID 操作を送信（USB 接続待ち・再送待ち・フレーム待ち）
+            if hid.queue:
+                hid.flush()
+                hid_deadline = hid.deadline()
+                if hid_deadline is not None and (deadline is None or hid_deadline < deadline):
+                    deadline = hid_deadline
+
+            # 状態の変更がたまっていれば NVM に書き込み、調整値ファイルの変更を反映する
+            # （ボタンを押している間は行わない）
+            if pressed_app is None:
+                if state is not None:
+                    state.poll(now)
+                if tuning is not None:
+                    changed = tuning.poll(now)
+                    if changed:
+                        for app in self.apps:
+                            if app.NAME in changed:
+                                app.settings_changed(changed[app.NAME])
+
+            # 無操作が続いていれば CPU クロックを下げる
+            if governor is not None:
+                governor.tick(time.monotonic(), deadline)
+
+            # デバッグモード: ホストのエニュメレーション完了（USB 接続）までの時間と空きメモリ
+            # （time.monotonic は電源投入からの時間なので、リセット直後の値だけが目安になる）
+            if usb_pending and cuskey_hid.usb_connected():
+                usb_pending = False
+                print(f"[USB] 接続: 起動から {int(now * 1000)} ms / 空きメモリ: {_mem_free()} bytes")
+            if first_report_pending and hid.first_report_time is not None:
+                first_report_pending = False
+                print(f"[USB] 最初のレポート送信: 起動から {int(hid.first_report_time * 1000)} ms"
+                      f"（接続待ちで保留した操作: {hid.queued_total}件）")
+
+            # デバッグモード: tick 所要時間を定期的に表示
+            if debug and stats_interval and now - self.last_stats_time >= stats_interval:
+                self.report()
+                self.last_stats_time = now
+
+            # CPU負荷軽減のため短時間待機（HID のフレーム待ちがあれば、そのフレームで送れるよう早めに戻る）
+            delay = self.apps[0].loop_delay
+            if hid.queue:
+                wait = hid.deadline() - time.monotonic()
+                if wait < delay:
+                    delay = max(wait, 0.0)
+            time.sleep(delay)
+
+
+def run(app_class):
+    """単体スクリプト（examples/ を code.py としてコピーした場合）の実行"""
+    ctx = Context()
+    if app_class.NAME:
+        module = sys.modules[app_class.__module__]
+        apply_app_settings(module, app_class.NAME)
+        ctx.config.apply(app_class.NAME, module)
+        if ctx.tuning is not None:
+            ctx.tuning.attach(app_class.NAME, module)
+    app = app_class(ctx)
+    app.banner()
+    host = AppHost(ctx)
+    host.add(app)
+    host.loop()
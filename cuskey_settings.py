@@ -11,18 +11,158 @@ BOARD_TYPE = "PinPat4"  # 使用するボードをここで指定
 # デバッグモードの有効/無効
 DEBUG_MODE = True  # デバッグ出力を有効にする場合はTrue
 
+# メッセージカタログ（tools/strip_messages.py で文字列を取り除いたビルドの表示文、None で番号だけ表示）
+# 通常のビルドでは使わない
+MESSAGE_CATALOG = "/cuskey_catalog.bin"
+
 # 長押し判定の閾値（秒）
 LONG_PRESS_THRESHOLD = 1.0
 
-# チャタリング防止の待機時間（秒）
+# チャタリング防止: ボタンの状態が変わってからこの時間（秒）は次の変化を無視（メインループは止めない）
 DEBOUNCE_TIME = 0.05
 
+# ボタンのピン値がこの時間（秒）変化しなかったら状態を確定（0 で無効）
+# DEBOUNCE_TIME では取り切れない接点バウンスやノイズを除去する
+DEBOUNCE_STABLE_TIME = 0.0
+
 # CPUサイクル待機時間（秒）
 LOOP_DELAY = 0.01
 
 # デバッグカウンターの閾値（約1秒ごとに表示）
 DEBUG_COUNTER_THRESHOLD = 100
 
+# code.py（統合ファームウェア）で起動するアプリ
+# examples/ のファイル名から .py を除いたものを指定
+# 例: "auto_keysend", "meeting_controller", "pin_sender",
+#     "ptt_key", "random_mouse", "youtube_controller"
+# タプルで 2 つ指定すると同時に動作し、ボタンは Mode A → 1 番目、Mode B → 2 番目に割り当て
+# 例: APP = ("meeting_controller", "auto_keysend")
+APP = "youtube_controller"
+
+# 起動時にモードスイッチを Mode A にしてボタンを押したままにするとアプリ選択モード
+# （Mode B で押したまま起動すると、tools/gen_boot.py で生成した boot.py のセットアップモード）
+# 押している間この間隔（秒）で次のアプリに切り替わり、離したアプリを起動
+# APP がタプルのときは 1 番目から始まり、切り替わる前に離せば 2 つとも起動
+APP_SELECT_INTERVAL = 1.0
+
+# 動作中にこの秒数ボタンを押し続けるとアプリ選択モード（None で無効）
+APP_SWITCH_HOLD_TIME = None
+
+# 長押し中の連続送信（リピート）の設定
+# (初回遅延 秒, 開始レート 回/秒, 加速 回/秒², 最大レート 回/秒)
+# 長押しを検出した時点で 1 回送り、初回遅延の後は開始レートから加速して最大レートまで速くなる
+# 加速を 0 にすると開始レートの一定間隔（短い長押しでは 1 回だけ送られる）
+REPEAT_SETTINGS = {
+    "wheel": (0.15, 20.0, 40.0, 80.0),    # ptt_key（Mode B）のホイールスクロール
+    "volume": (0.3, 10.0, 15.0, 40.0),    # meeting_controller の音量変更
+    "arrow": (0.1, 10.0, 0.0, 10.0),      # auto_keysend の手動送信
+}
+
+# アプリごとの定数の上書き（examples/ の各ファイル先頭の設定値）
+# tools/tune_thresholds.py が出力する推奨値をここに貼り付ける
+# 例: APP_SETTINGS = {"ptt_key": {"DOUBLE_CLICK_TIME": 0.25, "LONG_PRESS_TIME": 0.35}}
+APP_SETTINGS = {}
+
+# アプリの定数を上書きする調整値ファイル（JSON、形式は APP_SETTINGS と同じ。None で無効）
+# 例: {"ptt_key": {"LONG_PRESS_TIME": 0.35}, "pin_sender": {"PIN_MODE_A": "1234"}}
+# ファイルがあると CircuitPython の自動リロードを止め、書き換えは再起動せずに動作中のアプリに反映する
+# （code.py・cuskey_settings.py・動作中のアプリのファイルを書き換えたときは再起動）
+TUNING_FILE = "/cuskey_tuning.json"
+
+# 調整値ファイルの更新を確認する間隔（秒）
+TUNING_CHECK_INTERVAL = 1.0
+
+# 設定・問い合わせ用のデータチャンネル（cuskey_link、2 つ目の USB シリアル usb_cdc.data）
+# 定数の変更・プリセットの選択・マクロの送信・統計やトレースの読み出しを PC から行う（tools/linkctl.py）
+# 設定ファイルの一括書き込み（tools/cuskey_deploy.py）もこのチャンネルを使う
+# boot.py で usb_cdc.enable(data=True) が必要（tools/gen_boot.py --link で生成）
+LINK_ENABLED = False
+
+# データチャンネルから 1 回のループで読むバイト数の上限（大きくすると 1 回のループが長くなる）
+LINK_CHUNK = 64
+
+# アプリ 1 つあたりの tick 所要時間の目安（マイクロ秒）。超えるとデバッグ表示で警告
+APP_TICK_BUDGET_US = 500
+
+# デバッグモードで tick 所要時間を表示する間隔（秒、None で表示しない）
+APP_STATS_INTERVAL = 60
+
+# 入力トレース記録の有効/無効（ピン変化を RAM に記録）
+# シリアルで t を送ると出力、w でファイル保存、c で消去
+TRACE_ENABLED = False
+
+# トレースのリングバッファに保持するピン変化の件数
+TRACE_SIZE = 512
+
+# トレースの保存先（CIRCUITPY を書き込み可能にした場合のみ。None でファイル保存しない）
+TRACE_FILE = "/trace.csv"
+
+# HID 送信キュー（USB 接続待ち・ホストのスリープ中や送信失敗時に操作をためて再送）
+# キューに保持する操作の上限（超えた分は破棄。キーやボタンを離す操作は常に保持）
+HID_QUEUE_SIZE = 32
+
+# この秒数より古い操作は送信せずに破棄（キーやボタンを離す操作を除く、None で無期限）
+HID_QUEUE_MAX_AGE = 5.0
+
+# 送信失敗（OSError）時の最初の再送間隔（秒）。失敗が続くと倍々に延ばし、上限は HID_RETRY_MAX_DELAY
+HID_RETRY_DELAY = 0.02
+HID_RETRY_MAX_DELAY = 1.0
+
+# USB HID エンドポイントのポーリング間隔（秒、CircuitPython の既定は 8ms）
+# デバイスごとに 1 フレーム 1 レポートまでに抑え、間に合わない操作はキューに入れて次のフレームで送る
+# （マウス移動・ホイール・音量は次のフレームにまとめる）
+# 0 でペース配分しない
+HID_FRAME_INTERVAL = 0.008
+
+# 文字列入力（cuskey_macro）に使うキーボード配列（"us" / "jis"）
+# ホスト OS のキーボード設定に合わせる（配列表は tools/gen_layouts.py で生成）
+KEYBOARD_LAYOUT = "us"
+
+# 文字列入力の速さ（文字/秒）。1 文字に 2 フレーム（押す・離す）とループ 1 回を使うので、
+# LOOP_DELAY 0.01 秒では上限は約 50 文字/秒
+# ホスト側で文字が抜ける場合は下げる（tools/typing_bench.py で確認）
+TYPING_RATE = 20
+
+# マクロライブラリ（tools/gen_macros.py で生成、長い定型文などを名前で再生。None で無効）
+# 再生中は MACRO_STREAM_BUFFER バイトのバッファに少しずつ読み込むので、マクロが長くてもメモリは増えない
+MACRO_LIBRARY = "/cuskey_macros.bin"
+MACRO_STREAM_BUFFER = 128
+
+# microcontroller.nvm（RP2040 は 4096 bytes）の使い方
+# プリセットストア（cuskey_preset、tools/gen_presets.py で生成したバイナリ）の位置と大きさ（bytes）
+NVM_PRESET_OFFSET = 0
+NVM_PRESET_SIZE = 1024
+
+# 配布設定（cuskey_config、tools/cuskey_deploy.py がデータチャンネルで書き込むアプリの定数・マクロ）の位置と大きさ（bytes）
+NVM_CONFIG_OFFSET = 1024
+NVM_CONFIG_SIZE = 1024
+
+# 状態の保存（cuskey_state、auto_keysend の送信回数や ON/OFF などを NVM に保存して再起動後に復元）
+# フラッシュに書き込むので既定では無効（使う場合は True）
+STATE_SAVE_ENABLED = False
+
+# 状態の保存に使う NVM の位置と大きさ（bytes、64 bytes のレコードを順番に使うリング）
+NVM_STATE_OFFSET = 2048
+NVM_STATE_SIZE = 2048
+
+# 変更してから NVM に書き込むまでの秒数（この間の変更はまとめて 1 回で書き込む）
+# 消去済みの位置に追記し、セクタの消去は 32 回に 1 回だけだが、短くしすぎない
+# （この秒数を過ぎていれば、無操作で CPU クロックを下げる前に書き込む）
+STATE_FLUSH_INTERVAL = 300
+
+# 省電力ガバナーの有効/無効（無操作時に CPU クロックを下げる）
+POWER_SAVE_ENABLED = False
+
+# 無操作時間（秒）と切り替える CPU クロック（Hz）の組
+# 無操作時間が長くなるほど低いクロックに段階的に切り替える
+POWER_FREQUENCY_STEPS = (
+    (5.0, 48000000),
+    (30.0, 18000000),
+)
+
+# 予定された送信時刻の何秒前にフルクロックへ戻すか
+POWER_WAKE_LEAD = 0.05
+
 # ボード固有のピン設定
 BOARD_CONFIGS = {
     "PinPat4": {
@@ -0,0 +1,179 @@
+"""
+状態の保存（microcontroller.nvm）
+カウンターや ON/OFF などの小さな整数を RAM に持ち、変更があったものをまとめて NVM に書き込む
+（変更のたびには書き込まない）。書き込みは領域内を固定長のレコードで順番に使うリングで、
+起動時は CRC が正しく通し番号が最も新しいレコードから復元する
+
+RP2040 の NVM はフラッシュの 1 セクタ（4096 bytes）。CircuitPython の nvm は、書き込み先がすべて 0xFF
+（消去済み）ならセクタを消去せずにページ単位で書き込み、そうでなければセクタ全体を消去して書き直す。
+そこでレコードは消去済みのスロットに順に追記し、リングが一周したときだけ領域全体を 1 回で書き直す
+（新しいレコードを先頭に置き、残りのスロットを 0xFF にする）。セクタの消去は SLOTS 回の書き込みに 1 回で済む
+追記は前のレコードに触れないので、書き込み中の電源断で最新のレコードが壊れても 1 つ前のレコードから復元する
+
+レコードの形式（RECORD_SIZE バイト、数値はリトルエンディアン）:
+    0  マジック（1 バイト）
+    1  値の数 N（1 バイト）
+    2  通し番号（4 バイト）
+    6  値: N 個の (名前の CRC-16（2 バイト）, 値（符号付き 4 バイト）)
+    末尾 2 バイト: それより前の CRC-16/CCITT
+"""
+
+import cuskey_clock
+from cuskey_preset import crc16
+
+MAGIC = 0xC5
+RECORD_SIZE = 64
+HEADER_SIZE = 6
+ENTRY_SIZE = 6
+
+# 1 レコードに入る値の数
+MAX_ENTRIES = (RECORD_SIZE - HEADER_SIZE - 2) // ENTRY_SIZE
+
+# 消去済みのスロットの内容
+ERASED = b"\xff" * RECORD_SIZE
+
+
+def _key(name):
+    """値の名前をレコードに入れる 2 バイトの ID にする"""
+    return crc16(name.encode())
+
+
+class StateStore:
+    """NVM のリングに整数の状態を保存・復元する
+
+    buffer: microcontroller.nvm（None なら保存せず RAM だけで持つ）
+    offset, size: リングに使う NVM の範囲（bytes）
+    flush_interval: 変更してから書き込むまでの秒数（この間の変更はまとめて 1 回で書き込む）
+    """
+
+    def __init__(self, buffer, offset, size, flush_interval, debug=False):
+        self.buffer = buffer
+        self.offset = offset
+        self.slots = size // RECORD_SIZE if buffer is not None else 0
+        self.flush_interval = flush_interval
+        self.debug = debug
+        self.values = {}  # 名前の ID -> 値
+        self.dirty_since = None  # 保存していない変更を最初にした時刻
+        self.seq = 0  # 最後に書き込んだ（読み込んだ）レコードの通し番号
+        self.slot = -1  # 最後に書き込んだ（読み込んだ）レコードの位置
+        self.record = bytearray(RECORD_SIZE)
+        self.writes = 0
+        self.erases = 0  # 一周して領域全体を書き直した回数（セクタの消去を伴う書き込み）
+        self.load()
+
+    def _read(self, slot):
+        """slot 番目のレコードを (通し番号, {ID: 値}) で返す（壊れていれば None）"""
+        buffer = self.buffer
+        start = self.offset + slot * RECORD_SIZE
+        if buffer[start] != MAGIC:
+            return None
+        count = buffer[start + 1]
+        if count > MAX_ENTRIES:
+            return None
+        data = buffer[start:start + RECORD_SIZE]
+        if crc16(data[:RECORD_SIZE - 2]) != data[RECORD_SIZE - 2] | (data[RECORD_SIZE - 1] << 8):
+            return None
+        values = {}
+        position = HEADER_SIZE
+        for _ in range(count):
+            key = data[position] | (data[position + 1] << 8)
+            values[key] = int.from_bytes(data[position + 2:position + 6], "little")
+            if values[key] >= 0x80000000:
+                values[key] -= 0x100000000
+            position += ENTRY_SIZE
+        return int.from_bytes(data[2:6], "little"), values
+
+    def _erased(self, slot):
+        """slot 番目のスロットが消去済み（すべて 0xFF）か"""
+        start = self.offset + slot * RECORD_SIZE
+        return self.buffer[start:start + RECORD_SIZE] == ERASED
+
+    def load(self):
+        """リングから最も新しい正しいレコードを読み込む（起動時に 1 回）"""
+        for slot in range(self.slots):
+            record = self._read(slot)
+            if record is not None and (self.slot < 0 or record[0] > self.seq):
+                self.seq, self.values = record
+                self.slot = slot
+        if self.debug and self.slot >= 0:
+            print(f"[NVM] 状態を復元しました（通し番号 {self.seq}、{len(self.values)} 件）")
+
+    def get(self, name, default=0):
+        """保存されている値（なければ default）"""
+        return self.values.get(_key(name), int(default))
+
+    def set(self, name, value, now):
+        """値を変更（保存は flush_interval 後にまとめて行う）"""
+        key = _key(name)
+        value = int(value)
+        if self.values.get(key) == value:
+            return
+        if key not in self.values and len(self.values) >= MAX_ENTRIES:
+            print(f"[WARN] 保存できる状態は {MAX_ENTRIES} 件までです: {name}")
+            return
+        self.values[key] = value
+        if self.dirty_since is None:
+            self.dirty_since = now
+
+    def poll(self, now):
+        """保存していない変更が flush_interval より古ければ書き込む
+        （入力待ちの間にメインループから、CPU クロックを下げる前に省電力ガバナーから呼ぶ）"""
+        if self.dirty_since is not None and now - self.dirty_since >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """保存していない変更があれば、リングの次の位置にレコードを書き込む"""
+        if self.dirty_since is None:
+            return
+        self.dirty_since = None
+        if not self.slots:
+            return
+        record = self.record
+        self.seq += 1
+        record[0] = MAGIC
+        record[1] = len(self.values)
+        record[2:6] = self.seq.to_bytes(4, "little")
+        position = HEADER_SIZE
+        for key, value in self.values.items():
+            record[position:position + 2] = key.to_bytes(2, "little")
+            record[position + 2:position + 6] = (value & 0xFFFFFFFF).to_bytes(4, "little")
+            position += ENTRY_SIZE
+        for i in range(position, RECORD_SIZE - 2):
+            record[i] = 0xFF
+        crc = crc16(record[:RECORD_SIZE - 2])
+        record[RECORD_SIZE - 2] = crc & 0xFF
+        record[RECORD_SIZE - 1] = crc >> 8
+        start_ns = cuskey_clock.now_ns()
+        slot = self.slot + 1
+        if slot < self.slots and self._erased(slot):
+            # 消去済みのスロットに追記（セクタを消去しない）
+            start = self.offset + slot * RECORD_SIZE
+            self.buffer[start:start + RECORD_SIZE] = record
+        else:
+            # 一周したら先頭に置き、残りを消去済みにして 1 回で書き直す（セクタの消去はここだけ）
+            slot = 0
+            self.buffer[self.offset:self.offset + self.slots * RECORD_SIZE] = record + ERASED * (self.slots - 1)
+            self.erases += 1
+        self.slot = slot
+        self.writes += 1
+        if self.debug:
+            elapsed = (cuskey_clock.now_ns() - start_ns) // 1000
+            print(f"[NVM] 状態を保存しました（通し番号 {self.seq}、位置 {slot}、{elapsed}us）")
+
+
+def create_store(settings, features):
+    """cuskey_settings の設定から状態の保存を生成（無効なら None、NVM が使えない環境では RAM だけで持つ）"""
+    if not settings.STATE_SAVE_ENABLED:
+        return None
+    try:
+        import microcontroller
+        buffer = microcontroller.nvm
+    except (ImportError, AttributeError):
+        buffer = None
+    offset = settings.NVM_STATE_OFFSET
+    size = settings.NVM_STATE_SIZE
+    if buffer is not None and offset + size > len(buffer):
+        print(f"[WARN] 状態の保存領域が NVM（{len(buffer)} bytes）に入りません -> 保存を無効化します")
+        buffer = None
+    return StateStore(buffer, offset, size, settings.STATE_FLUSH_INTERVAL,
+                      debug=features["debug_enabled"])
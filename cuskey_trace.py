@@ -0,0 +1,130 @@
+"""
+入力トレース記録
+ボタン・モードスイッチのピン変化をタイムスタンプ付きで RAM のリングバッファに記録し、
+シリアルまたは CIRCUITPY 上のファイルに書き出す
+書き出したトレースは tools/cuskey_sim.py で再生できる
+"""
+
+import array
+import sys
+
+import cuskey_clock
+
+try:
+    import supervisor
+except ImportError:
+    supervisor = None
+
+# トレースファイルの先頭・末尾の目印
+TRACE_HEADER = "# cuskey trace v1"
+TRACE_FOOTER = "# end"
+
+
+class TraceRecorder:
+    """ピン変化を記録する固定長リングバッファ（古い記録から上書き）"""
+
+    def __init__(self, size, path=None):
+        self.size = size
+        self.path = path
+        self.times = array.array("L", (0 for _ in range(size)))  # 記録開始からの経過時間（μs、32bit で周回）
+        self.states = bytearray(size)  # bit0: ボタン、bit1: モードスイッチ
+        self.head = 0
+        self.count = 0
+        self.last_state = None
+        self.start_ns = cuskey_clock.now_ns()
+
+    def sample(self, button, mode):
+        """ピンの値を渡す（前回から変化したときだけ記録）"""
+        state = (1 if button else 0) | (2 if mode else 0)
+        if state == self.last_state:
+            return
+        self.last_state = state
+        self.times[self.head] = ((cuskey_clock.now_ns() - self.start_ns) // 1000) & 0xFFFFFFFF
+        self.states[self.head] = state
+        self.head = (self.head + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+
+    def clear(self):
+        """記録を消去（現在のピン状態は次の sample で記録し直す）"""
+        self.head = 0
+        self.count = 0
+        self.last_state = None
+
+    def entry(self, index):
+        """古い方から index 番目の記録を (記録開始からの時刻 us（32bit で周回）, 状態) で返す"""
+        position = (self.head - self.count + index) % self.size
+        return self.times[position], self.states[position]
+
+    def lines(self):
+        """記録を古い順に "t_us,button,mode" 形式の行で返す"""
+        index = (self.head - self.count) % self.size
+        previous = self.times[index]
+        t_us = previous
+        for _ in range(self.count):
+            # 32bit の周回を差分で吸収して経過時間を復元
+            t_us += (self.times[index] - previous) & 0xFFFFFFFF
+            previous = self.times[index]
+            state = self.states[index]
+            yield f"{t_us},{state & 1},{(state >> 1) & 1}"
+            index = (index + 1) % self.size
+
+    def dump(self, write=print):
+        """トレースをシリアルに出力"""
+        write(TRACE_HEADER)
+        write("# t_us,button,mode")
+        for line in self.lines():
+            write(line)
+        write(TRACE_FOOTER)
+
+    def save(self, path=None):
+        """トレースを CIRCUITPY 上のファイルに書き出す（boot.py で書き込み可能にしておく）"""
+        path = path or self.path
+        try:
+            with open(path, "w") as f:
+                self.dump(lambda line: f.write(line + "\n"))
+        except OSError as e:
+            print(f"[WARN] トレースを {path} に保存できません（CIRCUITPY が読み取り専用の可能性）: {e}")
+            return False
+        print(f"トレースを保存しました: {path}（{self.count}件）")
+        return True
+
+    def poll_command(self):
+        """シリアルからの 1 文字コマンドを処理（t: 出力, w: ファイル保存, c: 消去）"""
+        if supervisor is None or not supervisor.runtime.serial_bytes_available:
+            return
+        command = sys.stdin.read(1)
+        if command == "t":
+            self.dump()
+        elif command == "w" and self.path:
+            self.save()
+        elif command == "c":
+            self.clear()
+            print("トレースを消去しました")
+
+
+def create_recorder(settings):
+    """cuskey_settings の設定からトレース記録を生成（無効なら None）"""
+    if not settings.TRACE_ENABLED:
+        return None
+    return TraceRecorder(settings.TRACE_SIZE, settings.TRACE_FILE)
+
+
+def parse_trace(lines):
+    """トレースの行を (秒, ボタン, モード) のリストに変換（シリアルログ全体を渡してもよい）"""
+    events = []
+    inside = False
+    for line in lines:
+        line = line.strip()
+        if line == TRACE_HEADER:
+            inside = True
+            events = []
+            continue
+        if line == TRACE_FOOTER:
+            inside = False
+            continue
+        if not inside or not line or line.startswith("#"):
+            continue
+        t_us, button, mode = line.split(",")
+        events.append((int(t_us) / 1000000, button == "1", mode == "1"))
+    return events
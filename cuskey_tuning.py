@@ -0,0 +1,193 @@
+"""
+調整値ファイルの監視
+アプリの定数（LONG_PRESS_TIME・SEND_INTERVAL・PIN_MODE_A など）を JSON ファイルから読み込み、
+動作中にファイルが書き換えられたら、変わった値だけをメインループの合間にモジュールへ反映する
+（code.py の再起動・HID の初期化・起動メッセージを伴わない）
+
+ファイルがあるときは CircuitPython の自動リロードを止める。ファイルの書き換えでは再起動せず、
+ルートと examples/ のそれ以外のファイル（.py・配列表・マクロライブラリなど）が書き換えられたとき・
+追加・削除されたときは自分で再起動する
+
+ファイルの形式は cuskey_settings.APP_SETTINGS と同じ:
+    {"ptt_key": {"LONG_PRESS_TIME": 0.35}, "auto_keysend": {"SEND_INTERVAL": 5}}
+"""
+
+import json
+import os
+
+try:
+    import supervisor
+except ImportError:
+    supervisor = None
+
+# 変更されたら再起動するファイルの置き場所（CIRCUITPY 上。. で始まるファイルと、調整値ファイルなど
+# デバイスが書き込むファイルは除く）
+WATCH_DIRS = ("/", "/examples/")
+
+
+def _snapshot(exclude):
+    """WATCH_DIRS のファイルの {パス: (大きさ, 更新時刻)}（exclude のパス・ディレクトリは除く）"""
+    stats = {}
+    for directory in WATCH_DIRS:
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            continue
+        for name in names:
+            path = directory + name
+            if name.startswith(".") or path in exclude:
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if st[0] & 0x4000:
+                continue
+            stats[path] = (st[6], st[8])
+    return stats
+
+
+def _changed(old, new):
+    """_snapshot の結果を比べ、変更・追加・削除されたファイルを 1 つ返す"""
+    for path, stat in new.items():
+        if old.get(path) != stat:
+            return path
+    for path in old:
+        if path not in new:
+            return path
+    return None
+
+
+def _read(path):
+    """ファイルの内容（ファイルがなければ None）"""
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+class TuningWatcher:
+    """調整値ファイルを監視し、変わった値をアプリのモジュールに反映する
+
+    path: 調整値ファイル（JSON）
+    interval: ファイルの更新を確認する間隔（秒）
+    exclude: 書き換えられても再起動しないファイル（トレースのファイルなど、デバイスが書き込むもの）
+    """
+
+    def __init__(self, path, interval, exclude=()):
+        self.path = path
+        self.exclude = (path,) + tuple(exclude)
+        self.interval = interval
+        self.modules = {}  # アプリ名 -> モジュール
+        self.applied = {}  # アプリ名 -> {定数名: ファイルから反映した値}
+        self.defaults = {}  # (アプリ名, 定数名) -> ファイルで上書きする前の値
+        self.values = {}  # 最後に読み込んだファイルの内容
+        self.last_check = 0.0
+        self.code_stats = None  # 自動リロードを止めている間に監視するファイル
+        self.file_data = _read(path)
+        self.failed_data = None  # 読み込めなかったときのファイルの内容（同じ間は読み直さない）
+        if self.file_data is not None:
+            self.values = self._parse(self.file_data) or {}
+            # 調整値ファイルの書き換えで再起動しないよう、自動リロードを止める（ほかのファイルは poll で監視）
+            if supervisor is not None:
+                try:
+                    supervisor.runtime.autoreload = False
+                    self.code_stats = _snapshot(self.exclude)
+                except AttributeError:
+                    pass
+
+    def _parse(self, data):
+        """ファイルの内容を読み込む（書き込み途中などで読めなければ None）"""
+        try:
+            values = json.loads(data)
+        except ValueError as e:
+            print(f"[WARN] 調整値ファイル {self.path} を読み込めません: {e}")
+            return None
+        if not isinstance(values, dict):
+            print(f"[WARN] 調整値ファイル {self.path} の形式が正しくありません")
+            return None
+        return values
+
+    def attach(self, name, module):
+        """アプリのモジュールを登録し、ファイルの値を反映（App の生成前に呼ぶ）"""
+        self.modules[name] = module
+        self.applied[name] = {}
+        self._apply(name, self.values.get(name, {}))
+
+    def detach(self, name):
+        """アプリのモジュールの登録を外す"""
+        self.modules.pop(name, None)
+        self.applied.pop(name, None)
+        for key in [key for key in self.defaults if key[0] == name]:
+            del self.defaults[key]
+
+    def _apply(self, name, values):
+        """アプリの定数を values に合わせ、変わった定数名のリストを返す"""
+        module = self.modules[name]
+        applied = self.applied[name]
+        changed = []
+        for key, value in values.items():
+            if key in applied and applied[key] == value:
+                continue
+            if not hasattr(module, key):
+                print(f"[WARN] 調整値ファイル: {name} に {key} はありません")
+                applied[key] = value
+                continue
+            if (name, key) not in self.defaults:
+                self.defaults[(name, key)] = getattr(module, key)
+            setattr(module, key, value)
+            applied[key] = value
+            changed.append(key)
+        # ファイルから消えた定数は元の値に戻す
+        for key in [key for key in applied if key not in values]:
+            del applied[key]
+            if (name, key) in self.defaults:
+                setattr(module, key, self.defaults.pop((name, key)))
+                changed.append(key)
+        return changed
+
+    def poll(self, now):
+        """ファイルが更新されていれば読み直し、{アプリ名: 変わった定数名のリスト} を返す（変化なしは None）
+
+        メインループの合間（ボタンを押していないとき）に毎回呼ぶ。確認は interval ごと
+        """
+        if now - self.last_check < self.interval:
+            return None
+        self.last_check = now
+
+        if self.code_stats is not None:
+            stats = _snapshot(self.exclude)
+            if stats != self.code_stats:
+                print(f"[設定] {_changed(self.code_stats, stats)} の変更を検出 -> 再起動します")
+                supervisor.reload()
+                self.code_stats = stats
+
+        # 更新時刻は FAT では 2 秒単位なので、内容（小さなファイル）を比べて変更を検出する
+        data = _read(self.path)
+        if data == self.file_data or data == self.failed_data:
+            return None
+        values = self._parse(data) if data is not None else {}
+        if values is None:
+            # 書き込み途中・書き間違いの可能性があるので、次にファイルが変わったら読み直す
+            self.failed_data = data
+            return None
+        self.file_data = data
+        self.values = values
+        result = None
+        for name in self.modules:
+            changed = self._apply(name, values.get(name, {}))
+            if changed:
+                if result is None:
+                    result = {}
+                result[name] = changed
+                for key in changed:
+                    print(f"[設定] {name}.{key} = {getattr(self.modules[name], key)!r}")
+        return result
+
+
+def create_watcher(settings):
+    """cuskey_settings の設定から調整値ファイルの監視を生成（無効なら None）"""
+    if settings.TUNING_FILE is None:
+        return None
+    return TuningWatcher(settings.TUNING_FILE, settings.TUNING_CHECK_INTERVAL, (settings.TRACE_FILE,))
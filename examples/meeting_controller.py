@@ -5,14 +5,12 @@
 Slack Huddle、Zoom、Teams、Google Meet、Webex などのプリセット例を収録
 """
 
-import digitalio
-import time
-import usb_hid
-from adafruit_hid.keyboard import Keyboard
 from adafruit_hid.keycode import Keycode
-from adafruit_hid.consumer_control import ConsumerControl
 from adafruit_hid.consumer_control_code import ConsumerControlCode
 import cuskey_settings
+import cuskey_runtime
+import cuskey_repeat
+import cuskey_preset
 
 # =============================================================================
 # ===================== ここから設定エリア =====================
@@ -23,6 +21,8 @@ LONG_PRESS_TIME = 0.3
 
 # 会議アプリのマイクミュート切り替えショートカット
 # 使いたいアプリ / OS に合わせてプリセット名を選択
+# プリセットは microcontroller.nvm のプリセットストア（cuskey_preset）から読み出す
+# 追加・変更は tools/gen_presets.py の PRESETS を書き換えて cuskey_presets.py を生成し直す
 # 例:
 #   slack_macos, slack_windows
 #   zoom_macos, zoom_windows
@@ -37,69 +37,11 @@ CUSTOM_MUTE_KEYS = (Keycode.COMMAND, Keycode.SHIFT, Keycode.A)
 CUSTOM_MUTE_LABEL = "Command+Shift+A"
 CUSTOM_MUTE_APP_LABEL = "Custom shortcut"
 
-MUTE_SHORTCUT_PRESETS = {
-    "slack_macos": (
-        (Keycode.COMMAND, Keycode.SHIFT, Keycode.SPACE),
-        "Command+Shift+Space",
-        "Slack Huddle macOS",
-    ),
-    "slack_windows": (
-        (Keycode.CONTROL, Keycode.SHIFT, Keycode.SPACE),
-        "Control+Shift+Space",
-        "Slack Huddle Windows/Linux",
-    ),
-    "zoom_macos": (
-        (Keycode.COMMAND, Keycode.SHIFT, Keycode.A),
-        "Command+Shift+A",
-        "Zoom macOS",
-    ),
-    "zoom_windows": (
-        (Keycode.ALT, Keycode.A),
-        "Alt+A",
-        "Zoom Windows/Linux",
-    ),
-    "teams_macos": (
-        (Keycode.COMMAND, Keycode.SHIFT, Keycode.M),
-        "Command+Shift+M",
-        "Microsoft Teams macOS",
-    ),
-    "teams_windows": (
-        (Keycode.CONTROL, Keycode.SHIFT, Keycode.M),
-        "Control+Shift+M",
-        "Microsoft Teams Windows",
-    ),
-    "google_meet_macos": (
-        (Keycode.COMMAND, Keycode.D),
-        "Command+D",
-        "Google Meet macOS",
-    ),
-    "google_meet_windows": (
-        (Keycode.CONTROL, Keycode.D),
-        "Control+D",
-        "Google Meet Windows/Linux",
-    ),
-    "webex_macos": (
-        (Keycode.COMMAND, Keycode.SHIFT, Keycode.M),
-        "Command+Shift+M",
-        "Webex macOS",
-    ),
-    "webex_windows": (
-        (Keycode.CONTROL, Keycode.M),
-        "Control+M",
-        "Webex Windows",
-    ),
-    "custom": (
-        CUSTOM_MUTE_KEYS,
-        CUSTOM_MUTE_LABEL,
-        CUSTOM_MUTE_APP_LABEL,
-    ),
-}
-
-# 音量変更の間隔（秒）- 長押し中の連続送信間隔
-VOLUME_INTERVAL = 0.1
-
-# チャタリング防止の待機時間（秒）
-DEBOUNCE_TIME = 0.05
+# モードスイッチを切り替えてこの秒数以内に戻すと、次のプリセットに切り替え（既定は None で無効）
+# スイッチを戻したつもりでミュートのショートカットが変わらないよう、使う場合だけ秒数を指定（例: 1.0）
+PRESET_FLIP_TIME = None
+
+# 長押し中の音量変更の間隔・加速は cuskey_settings.REPEAT_SETTINGS["volume"] で設定
 
 # CPU サイクル待機時間（秒）
 LOOP_DELAY = 0.01
@@ -108,196 +50,222 @@ LOOP_DELAY = 0.01
 # ===================== ここまで設定エリア =====================
 # =============================================================================
 
-# ボード設定の取得
-pins = cuskey_settings.get_pins()
-features = cuskey_settings.get_features()
-board_name = cuskey_settings.get_board_name()
-
-
-def get_mute_shortcut(preset_name):
-    """選択したプリセット名からショートカット設定を取得"""
-    preset = MUTE_SHORTCUT_PRESETS.get(preset_name)
-    if preset is None:
-        print(f"[WARN] 未知の MUTE_PRESET: {preset_name} -> custom を使用します")
-        return MUTE_SHORTCUT_PRESETS["custom"]
-    return preset
 
+class App(cuskey_runtime.App):
+    """リモート会議用コントローラー"""
+
+    TITLE = "リモート会議用コントローラー"
+    NAME = "meeting_controller"
+    HID_DEVICES = ("keyboard", "consumer_control")
+    loop_delay = LOOP_DELAY
+
+    def __init__(self, ctx):
+        super().__init__(ctx)
+
+        #
+        # Keyboard / ConsumerControl の初期化
+        #
+        self.keyboard = ctx.hid.keyboard
+        self.consumer_control = ctx.hid.consumer_control
+
+        #
+        # 状態管理変数の初期化
+        #
+        self.button_press_start_time = None
+        self.is_long_press = False
+        self.volume_adjusting = False
+        self.volume_repeat = cuskey_repeat.create_repeater(cuskey_settings, "volume")
+
+        #
+        # ミュートショートカットのプリセット（NVM のプリセットストアから読み出す）
+        # 番号 0〜count-1 がストアのプリセット、count が custom
+        #
+        self.presets = cuskey_preset.open_store(cuskey_settings)
+        self.select_configured()
+
+        # モードスイッチの往復（プリセット切り替え）の検出
+        self.last_mode = ctx.read_mode()
+        self.mode_changed_time = None
+
+    def select_configured(self):
+        """MUTE_PRESET のプリセットを選択（見つからなければ custom）"""
+        index = self.presets.find(MUTE_PRESET)
+        if index is None:
+            if MUTE_PRESET != "custom":
+                print(f"[WARN] 未知の MUTE_PRESET: {MUTE_PRESET} -> custom を使用します")
+            index = self.presets.count
+        self.select_preset(index)
+
+    def select_preset(self, index):
+        """index 番目のプリセットを選択（count なら custom）"""
+        self.preset_index = index
+        if index < self.presets.count:
+            self.preset_name = self.presets.name(index)
+            self.mute_keys, self.mute_label, self.mute_app = self.presets.load(index)
+        else:
+            self.preset_name = "custom"
+            self.mute_keys = CUSTOM_MUTE_KEYS
+            self.mute_label = CUSTOM_MUTE_LABEL
+            self.mute_app = CUSTOM_MUTE_APP_LABEL
+
+    def load_preset(self, name):
+        """プリセットを名前で選択（データチャンネルから。見つからなければ False）"""
+        index = self.presets.count if name == "custom" else self.presets.find(name)
+        if index is None:
+            return False
+        self.select_preset(index)
+        print(f"🔁 ミュートプリセット: {self.preset_name}（{self.mute_app} / {self.mute_label}）")
+        return True
+
+    def presets_changed(self):
+        """NVM のプリセットが書き換えられたら読み直し、選択中のプリセットを名前で選び直す（データチャンネルから）"""
+        name = self.preset_name
+        self.presets = cuskey_preset.PresetStore(self.presets.buffer, self.presets.offset)
+        index = self.presets.find(name) if name != "custom" else None
+        self.select_preset(self.presets.count if index is None else index)
+        print(f"🔁 プリセットを読み直しました（{self.presets.count} 件、選択中: {self.preset_name}）")
+
+    def next_preset(self):
+        """次のプリセットに切り替え（最後の次は custom、その次は先頭）"""
+        self.select_preset((self.preset_index + 1) % (self.presets.count + 1))
+        print(f"🔁 ミュートプリセット: {self.preset_name}（{self.mute_app} / {self.mute_label}）")
+
+    def settings_changed(self, names):
+        """設定の配布・調整値ファイルで変わった MUTE_PRESET・CUSTOM_MUTE_* を反映"""
+        if "MUTE_PRESET" in names:
+            self.select_configured()
+        elif self.preset_name == "custom" and any(name.startswith("CUSTOM_MUTE_") for name in names):
+            self.select_preset(self.presets.count)
+        else:
+            return
+        print(f"🔁 ミュートプリセット: {self.preset_name}（{self.mute_app} / {self.mute_label}）")
+
+    def toggle_mute(self):
+        """設定したショートカットで会議アプリのマイクミュートを切り替え"""
+        self.keyboard.send(*self.mute_keys)
+        if self.debug:
+            print(f"[DEBUG] マイクミュート切り替えショートカット送信: {self.mute_label}")
+        else:
+            print("🎤 マイクミュート切り替え")
+
+    def adjust_volume(self, direction):
+        """音量を調整（direction: 'up' または 'down'）"""
+        if direction == 'up':
+            self.consumer_control.send(ConsumerControlCode.VOLUME_INCREMENT)
+            if self.debug:
+                print("🔊 音量アップ")
+        else:
+            self.consumer_control.send(ConsumerControlCode.VOLUME_DECREMENT)
+            if self.debug:
+                print("🔉 音量ダウン")
+
+    def banner(self):
+        """起動メッセージ"""
+        print(f"=== {self.ctx.board_name} {self.TITLE}起動 ===")
+        print(f"ボードタイプ：{cuskey_settings.BOARD_TYPE}")
+        print(f"デバッグモード：{self.debug}")
+        print("-" * 50)
+        print("【操作方法】")
+        print(f"  シングルクリック（< {LONG_PRESS_TIME} 秒）: マイクミュート切り替え 🎤")
+        print(f"    - プリセット: {self.preset_name}")
+        print(f"    - 対象アプリ: {self.mute_app}")
+        print(f"    - 送信ショートカット: {self.mute_label}")
+        print(f"  長押し（>= {LONG_PRESS_TIME} 秒）:")
+        print(f"    * Mode A（スイッチ ON）: 音量アップ 🔊")
+        print(f"    * Mode B（スイッチ OFF）: 音量ダウン 🔉")
+        print("-" * 50)
+        if PRESET_FLIP_TIME is not None:
+            print(f"  モードスイッチを切り替えて {PRESET_FLIP_TIME} 秒以内に戻す: 次のプリセットに切り替え 🔁")
+        print("-" * 50)
+        print(f"【ミュートプリセット】（NVM に {self.presets.count} 件）")
+        for index in range(self.presets.count):
+            print(f"  - {self.presets.name(index)}")
+        print("  - custom")
+        print("  ※ 利用アプリに合わせて MUTE_PRESET を変更してください")
+        print("-" * 50)
+
+    def on_press(self, now):
+        """ボタンが押された瞬間を検出（High → Low）"""
+        self.button_press_start_time = now
+        self.is_long_press = False
+        self.volume_adjusting = False
+
+        if self.debug:
+            print("[DEBUG] ボタンが押されました")
 
-MUTE_KEYS, MUTE_KEYS_LABEL, MUTE_TARGET_APP = get_mute_shortcut(MUTE_PRESET)
+    def on_hold(self, now):
+        """ボタンが押されている間の処理"""
+        if self.button_press_start_time is None:
+            return
+        press_duration = now - self.button_press_start_time
 
-#
-# Keyboard / ConsumerControl の初期化
-#
-keyboard = Keyboard(usb_hid.devices)
-consumer_control = ConsumerControl(usb_hid.devices)
-
-#
-# モード切替ピンの初期化
-#
-# モード切替用 GND ピンの設定
-if pins["mode_gnd"]:
-    gnd_pin = digitalio.DigitalInOut(pins["mode_gnd"])
-    gnd_pin.direction = digitalio.Direction.OUTPUT
-    gnd_pin.value = False  # GND（Low）に設定
-
-# MODE_A ピンの設定
-mode_a = digitalio.DigitalInOut(pins["mode_a"])
-mode_a.direction = digitalio.Direction.INPUT
-mode_a.pull = digitalio.Pull.UP
+        # 長押し判定（設定時間以上）
+        if press_duration >= LONG_PRESS_TIME and not self.is_long_press:
+            self.is_long_press = True
+            self.volume_adjusting = True
 
-#
-# ボタンピンの初期化
-#
-# ボタン用 GND ピンの設定
-if pins["button_gnd"]:
-    button_gnd = digitalio.DigitalInOut(pins["button_gnd"])
-    button_gnd.direction = digitalio.Direction.OUTPUT
-    button_gnd.value = False  # GND（Low）に設定
+            # 現在のモードを取得
+            current_mode = self.ctx.read_mode()
 
-# ボタン入力ピンの設定
-button = digitalio.DigitalInOut(pins["button"])
-button.direction = digitalio.Direction.INPUT
-button.pull = digitalio.Pull.UP
+            if self.debug:
+                if current_mode == False:
+                    print("[DEBUG] Mode A: 音量アップ開始")
+                else:
+                    print("[DEBUG] Mode B: 音量ダウン開始")
 
-#
-# 状態管理変数の初期化
-#
-last_button_state = True  # プルアップなので通常は True
-button_press_start_time = None
-is_long_press = False
-volume_adjusting = False
-last_volume_send_time = 0
-
-
-def toggle_mute():
-    """設定したショートカットで会議アプリのマイクミュートを切り替え"""
-    keyboard.send(*MUTE_KEYS)
-    if features["debug_enabled"]:
-        print(f"[DEBUG] マイクミュート切り替えショートカット送信: {MUTE_KEYS_LABEL}")
-    else:
-        print("🎤 マイクミュート切り替え")
-
-
-def adjust_volume(direction):
-    """音量を調整（direction: 'up' または 'down'）"""
-    if direction == 'up':
-        consumer_control.send(ConsumerControlCode.VOLUME_INCREMENT)
-        if features["debug_enabled"]:
-            print("🔊 音量アップ")
-    else:
-        consumer_control.send(ConsumerControlCode.VOLUME_DECREMENT)
-        if features["debug_enabled"]:
-            print("🔉 音量ダウン")
+            # 最初の音量変更から連続送信を開始（続けて押すほど速くなる）
+            self.volume_repeat.start(now)
 
+        # 長押し中は連続で音量変更
+        if self.volume_adjusting:
+            steps = self.volume_repeat.poll(now)
+            if steps:
+                # Mode A: 音量アップ / Mode B: 音量ダウン
+                direction = 'down' if self.ctx.read_mode() else 'up'
+                for _ in range(steps):
+                    self.adjust_volume(direction)
+
+    def on_release(self, now):
+        """ボタンが離された瞬間を検出（Low → High）"""
+        if self.button_press_start_time is None:
+            return
+        press_duration = now - self.button_press_start_time
+
+        # 長押しでなかった場合はマイクミュート切り替え
+        if not self.is_long_press:
+            self.toggle_mute()
+
+        if self.debug:
+            print(f"[DEBUG] ボタンが離されました（押下時間：{press_duration:.2f}秒）")
+
+        # リセット
+        self.button_press_start_time = None
+        self.volume_adjusting = False
+        self.volume_repeat.stop()
+
+    def tick(self, now):
+        """モードスイッチの往復を検出し、長押し中は次の音量変更の予定時刻を返す"""
+        if PRESET_FLIP_TIME is not None:
+            mode = self.ctx.read_mode()
+            if mode != self.last_mode:
+                self.last_mode = mode
+                # ボタンを押している間（音量の向きの切り替え）は数えない
+                if self.button_press_start_time is not None:
+                    self.mode_changed_time = None
+                # 切り替えてすぐ戻した（2 回目の変化が 1 回目から PRESET_FLIP_TIME 以内）
+                elif self.mode_changed_time is not None and now - self.mode_changed_time <= PRESET_FLIP_TIME:
+                    self.mode_changed_time = None
+                    self.next_preset()
+                else:
+                    self.mode_changed_time = now
+        return self.volume_repeat.deadline()
 
-#
-# 起動メッセージ
-#
-print(f"=== {board_name} リモート会議用コントローラー起動 ===")
-print(f"ボードタイプ：{cuskey_settings.BOARD_TYPE}")
-print(f"デバッグモード：{features['debug_enabled']}")
-print("-" * 50)
-print("【操作方法】")
-print(f"  シングルクリック（< {LONG_PRESS_TIME} 秒）: マイクミュート切り替え 🎤")
-print(f"    - プリセット: {MUTE_PRESET}")
-print(f"    - 対象アプリ: {MUTE_TARGET_APP}")
-print(f"    - 送信ショートカット: {MUTE_KEYS_LABEL}")
-print(f"  長押し（>= {LONG_PRESS_TIME} 秒）:")
-print(f"    * Mode A（スイッチ ON）: 音量アップ 🔊")
-print(f"    * Mode B（スイッチ OFF）: 音量ダウン 🔉")
-print("-" * 50)
-print("【ミュートショートカット例】")
-print("  - slack_macos / slack_windows")
-print("  - zoom_macos / zoom_windows")
-print("  - teams_macos / teams_windows")
-print("  - google_meet_macos / google_meet_windows")
-print("  - webex_macos / webex_windows")
-print("  - custom")
-print("  ※ 利用アプリに合わせて MUTE_PRESET を変更してください")
-print("-" * 50)
 
 #
-# メインループ
+# メインループ（このファイルを code.py としてコピーした場合）
 #
-while True:
-    current_time = time.monotonic()
-    
-    # ボタンの現在の状態を読み取り
-    current_button_state = button.value
-    
-    # ボタンが押された瞬間を検出（High → Low）
-    if last_button_state and not current_button_state:
-        button_press_start_time = current_time
-        is_long_press = False
-        volume_adjusting = False
-        last_volume_send_time = 0
-        
-        if features["debug_enabled"]:
-            print("[DEBUG] ボタンが押されました")
-        
-        # チャタリング防止のため少し待機
-        time.sleep(DEBOUNCE_TIME)
-    
-    # ボタンが押されている間の処理
-    elif not current_button_state and button_press_start_time is not None:
-        press_duration = current_time - button_press_start_time
-        
-        # 長押し判定（設定時間以上）
-        if press_duration >= LONG_PRESS_TIME and not is_long_press:
-            is_long_press = True
-            volume_adjusting = True
-            
-            # 現在のモードを取得
-            current_mode = mode_a.value
-            
-            if features["debug_enabled"]:
-                if current_mode == False:
-                    print("[DEBUG] Mode A: 音量アップ開始")
-                else:
-                    print("[DEBUG] Mode B: 音量ダウン開始")
-            
-            # 最初の音量変更を送信
-            current_mode = mode_a.value
-            if current_mode == False:  # Mode A: 音量アップ
-                adjust_volume('up')
-            else:  # Mode B: 音量ダウン
-                adjust_volume('down')
-            last_volume_send_time = current_time
-        
-        # 長押し中は連続で音量変更
-        if volume_adjusting and (current_time - last_volume_send_time >= VOLUME_INTERVAL):
-            current_mode = mode_a.value
-            if current_mode == False:  # Mode A: 音量アップ
-                adjust_volume('up')
-            else:  # Mode B: 音量ダウン
-                adjust_volume('down')
-            
-            last_volume_send_time = current_time
-    
-    # ボタンが離された瞬間を検出（Low → High）
-    elif not last_button_state and current_button_state:
-        if button_press_start_time is not None:
-            press_duration = current_time - button_press_start_time
-            
-            # 長押しでなかった場合はマイクミュート切り替え
-            if not is_long_press:
-                toggle_mute()
-            
-            if features["debug_enabled"]:
-                print(f"[DEBUG] ボタンが離されました（押下時間：{press_duration:.2f}秒）")
-            
-            # リセット
-            button_press_start_time = None
-            volume_adjusting = False
-            
-            # チャタリング防止のため少し待機
-            time.sleep(DEBOUNCE_TIME)
-    
-    # 前回の状態を更新
-    last_button_state = current_button_state
-    
-    # CPU 負荷軽減のため短時間待機
-    time.sleep(LOOP_DELAY)
+if __name__ == "__main__":
+    cuskey_runtime.run(App)
 
 """
 ============================================================================
@@ -308,6 +276,7 @@ while True:
 2. 必要なライブラリのコピー
    - Adafruit_CircuitPython_HID フォルダ内の adafruit_hid フォルダを Pico にコピー
    - cuskey_settings.py を Pico にコピー
+   - cuskey_runtime.py など cuskey_ で始まるファイルをすべて Pico にコピー
 
 3. このファイルを Pico にコピー
    - meeting_controller.py という名前で Pico のルートディレクトリに保存
@@ -317,10 +286,10 @@ while True:
    - LONG_PRESS_TIME: 長押し判定時間（デフォルト 0.3 秒）
      シングルクリックと長押しの境界を調整
    
-   - VOLUME_INTERVAL: 音量変更の間隔（デフォルト 0.1 秒）
-     小さいほど速く、大きいほどゆっくり変化
+   - 音量変更の速さは cuskey_settings.py の REPEAT_SETTINGS["volume"] で設定
+     (初回遅延, 開始レート, 加速, 最大レート) の順。押し続けるほど速く変化
    
-   - DEBOUNCE_TIME: チャタリング防止の待機時間（デフォルト 0.05 秒）
+   - チャタリング防止は cuskey_settings.py の DEBOUNCE_TIME（メインループで処理）
 
 5. 動作確認
    - Pico を接続すると自動的にプログラムが起動
@@ -335,6 +304,11 @@ while True:
      * シングルクリック（0.3 秒未満）: 選択中の MUTE_PRESET を送信 🎤
      * 長押し（0.3 秒以上）: 音量変更（Mode A=UP, Mode B=DOWN）
 
+   - プリセットの切り替え:
+     * PRESET_FLIP_TIME を設定すると、モードスイッチを切り替えてその秒数以内に戻すと次のプリセット 🔁
+       （既定は None で無効）
+     * 再起動すると MUTE_PRESET に戻る
+
 7. 対応アプリ
    - Slack Huddle
    - Zoom
@@ -350,13 +324,17 @@ while True:
   - MUTE_PRESET で選択したキーボードショートカットを送信
   - 既定値は Zoom macOS の Command + Shift + A
   - Slack / Zoom / Teams / Google Meet / Webex の例を収録
+  - プリセットは microcontroller.nvm に置き、索引から番号で読み出す（RAM を使わない）
+    起動時に cuskey_presets.py の内容と NVM を比べ、違うときだけ書き込む
+  - プリセットの追加・変更は tools/gen_presets.py の PRESETS を書き換えて実行し、
+    生成された cuskey_presets.py を Pico にコピー
   - 独自ショートカットを使いたい場合は MUTE_PRESET = "custom" にして
     CUSTOM_MUTE_KEYS / CUSTOM_MUTE_LABEL を変更して使用
 
 ■ 音量調整（長押し）
   - Mode A: 音量アップ（ConsumerControlCode.VOLUME_INCREMENT）
   - Mode B: 音量ダウン（ConsumerControlCode.VOLUME_DECREMENT）
-  - 押している間、設定間隔で連続送信
+  - 押している間連続送信（押し続けるほど速くなり、最大レートで頭打ち）
   - 離すと即座に停止
 
 ============================================================================
@@ -368,7 +346,7 @@ while True:
   - custom を使う場合は CUSTOM_MUTE_KEYS を確認
   
 ■ 音量変更が遅い/速すぎる場合
-  - VOLUME_INTERVAL の値を調整（小さいほど速い）
+  - cuskey_settings.py の REPEAT_SETTINGS["volume"] の開始レート・加速・最大レートを調整
   
 ■ 誤検出が多い場合
   - LONG_PRESS_TIME の値を大きくしてシングルクリックと長押しの境界を明確に
@@ -381,5 +359,9 @@ while True:
   - 長押しで音量アップ/ダウン（モード切り替え）を実装
   - Slack、Zoom、Teams、Google Meet、Webex のプリセット例を収録
 
+■ プリセットストア
+  - プリセットを NVM のプリセットストア（cuskey_preset）に移動
+  - モードスイッチの往復でプリセットを切り替え（PRESET_FLIP_TIME を設定した場合）
+
 ============================================================================
 """
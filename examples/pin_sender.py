@@ -2,12 +2,9 @@
 PIN コード送信キーボード
 シングルクリックで登録された PIN コードを自動送信
 MODE A と MODE B で 2 種類の PIN を設定可能
+送信は cuskey_macro で少しずつ行うので、送信中もボタン入力を受け付ける
 """
 
-import digitalio
-import time
-import usb_hid
-from adafruit_hid.keyboard import Keyboard
 from adafruit_hid.keycode import Keycode
 
 # =============================================================================
@@ -16,25 +13,18 @@ from adafruit_hid.keycode import Keycode
 
 # MODE A の PIN コード（スイッチ ON の時）
 # 各桁を文字列で指定。例：["1", "2", "3", "4"] = 1234
+# 文字列でもよい（英字・記号も可、キーボード配列は cuskey_settings.KEYBOARD_LAYOUT）。例："ab12"
 PIN_MODE_A = ["1", "2", "3", "4"]  # 変更してください
 
 # MODE B の PIN コード（スイッチ OFF の時）
 # 各桁を文字列で指定。例：["5", "6", "7", "8"] = 5678
 PIN_MODE_B = ["5", "6", "7", "8"]  # 変更してください
 
-# 文字列の数字と HID キーコードの対応表
-DIGIT_KEYCODES = {
-    "0": Keycode.ZERO,
-    "1": Keycode.ONE,
-    "2": Keycode.TWO,
-    "3": Keycode.THREE,
-    "4": Keycode.FOUR,
-    "5": Keycode.FIVE,
-    "6": Keycode.SIX,
-    "7": Keycode.SEVEN,
-    "8": Keycode.EIGHT,
-    "9": Keycode.NINE,
-}
+# PIN の代わりに送るマクロライブラリ（cuskey_macros.bin、tools/gen_macros.py）のマクロ名（None で PIN を送信）
+# 定型文など長いマクロはライブラリから少しずつ読み込みながら送るので、メモリを使わない
+# 例：MACRO_MODE_B = "signature"
+MACRO_MODE_A = None
+MACRO_MODE_B = None
 
 # 各桁間の送信間隔（秒）
 DIGIT_INTERVAL = 0.1
@@ -48,9 +38,6 @@ PRE_SEND_DELAY = 1.0
 # PIN コード送信後に ENTER を送信するか
 POST_SEND_ENTER = False
 
-# チャタリング防止の待機時間（秒）
-DEBOUNCE_TIME = 0.05
-
 # CPU サイクル待機時間（秒）
 LOOP_DELAY = 0.01
 
@@ -60,138 +47,120 @@ LOOP_DELAY = 0.01
 
 # ボード設定をインポート
 import cuskey_settings
+import cuskey_runtime
+import cuskey_macro
+
+
+class App(cuskey_runtime.App):
+    """PIN コード送信キーボード"""
+
+    TITLE = "PIN コード送信キーボード"
+    NAME = "pin_sender"
+    HID_DEVICES = ("keyboard",)
+    loop_delay = LOOP_DELAY
+
+    def __init__(self, ctx):
+        super().__init__(ctx)
+
+        #
+        # キー入力マクロ（PIN の送信手順をためて、メインループで少しずつ送信）
+        #
+        self.macro = cuskey_macro.create_player(cuskey_settings, ctx.hid)
+        self.sending = None  # 送信中のモード表示（送信中でなければ None）
+
+    def send_pin(self, pin_code, mode_label):
+        """PIN コードの送信を予約する関数（送信は tick で行う）"""
+        macro = self.macro
+        text = "".join(pin_code)
+        print(f"{mode_label} PIN コード送信開始: {text}")
+
+        # PIN 送信前に SPACE → BACKSPACE を送信してフォーカスをリセット
+        if PRE_SEND_ESCAPE:
+            print(f"  SPACE → BACKSPACE 送信後、{PRE_SEND_DELAY} 秒待機")
+            macro.key(Keycode.SPACE)
+            macro.key(Keycode.BACKSPACE)
+            macro.wait(PRE_SEND_DELAY)
+
+        # 各桁を DIGIT_INTERVAL 秒間隔で入力
+        macro.type_text(text, 1.0 / DIGIT_INTERVAL)
+
+        # PIN 送信後に ENTER を送信
+        if POST_SEND_ENTER:
+            macro.key(Keycode.ENTER)
+
+        self.sending = f"{mode_label} PIN コード"
+
+    def send_macro(self, name, mode_label):
+        """マクロライブラリのマクロの送信を予約する（送信は tick で行う）"""
+        print(f"{mode_label} マクロ送信開始: {name}")
+        if self.macro.play(name):
+            self.sending = f"{mode_label} マクロ"
+
+    def banner(self):
+        """起動メッセージ"""
+        print(f"=== {self.ctx.board_name} {self.TITLE}起動 ===")
+        print(f"ボードタイプ：{cuskey_settings.BOARD_TYPE}")
+        print(f"デバッグモード：{self.debug}")
+        print("-" * 50)
+        print("【設定された PIN コード】")
+        print(f"  Mode A（スイッチ ON）: {self._label(PIN_MODE_A, MACRO_MODE_A)}")
+        print(f"  Mode B（スイッチ OFF）: {self._label(PIN_MODE_B, MACRO_MODE_B)}")
+        print("-" * 50)
+        print("【操作方法】")
+        print("  - ボタンをシングルクリック")
+        print("    * Mode A: PIN_MODE_A を送信")
+        print("    * Mode B: PIN_MODE_B を送信")
+        print("-" * 50)
+
+    def _label(self, pin_code, macro_name):
+        if macro_name is not None:
+            return f"マクロ {macro_name}"
+        return "".join(pin_code)
+
+    def on_press(self, now):
+        """ボタンが押された瞬間を検出（High → Low）"""
+        # 現在のモードを取得
+        current_mode = self.ctx.read_mode()
 
-#
-# ボード設定の取得
-#
-pins = cuskey_settings.get_pins()
-features = cuskey_settings.get_features()
-board_name = cuskey_settings.get_board_name()
-
-#
-# USB キーボードの初期化
-#
-keyboard = Keyboard(usb_hid.devices)
-
-#
-# モード切替ピンの初期化
-#
-# モード切替用 GND ピンの設定
-if pins["mode_gnd"]:
-    gnd_pin = digitalio.DigitalInOut(pins["mode_gnd"])
-    gnd_pin.direction = digitalio.Direction.OUTPUT
-    gnd_pin.value = False  # GND（Low）に設定
-
-# MODE_A ピンの設定
-mode_a = digitalio.DigitalInOut(pins["mode_a"])
-mode_a.direction = digitalio.Direction.INPUT
-mode_a.pull = digitalio.Pull.UP
-
-#
-# ボタンピンの初期化
-#
-# ボタン用 GND ピンの設定
-if pins["button_gnd"]:
-    button_gnd = digitalio.DigitalInOut(pins["button_gnd"])
-    button_gnd.direction = digitalio.Direction.OUTPUT
-    button_gnd.value = False  # GND（Low）に設定
-
-# ボタン入力ピンの設定
-button = digitalio.DigitalInOut(pins["button"])
-button.direction = digitalio.Direction.INPUT
-button.pull = digitalio.Pull.UP
-
-#
-# 状態管理変数の初期化
-#
-last_button_state = True  # プルアップなので通常は True
-
-
-def send_pin(pin_code, mode_label):
-    """PIN コードを送信する関数"""
-    print(f"{mode_label} PIN コード送信開始: {''.join(pin_code)}")
-
-    # PIN 送信前に SPACE → BACKSPACE を送信してフォーカスをリセット
-    if PRE_SEND_ESCAPE:
-        print("  SPACE → BACKSPACE 送信中...")
-        keyboard.send(Keycode.SPACE)
-        keyboard.send(Keycode.BACKSPACE)
-        print(f"  {PRE_SEND_DELAY} 秒待機中...")
-        time.sleep(PRE_SEND_DELAY)
-
-    for digit in pin_code:
-        # 数字キーを送信
-        if digit in DIGIT_KEYCODES:
-            keycode = DIGIT_KEYCODES[digit]
-            keyboard.send(keycode)
-            if features["debug_enabled"]:
-                print(f"  [DEBUG] '{digit}' を送信")
+        if self.debug:
+            print(f"[DEBUG] ボタンが押されました (mode_a.value = {current_mode})")
         else:
-            # 数字以外の文字は対応していないことを警告
-            print(f"  警告：'{digit}' は数字ではないため送信できません")
-        
-        # 各桁間の待機
-        time.sleep(DIGIT_INTERVAL)
-    
-    # PIN 送信後に ENTER を送信
-    if POST_SEND_ENTER:
-        print("  ENTER 送信中...")
-        keyboard.send(Keycode.ENTER)
+            print("ボタンが押されました")
+
+        # 前の PIN を送信中なら重ねて送らない
+        if self.sending is not None:
+            print(f"{self.sending}送信中のため無視しました")
+        # モードに応じて PIN コードを送信
+        elif current_mode == False:  # Mode A（スイッチが GND に接続）
+            if MACRO_MODE_A is not None:
+                self.send_macro(MACRO_MODE_A, "[Mode A]")
+            else:
+                self.send_pin(PIN_MODE_A, "[Mode A]")
+        else:  # Mode B（スイッチが開いている）
+            if MACRO_MODE_B is not None:
+                self.send_macro(MACRO_MODE_B, "[Mode B]")
+            else:
+                self.send_pin(PIN_MODE_B, "[Mode B]")
 
-    print(f"{mode_label} PIN コード送信完了")
+    def tick(self, now):
+        """予約した PIN の送信を進める"""
+        deadline = self.macro.tick(now)
+        if self.sending is not None and not self.macro.busy():
+            print(f"{self.sending}送信完了")
+            self.sending = None
+        return deadline
 
+    def deinit(self):
+        """送信待ちの手順を取り消してキーを離す"""
+        self.macro.clear()
+        super().deinit()
 
-#
-# 起動メッセージ
-#
-print(f"=== {board_name} PIN コード送信キーボード起動 ===")
-print(f"ボードタイプ：{cuskey_settings.BOARD_TYPE}")
-print(f"デバッグモード：{features['debug_enabled']}")
-print("-" * 50)
-print("【設定された PIN コード】")
-print(f"  Mode A（スイッチ ON）: {''.join(PIN_MODE_A)}")
-print(f"  Mode B（スイッチ OFF）: {''.join(PIN_MODE_B)}")
-print("-" * 50)
-print("【操作方法】")
-print("  - ボタンをシングルクリック")
-print("    * Mode A: PIN_MODE_A を送信")
-print("    * Mode B: PIN_MODE_B を送信")
-print("-" * 50)
 
 #
-# メインループ
+# メインループ（このファイルを code.py としてコピーした場合）
 #
-while True:
-    # ボタンの現在の状態を読み取り
-    current_button_state = button.value
-    
-    # ボタンが押された瞬間を検出（High → Low）
-    if last_button_state and not current_button_state:
-        # チャタリング防止のため少し待機
-        time.sleep(DEBOUNCE_TIME)
-        
-        # 現在のモードを取得
-        current_mode = mode_a.value
-        
-        if features["debug_enabled"]:
-            print(f"[DEBUG] ボタンが押されました (mode_a.value = {current_mode})")
-        else:
-            print("ボタンが押されました")
-        
-        # モードに応じて PIN コードを送信
-        if current_mode == False:  # Mode A（スイッチが GND に接続）
-            send_pin(PIN_MODE_A, "[Mode A]")
-        else:  # Mode B（スイッチが開いている）
-            send_pin(PIN_MODE_B, "[Mode B]")
-        
-        # チャタリング防止のため少し待機
-        time.sleep(DEBOUNCE_TIME)
-    
-    # 前回の状態を更新
-    last_button_state = current_button_state
-    
-    # CPU 負荷軽減のため短時間待機
-    time.sleep(LOOP_DELAY)
+if __name__ == "__main__":
+    cuskey_runtime.run(App)
 
 """
 ============================================================================
@@ -202,6 +171,8 @@ while True:
 2. 必要なライブラリのコピー
    - Adafruit_CircuitPython_HID フォルダ内の adafruit_hid フォルダを Pico にコピー
    - cuskey_settings.py を Pico にコピー
+   - cuskey_runtime.py など cuskey_ で始まるファイルをすべて Pico にコピー
+     （キーボード配列表 cuskey_layout_us.py / cuskey_layout_jis.py を含む）
 
 3. このファイルを Pico にコピー
    - pin_sender.py という名前で Pico のルートディレクトリに保存
@@ -214,6 +185,10 @@ while True:
    - PIN_MODE_B: Mode B で送信する PIN コード
      例：PIN_MODE_B = ["5", "6", "7", "8"]  # 5678 を送信
 
+   - 英字・記号を含む場合は文字列で指定（例：PIN_MODE_A = "Ab-12"）
+     cuskey_settings.KEYBOARD_LAYOUT をホスト OS のキーボード配列（"us" / "jis"）に合わせる
+     配列表にない文字（日本語など）は警告を表示して飛ばす
+
 5. 動作確認
    - Pico を接続すると自動的にプログラムが起動
    - シリアルモニタで動作状況を確認可能（Mu Editor、Thonny 等）
@@ -226,7 +201,7 @@ while True:
    - DIGIT_INTERVAL: 各桁間の送信間隔（デフォルト 0.1 秒）
      遅い場合は小さく、早すぎる場合は大きく調整
    
-   - DEBOUNCE_TIME: チャタリング防止の待機時間（デフォルト 0.05 秒）
+   - チャタリング防止は cuskey_settings.py の DEBOUNCE_TIME（メインループで処理）
    
    - LOOP_DELAY: メインループの待機時間（デフォルト 0.01 秒）
 
@@ -248,5 +223,9 @@ while True:
   - Mode A/B で 2 種類の PIN を設定可能
   - プログラム上部でわかりやすく設定可能に
 
+■ 文字列入力エンジン対応
+  - 送信を cuskey_macro で少しずつ行い、送信中もメインループを止めないように変更
+  - キーボード配列表（US / JIS）で英字・記号も送信可能に
+
 ============================================================================
 """
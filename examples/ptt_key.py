@@ -10,23 +10,25 @@ MODE A以外（MODE B）の時：
     シングルクリックでページダウンキー送信
     ボタン長押しでその期間はマウスのホイールダウン状態維持
     ダブルクリックでページアップキー送信
+    トリプルクリックでHOMEキー送信
+
+クリックの割り当ては押し方の列（短押し・長押し）の木で判定し、
+それ以上続く割り当てがない列は待ち時間なしで確定する
 """
 
-import digitalio
-import time
-import usb_hid
-from adafruit_hid.keyboard import Keyboard
 from adafruit_hid.keycode import Keycode
-from adafruit_hid.mouse import Mouse
 
 # ボード設定をインポート
 import cuskey_settings
+import cuskey_runtime
+import cuskey_input
+import cuskey_repeat
 
 # マルチクリック検出の設定
 DOUBLE_CLICK_TIME = 0.3  # マルチクリック判定時間（秒）
 MIN_PRESS_TIME = 0.05  # 最小押下時間（チャタリング防止）
 LONG_PRESS_TIME = 0.3  # 長押し判定時間（秒）
-WHEEL_SCROLL_INTERVAL = 0.05  # マウスホイールスクロール間隔（秒）
+# 長押し中のホイールスクロールの間隔・加速は cuskey_settings.REPEAT_SETTINGS["wheel"] で設定
 
 # PTTキーの設定（最大3つまで同時押し可能）
 # 例: [Keycode.CONTROL, Keycode.TAB, Keycode.ONE]          # Ctrl+Tab+1
@@ -34,261 +36,252 @@ WHEEL_SCROLL_INTERVAL = 0.05  # マウスホイールスクロール間隔（秒
 #     [Keycode.OPTION, Keycode.CONTROL, Keycode.ONE]       # Option+Ctrl+1
 PTT_KEYS = [Keycode.CONTROL, Keycode.TAB, Keycode.ONE] 
 
-#
-# ボード設定の取得
-#
-pins = cuskey_settings.get_pins()
-features = cuskey_settings.get_features()
-board_name = cuskey_settings.get_board_name()
+# Mode A で PTT キーをボタン押下と同時に押す（長押し判定を待たないので話し始めが切れない）
+# 短く離した場合は PTT キーを離してからクリックとして判定する
+PTT_IMMEDIATE = False
 
-#
-# USBキーボードとマウスの初期化
-#
-keyboard = Keyboard(usb_hid.devices)
-mouse = Mouse(usb_hid.devices)
+# クリック操作の割り当て（(キー, 表示名)、None で割り当てなし）
+# "single" / "double" / "triple" のほか、押し方の列（S: 短押し、L: 長押し）も指定できる
+#   例: "SSSS": (Keycode.END, "END")  # 4 回クリック
+#       "SL": (Keycode.F5, "F5")      # 短押しの後に長押し（長押し単独 "L" は PTT / ホイール用）
+# その先に続く割り当てがない押し方は待たずにすぐ送信する
+#   （ダブルクリックを割り当てていなければシングルクリックを、トリプルがなければダブルクリックをすぐ送信）
+# "undo" はシングルクリックを打ち消すキー（SPECULATIVE_CLICK で使用）
+MODE_A_CLICKS = {
+    "single": (Keycode.ENTER, "Enter"),
+    "double": (Keycode.ESCAPE, "ESC"),
+    "triple": None,
+    "undo": None,  # Enter は取り消せない
+}
+MODE_B_CLICKS = {
+    "single": (Keycode.PAGE_DOWN, "PAGE DOWN"),
+    "double": (Keycode.PAGE_UP, "PAGE UP"),
+    "triple": (Keycode.HOME, "HOME"),
+    "undo": (Keycode.PAGE_UP, "PAGE UP"),
+}
 
-#
-# モード切替ピンの初期化
-#
-# モード切替用GNDピンの設定
-if pins["mode_gnd"]:
-    gnd_pin = digitalio.DigitalInOut(pins["mode_gnd"])
-    gnd_pin.direction = digitalio.Direction.OUTPUT
-    gnd_pin.value = False  # GND（Low）に設定
+# 先行送信: "undo" があるモードではシングルクリックをすぐ送り、
+# ダブルクリックだった場合は undo キーで打ち消してからダブルクリックの動作を送る
+SPECULATIVE_CLICK = False
 
-# MODE_A ピンの設定
-mode_a = digitalio.DigitalInOut(pins["mode_a"])
-mode_a.direction = digitalio.Direction.INPUT
-mode_a.pull = digitalio.Pull.UP
+# クリック回数の名前と押し方の列・表示名
+CLICK_SEQUENCES = {"single": "S", "double": "SS", "triple": "SSS"}
+CLICK_LABELS = {"single": "シングルクリック", "double": "ダブルクリック", "triple": "トリプルクリック"}
 
-#
-# ボタンピンの初期化
-#
-# ボタン用GNDピンの設定
-if pins["button_gnd"]:
-    button_gnd = digitalio.DigitalInOut(pins["button_gnd"])
-    button_gnd.direction = digitalio.Direction.OUTPUT
-    button_gnd.value = False  # GND（Low）に設定
+# 長押し単独の動作（Mode A: PTT、Mode B: ホイールスクロール）
+HOLD_ACTION = "hold"
 
-# ボタン入力ピンの設定
-button = digitalio.DigitalInOut(pins["button"])
-button.direction = digitalio.Direction.INPUT
-button.pull = digitalio.Pull.UP
 
-#
-# 状態管理変数の初期化
-#
-last_button_state = True  # プルアップなので通常はTrue
-button_press_start_time = None
-ptt_key_pressed = False  # PTTキーが現在押されているか（MODE A用）
-is_long_press = False  # 長押し状態か
-wheel_scrolling = False  # マウスホイールスクロール中か（MODE B用）
-last_wheel_scroll_time = 0  # 最後のホイールスクロール時刻
-
-# マルチクリック検出用変数
-last_click_time = 0
-click_count = 0
-pending_single_click = False  # MODE B用：シングルクリック待機中
-last_mode = None  # 最後に記録したモード
+def compile_clicks(clicks):
+    """クリックの割り当てを押し方の木にする（長押し単独は HOLD_ACTION）"""
+    patterns = {cuskey_input.LONG: HOLD_ACTION}
+    for name, action in clicks.items():
+        if name != "undo" and action is not None:
+            patterns[CLICK_SEQUENCES.get(name, name)] = name
+    return cuskey_input.compile_gestures(patterns)
 
-#
-# 起動メッセージ
-#
-print(f"=== {board_name} PTTキーボード起動 ===")
-print(f"ボードタイプ: {cuskey_settings.BOARD_TYPE}")
-print(f"デバッグモード: {features['debug_enabled']}")
-print("-" * 50)
-print("【動作モード】")
-print("  Mode A（スイッチON）:")
-print("    - シングルクリック: Enter")
-ptt_key_names = " + ".join([str(key) for key in PTT_KEYS])
-print(f"    - ボタン長押し: {ptt_key_names}（PTT）")
-print("    - ダブルクリック: ESC")
-print("  Mode B（スイッチOFF）:")
-print("    - シングルクリック: PAGE DOWN")
-print("    - ボタン長押し: マウスホイールダウン")
-print("    - ダブルクリック: PAGE UP")
-print("-" * 50)
 
 #
-# メインループ
+# アプリ本体
 #
-while True:
-    current_time = time.monotonic()
-    
-    # ボタンの現在の状態を読み取り
-    current_button_state = button.value
-    
-    # ボタンが押された瞬間を検出（High → Low）
-    if last_button_state and not current_button_state:
-        # ボタン押下開始時刻を記録
-        button_press_start_time = current_time
-        is_long_press = False
-        wheel_scrolling = False
-        
+class App(cuskey_runtime.App):
+    """PTT キーボード"""
+
+    TITLE = "PTTキーボード"
+    NAME = "ptt_key"
+    HID_DEVICES = ("keyboard", "mouse")
+
+    def __init__(self, ctx):
+        super().__init__(ctx)
+
+        #
+        # USBキーボードとマウスの初期化
+        #
+        self.keyboard = ctx.hid.keyboard
+        self.mouse = ctx.hid.mouse
+
+        #
+        # 状態管理変数の初期化
+        #
+        self.ptt_key_pressed = False  # PTTキーが現在押されているか（MODE A用）
+        self.wheel_scrolling = False  # マウスホイールスクロール中か（MODE B用）
+        self.wheel_repeat = cuskey_repeat.create_repeater(cuskey_settings, "wheel")
+
+        # マルチクリック・長押しの列の判定（モードごとの押し方の木）
+        self.gesture = cuskey_input.SequenceGesture(MIN_PRESS_TIME, LONG_PRESS_TIME, DOUBLE_CLICK_TIME,
+                                                    self._on_gesture)
+        self.gesture_trees = (compile_clicks(MODE_A_CLICKS), compile_clicks(MODE_B_CLICKS))
+        self.click_mode = None  # クリック列を始めたときのモード
+
+    def banner(self):
+        """起動メッセージ"""
+        super().banner()
+        print("-" * 50)
+        print("【動作モード】")
+        print("  Mode A（スイッチON）:")
+        self._print_click(MODE_A_CLICKS, "single", "シングルクリック")
+        ptt_key_names = " + ".join([str(key) for key in PTT_KEYS])
+        print(f"    - ボタン長押し: {ptt_key_names}（PTT）")
+        self._print_clicks(MODE_A_CLICKS)
+        print("  Mode B（スイッチOFF）:")
+        self._print_click(MODE_B_CLICKS, "single", "シングルクリック")
+        print("    - ボタン長押し: マウスホイールダウン")
+        self._print_clicks(MODE_B_CLICKS)
+        print("-" * 50)
+
+    def _print_click(self, clicks, kind, label):
+        if clicks.get(kind) is not None:
+            print(f"    - {label}: {clicks[kind][1]}")
+
+    def _print_clicks(self, clicks):
+        """シングルクリック以外の割り当てを表示"""
+        for name in clicks:
+            if name not in ("single", "undo"):
+                self._print_click(clicks, name, CLICK_LABELS.get(name, name))
+
+    def _clicks(self, mode):
+        """モードのクリック割り当てを返す"""
+        return MODE_B_CLICKS if mode else MODE_A_CLICKS
+
+    def _on_gesture(self, action, now):
+        """確定した押し方の列の動作（長押し単独は PTT / ホイール、それ以外はクリックの割り当てを送信）"""
+        if action == HOLD_ACTION:
+            self._start_hold(now)
+            return
+        mode = self.click_mode
+        clicks = self._clicks(mode)
+        mode_name = "B" if mode else "A"
+        if self.gesture.superseded and clicks["undo"] is not None:
+            key, name = clicks["undo"]
+            self.keyboard.send(key)
+            if self.debug:
+                print(f"[DEBUG][Mode {mode_name}] 先行送信を取り消し → {name}送信")
+        key, name = clicks[action]
+        self.keyboard.send(key)
+        label = CLICK_LABELS.get(action, action)
+        if self.debug:
+            print(f"[DEBUG][Mode {mode_name}] {label} → {name}送信")
+        else:
+            print(f"[Mode {mode_name}] {label} → {name}")
+
+    def on_press(self, now):
+        """ボタンが押された瞬間を検出（High → Low）"""
         # 現在のモードを取得
-        current_mode = mode_a.value
-        
-        # MODE Aでは長押し判定待ち、MODE Bは既存フロー
-        if current_mode == False:  # Mode A
-            if features["debug_enabled"]:
-                print(f"[DEBUG][Mode A] ボタン押下開始")
+        current_mode = self.ctx.read_mode()
+
+        # 待ち時間を過ぎた列を確定し、モードが変わっていたら前のモードのクリック列も確定
+        self.gesture.poll(now)
+        if self.click_mode is not None and current_mode != self.click_mode:
+            self.gesture.flush(now)
+        if self.gesture.node is None:
+            self.click_mode = current_mode
+
+        speculative = SPECULATIVE_CLICK and self._clicks(current_mode)["undo"] is not None
+        self.gesture.press(now, self.gesture_trees[1 if current_mode else 0], speculative)
+        self.wheel_scrolling = False
+
+        if self.debug:
+            print(f"[DEBUG][Mode {'B' if current_mode else 'A'}] ボタン押下開始")
+
+        # 押下と同時に PTT 開始（クリックだった場合は離したときに取り消す）
+        if current_mode == False and PTT_IMMEDIATE:
+            self._ptt_on()
+
+    def _ptt_on(self):
+        """設定された全てのPTTキーを押下"""
+        for key in PTT_KEYS:
+            self.keyboard.press(key)
+        self.ptt_key_pressed = True
+        ptt_key_names = " + ".join([str(key) for key in PTT_KEYS])
+        if self.debug:
+            print(f"[DEBUG][Mode A] {ptt_key_names}キー押下")
         else:
-            if features["debug_enabled"]:
-                print(f"[DEBUG][Mode B] ボタン押下開始")
-    
-    # ボタンが押されている間の処理
-    elif not current_button_state and button_press_start_time is not None:
-        current_mode = mode_a.value
-        press_duration = current_time - button_press_start_time
-        
-        # MODE Aで長押し判定（0.3秒以上）
-        if current_mode == False and not is_long_press and press_duration >= LONG_PRESS_TIME:
-            is_long_press = True
-            # 設定された全てのPTTキーを押下
-            for key in PTT_KEYS:
-                keyboard.press(key)
-            ptt_key_pressed = True
-            ptt_key_names = " + ".join([str(key) for key in PTT_KEYS])
-            if features["debug_enabled"]:
-                print(f"[DEBUG][Mode A] 長押し検出 → {ptt_key_names}キー押下")
-            else:
-                print(f"[Mode A] PTT ON ({ptt_key_names})")
-        
-        # MODE Bで長押し判定（0.3秒以上）
-        elif current_mode == True and not is_long_press and press_duration >= LONG_PRESS_TIME:
-            is_long_press = True
-            wheel_scrolling = True
-            if features["debug_enabled"]:
+            print(f"[Mode A] PTT ON ({ptt_key_names})")
+
+    def _ptt_off(self):
+        """設定された全てのPTTキーをリリース（逆順で）"""
+        for key in reversed(PTT_KEYS):
+            self.keyboard.release(key)
+        ptt_key_names = " + ".join([str(key) for key in PTT_KEYS])
+        if self.debug:
+            print(f"[DEBUG][Mode A] {ptt_key_names}キーリリース")
+        else:
+            print("[Mode A] PTT OFF")
+        self.ptt_key_pressed = False
+
+    def _start_hold(self, now):
+        """長押し単独を検出（MODE A: PTT、MODE B: ホイールスクロール開始）"""
+        if self.ctx.read_mode() == False:  # MODE A: PTT
+            if self.debug:
+                print(f"[DEBUG][Mode A] 長押し検出")
+            if not self.ptt_key_pressed:
+                self._ptt_on()
+        else:  # MODE B: ホイールスクロール
+            self.wheel_scrolling = True
+            self.wheel_repeat.start(now)
+            if self.debug:
                 print(f"[DEBUG][Mode B] 長押し検出 - ホイールスクロール開始")
             else:
                 print("[Mode B] ホイールスクロール開始")
-        
-        # MODE Bで長押し中はマウスホイールを動かす
-        if current_mode == True and wheel_scrolling:
-            if current_time - last_wheel_scroll_time >= WHEEL_SCROLL_INTERVAL:
-                mouse.move(wheel=-1)  # ホイールダウン
-                last_wheel_scroll_time = current_time
-                if features["debug_enabled"]:
-                    print(f"[DEBUG][Mode B] ホイールダウン")
-    
-    # ボタンが離された瞬間を検出（Low → High）
-    elif not last_button_state and current_button_state:
-        if button_press_start_time is not None:
-            press_duration = current_time - button_press_start_time
-            current_mode = mode_a.value
-            
-            # MODE Aの場合: PTTキーをリリース
-            if current_mode == False:
-                if ptt_key_pressed:
-                    # 設定された全てのPTTキーをリリース（逆順で）
-                    for key in reversed(PTT_KEYS):
-                        keyboard.release(key)
-                    ptt_key_names = " + ".join([str(key) for key in PTT_KEYS])
-                    if features["debug_enabled"]:
-                        print(f"[DEBUG][Mode A] {ptt_key_names}キーリリース (押下時間: {press_duration:.3f}秒)")
-                    else:
-                        print("[Mode A] PTT OFF")
-                    ptt_key_pressed = False
-                
-                # MODE Aのマルチクリック検出（長押し以外）
-                if press_duration >= MIN_PRESS_TIME and press_duration < LONG_PRESS_TIME:
-                    if current_time - last_click_time <= DOUBLE_CLICK_TIME and last_mode == False:
-                        click_count += 1
-                        
-                        # ダブルクリック検出
-                        if click_count >= 2:
-                            keyboard.send(Keycode.ESCAPE)
-                            if features["debug_enabled"]:
-                                print(f"[DEBUG][Mode A] ダブルクリック → ESC送信")
-                            else:
-                                print("[Mode A] ダブルクリック → ESC")
-                            click_count = 0
-                            last_click_time = 0
-                            last_mode = None
-                            pending_single_click = False
-                        else:
-                            last_click_time = current_time
-                            last_mode = False
-                            pending_single_click = True
-                    else:
-                        click_count = 1
-                        last_click_time = current_time
-                        last_mode = False
-                        pending_single_click = True
-            
-            # MODE Bの場合
+
+    def on_hold(self, now):
+        """ボタンが押されている間の処理"""
+        current_mode = self.ctx.read_mode()
+
+        # 長押し判定（0.3秒以上、長押し単独なら _start_hold が呼ばれる）
+        self.gesture.hold(now)
+
+        # MODE Bで長押し中はマウスホイールを動かす（押し続けるほど速くなる）
+        if current_mode == True and self.wheel_scrolling:
+            steps = self.wheel_repeat.poll(now)
+            if steps:
+                self.mouse.move(wheel=-steps)  # ホイールダウン
+                if self.debug:
+                    print(f"[DEBUG][Mode B] ホイールダウン x{steps}")
+
+    def on_release(self, now):
+        """ボタンが離された瞬間を検出（Low → High）"""
+        # PTTキーをリリース（先に押していた場合はクリック判定より前に離す）
+        if self.ptt_key_pressed:
+            self._ptt_off()
+
+        # 長押しだった場合はホイールスクロール終了
+        if self.wheel_scrolling:
+            self.wheel_scrolling = False
+            self.wheel_repeat.stop()
+            if self.debug:
+                print(f"[DEBUG][Mode B] ホイールスクロール終了")
             else:
-                # 長押しだった場合はホイールスクロール終了
-                if is_long_press and wheel_scrolling:
-                    wheel_scrolling = False
-                    if features["debug_enabled"]:
-                        print(f"[DEBUG][Mode B] ホイールスクロール終了 (押下時間: {press_duration:.3f}秒)")
-                    else:
-                        print("[Mode B] ホイールスクロール終了")
-                
-                # 短い押下の場合はクリックとしてカウント
-                elif press_duration >= MIN_PRESS_TIME and press_duration < LONG_PRESS_TIME:
-                    if current_time - last_click_time <= DOUBLE_CLICK_TIME and last_mode == True:
-                        click_count += 1
-                        
-                        # ダブルクリック検出
-                        if click_count >= 2:
-                            keyboard.send(Keycode.PAGE_UP)
-                            if features["debug_enabled"]:
-                                print(f"[DEBUG][Mode B] ダブルクリック → PAGE UP送信")
-                            else:
-                                print("[Mode B] ダブルクリック → PAGE UP")
-                            click_count = 0
-                            last_click_time = 0
-                            pending_single_click = False
-                            last_mode = None
-                        else:
-                            last_click_time = current_time
-                            pending_single_click = True
-                            last_mode = True
-                    else:
-                        # 新しいクリックシーケンス開始（シングルクリック候補）
-                        click_count = 1
-                        last_click_time = current_time
-                        pending_single_click = True
-                        last_mode = True
-            
-            # リセット
-            button_press_start_time = None
-            is_long_press = False
-            
-            # チャタリング防止のため少し待機
-            time.sleep(cuskey_settings.DEBOUNCE_TIME)
-    
-    # 前回のボタン状態を更新
-    last_button_state = current_button_state
-    
-    # マルチクリックのタイムアウト処理
-    if click_count > 0 and (current_time - last_click_time > DOUBLE_CLICK_TIME):
-        if click_count == 1 and pending_single_click:
-            # シングルクリック確定
-            if last_mode == False:  # MODE A
-                keyboard.send(Keycode.ENTER)
-                if features["debug_enabled"]:
-                    print(f"[DEBUG][Mode A] シングルクリック → Enter送信")
-                else:
-                    print("[Mode A] シングルクリック → Enter")
-            elif last_mode == True:  # MODE B
-                keyboard.send(Keycode.PAGE_DOWN)
-                if features["debug_enabled"]:
-                    print(f"[DEBUG][Mode B] シングルクリック → PAGE DOWN送信")
-                else:
-                    print("[Mode B] シングルクリック → PAGE DOWN")
-        
-        # リセット
-        pending_single_click = False
-        click_count = 0
-        last_click_time = 0
-        last_mode = None
-    
-    # CPU負荷軽減のため短時間待機
-    time.sleep(cuskey_settings.LOOP_DELAY)
+                print("[Mode B] ホイールスクロール終了")
+
+        # 短い押下はクリックとして列に加える（続く割り当てがなければすぐ送信）
+        self.gesture.release(now)
+
+    def settings_changed(self, names):
+        """調整値ファイルで変わった判定時間・クリックの割り当てを反映"""
+        gesture = self.gesture
+        gesture.min_press = MIN_PRESS_TIME
+        gesture.long_press = LONG_PRESS_TIME
+        gesture.multi_click = DOUBLE_CLICK_TIME
+        if "MODE_A_CLICKS" in names or "MODE_B_CLICKS" in names:
+            self.gesture_trees = (compile_clicks(MODE_A_CLICKS), compile_clicks(MODE_B_CLICKS))
+
+    def tick(self, now):
+        """マルチクリックのタイムアウト処理"""
+        self.gesture.poll(now)
+        # 次にクリック回数が確定する予定の時刻・次のホイールスクロールの時刻
+        deadline = self.gesture.deadline()
+        wheel_deadline = self.wheel_repeat.deadline()
+        if wheel_deadline is not None and (deadline is None or wheel_deadline < deadline):
+            deadline = wheel_deadline
+        return deadline
+
+
+#
+# メインループ（このファイルを code.py としてコピーした場合）
+#
+if __name__ == "__main__":
+    cuskey_runtime.run(App)
 
 """
 ================================================================================
@@ -299,6 +292,7 @@ while True:
 2. 必要なライブラリのコピー
    - Adafruit_CircuitPython_HIDフォルダ内のadafruit_hidフォルダをPicoにコピー
    - cuskey_settings.pyをPicoにコピー
+   - cuskey_runtime.py など cuskey_ で始まるファイルをすべてPicoにコピー
 
 3. このファイルをPicoにコピー
    - ptt_key.pyという名前でPicoのルートディレクトリに保存
@@ -319,8 +313,21 @@ while True:
     - LONG_PRESS_TIME: 長押し判定時間（秒）
       例: LONG_PRESS_TIME = 0.3  # 0.3秒以上で長押し
     
-    - WHEEL_SCROLL_INTERVAL: マウスホイールスクロール間隔（秒）
-      例: WHEEL_SCROLL_INTERVAL = 0.05  # 0.05秒間隔でスクロール
+    - ホイールスクロールの速さは cuskey_settings.py の REPEAT_SETTINGS["wheel"] で設定
+      例: "wheel": (0.05, 20.0, 0.0, 20.0)  # 0.05秒間隔で一定速度（加速なし）
+
+    - MODE_A_CLICKS / MODE_B_CLICKS: クリック操作の割り当て
+      その先に続く割り当てがないクリックは待ち時間なしですぐ送信
+      例: MODE_B_CLICKS["triple"] = None  # PAGE UP（ダブルクリック）を 0.3 秒待たずに送信
+          MODE_B_CLICKS["double"] = None; MODE_B_CLICKS["triple"] = None  # PAGE DOWN をすぐ送信
+      押し方の列（S: 短押し、L: 長押し）で割り当てを増やせる
+      例: MODE_A_CLICKS["SL"] = (Keycode.F5, "F5")  # 短押しの後に長押し
+
+    - PTT_IMMEDIATE: PTT キーをボタン押下と同時に押す（長押し判定を待たない）
+      例: PTT_IMMEDIATE = True  # クリック時も一瞬 PTT が入るが、話し始めが切れない
+
+    - SPECULATIVE_CLICK: 先行送信（取り消しキー "undo" があるモードのみ）
+      例: SPECULATIVE_CLICK = True  # PAGE DOWN をすぐ送り、ダブルクリックなら PAGE UP で戻してから PAGE UP
 
 5. 動作確認
    - Picoを接続すると自動的にプログラムが起動
@@ -328,9 +335,9 @@ while True:
 
 6. 操作方法
     MODE A（スイッチON）: Whisper Flow
+      * シングルクリック: Enterキー（チャット送信）
       * ボタン長押し: PTT_KEYSで設定したキー（PTT - マイクON/OFF）
-      * ダブルクリック: Enterキー（チャット送信）
-      * トリプルクリック: ESCキー（キャンセル）
+      * ダブルクリック: ESCキー（キャンセル）
       * Discord、Zoom、Teamsなどで使用可能
       * 最大3つのキーを同時押しできます（例: Ctrl+Shift+F12）
    
@@ -353,7 +360,7 @@ while True:
      * LONG_PRESS_TIMEの値を調整
    
    - ホイールスクロールの速度を変更したい場合
-     * WHEEL_SCROLL_INTERVALの値を調整（小さいほど速い）
+     * REPEAT_SETTINGS["wheel"]の開始レート・加速・最大レートを調整
    
    - 誤検出が多い場合
      * MIN_PRESS_TIMEの値を大きくしてチャタリング対策を強化
@@ -366,12 +373,13 @@ while True:
   - ボタン長押しでPTT_KEYSで設定したキーをPress/Release
   - Whisper Flowアプリ(https://wisprflow.ai/)のPTT（Push To Talk）機能に対応
   - マイクのON/OFFをボタンで直感的に操作
-  - ダブルクリックでEnter（チャット送信）
-  - トリプルクリックでESC（ダイアログキャンセル）
+  - シングルクリックでEnter（チャット送信）
+  - ダブルクリックでESC（ダイアログキャンセル）
   - 最大3つのキーを同時押し可能（例: Ctrl+Tab+1）
   
   動作仕様：
-  - ボタン押下と同時にPTTキー押下開始（遅延なし）
+  - ボタン押下と同時にPTTキー押下開始（PTT_IMMEDIATE = True の場合。
+    False では LONG_PRESS_TIME の長押し判定後に押下）
   - ボタンリリースで即座にPTTキーリリース
   - Discord、Zoom、Teamsで設定したキーをPTTキーに設定して使用
   - 修飾キー（Ctrl、Shift、Alt）との組み合わせも可能
@@ -383,9 +391,10 @@ while True:
   - トリプルクリック: HOMEキー送信
   
   動作仕様：
-  - 0.3秒未満の押下: シングルクリックとして扱う
+  - 0.3秒未満の押下: クリックとして扱う（トリプルクリックの割り当てがあるので、
+    シングル・ダブルクリックは DOUBLE_CLICK_TIME 待ってから、トリプルクリックはすぐ送信）
   - 0.3秒以上の押下: 長押しとしてホイールスクロール開始
-  - 長押し中は0.05秒間隔でホイールダウンイベント送信
+  - 長押し中はホイールダウンイベントを連続送信（押し続けるほど速くなる）
   - PDFビューアー、Webブラウザなどで快適なスクロール操作
 
 ■ モード切替機能
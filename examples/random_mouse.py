@@ -10,15 +10,16 @@
   Mode B（モードスイッチOFF）: 小さい移動範囲（±MOVE_RANGE_B px）
 
   ※ 動作中にモードスイッチを切り替えると移動範囲が即座に変わります
+
+  移動は瞬間移動ではなく、加減速しながら軽い弧を描いて少しずつ動きます（cuskey_motion）
+  RETURN_TO_ORIGIN が True なら、移動のたびに元の位置へ戻ります
 """
 
-import digitalio
 import time
-import random
-import usb_hid
-from adafruit_hid.mouse import Mouse
 
 import cuskey_settings
+import cuskey_runtime
+import cuskey_motion
 
 # ===========================
 # 設定可能な定数
@@ -34,146 +35,153 @@ MOVE_RANGE_B = 10
 MOVE_INTERVAL_MIN = 1.0
 MOVE_INTERVAL_MAX = 5.0
 
-# ===========================
-# ボード設定の取得
-# ===========================
-pins = cuskey_settings.get_pins()
-features = cuskey_settings.get_features()
-board_name = cuskey_settings.get_board_name()
+# 移動の平均速度（ピクセル/秒）
+MOVE_SPEED = 200
 
-# ===========================
-# マウスの初期化
-# ===========================
-mouse = Mouse(usb_hid.devices)
+# 経路の弧のふくらみの最大値（移動距離に対する割合）
+PATH_BEND = 0.25
 
-# ===========================
-# ピンの初期化
-# ===========================
+# 移動のたびに元の位置へ戻るか（True ならカーソルが少しずつずれていかない）
+RETURN_TO_ORIGIN = True
 
-# モード切替用GNDピンの設定
-if pins["mode_gnd"]:
-    mode_gnd = digitalio.DigitalInOut(pins["mode_gnd"])
-    mode_gnd.direction = digitalio.Direction.OUTPUT
-    mode_gnd.value = False
-
-# MODE_A ピンの設定
-mode_a = digitalio.DigitalInOut(pins["mode_a"])
-mode_a.direction = digitalio.Direction.INPUT
-mode_a.pull = digitalio.Pull.UP
-
-# ボタン用GNDピンの設定
-if pins["button_gnd"]:
-    button_gnd = digitalio.DigitalInOut(pins["button_gnd"])
-    button_gnd.direction = digitalio.Direction.OUTPUT
-    button_gnd.value = False
-
-# ボタン入力ピンの設定
-button = digitalio.DigitalInOut(pins["button"])
-button.direction = digitalio.Direction.INPUT
-button.pull = digitalio.Pull.UP
+# 元の位置へ戻り始めるまでの待ち時間の最小・最大（秒）
+RETURN_PAUSE_MIN = 0.2
+RETURN_PAUSE_MAX = 0.8
 
 # ===========================
-# 状態変数の初期化
-# ===========================
-last_button_state = True
-is_running = False          # マウス移動中かどうか
-last_move_time = 0.0        # 最後にマウスを動かした時刻
-next_move_interval = 0.0    # 次の移動までの待機時間（秒）
-
-if features["debug_enabled"]:
-    last_mode_state = None
-    debug_counter = 0
-
+# アプリ本体
 # ===========================
-# 起動メッセージ
-# ===========================
-print(f"=== {board_name} ランダムマウス移動コントローラー（トグル版）起動 ===")
-print(f"ボードタイプ: {cuskey_settings.BOARD_TYPE}")
-print(f"デバッグモード: {features['debug_enabled']}")
-print("-" * 40)
-print("【操作方法】")
-print("  ボタン押下 → 開始 / 停止 を切り替え")
-print(f"  Mode A（スイッチON）: 移動範囲 ±{MOVE_RANGE}px")
-print(f"  Mode B（スイッチOFF）: 移動範囲 ±{MOVE_RANGE_B}px")
-print(f"  移動間隔: {MOVE_INTERVAL_MIN}〜{MOVE_INTERVAL_MAX}秒（ランダム）")
-print("-" * 40)
-print("状態: 停止中")
-
-# ===========================
-# メインループ
-# ===========================
-while True:
-    now = time.monotonic()
-
-    # デバッグモード: mode_a の値を定期的に表示
-    if features["debug_enabled"]:
-        debug_counter += 1
-        if debug_counter >= cuskey_settings.DEBUG_COUNTER_THRESHOLD:
-            current_mode = mode_a.value
-            if last_mode_state != current_mode:
-                print(f"[DEBUG] モード切替検出: mode_a.value = {current_mode} (False=Mode A, True=Mode B)")
-                last_mode_state = current_mode
-            debug_counter = 0
-
-    # ボタンの現在の状態を読み取り
-    current_button_state = button.value
-
-    # ボタンが押された瞬間を検出（High → Low）
-    if last_button_state and not current_button_state:
-        time.sleep(cuskey_settings.DEBOUNCE_TIME)
-
+class App(cuskey_runtime.App):
+    """ランダムマウス移動コントローラー（トグル版）"""
+
+    TITLE = "ランダムマウス移動コントローラー（トグル版）"
+    NAME = "random_mouse"
+    HID_DEVICES = ("mouse",)
+
+    def __init__(self, ctx):
+        super().__init__(ctx)
+
+        # なめらかなマウス移動（フレームごとに少しずつ送信）と乱数
+        self.motion = cuskey_motion.MouseMotion(ctx.hid, MOVE_SPEED, cuskey_settings.HID_FRAME_INTERVAL)
+        self.rng = cuskey_motion.XorShift16(time.monotonic_ns())
+        self.max_bend = int(PATH_BEND * cuskey_motion.BEND_ONE)
+
+        # 状態変数の初期化
+        self.is_running = False          # マウス移動中かどうか
+        self.last_move_time = 0.0        # 最後にマウスを動かした時刻
+        self.next_move_interval = 0.0    # 次の移動までの待機時間（秒）
+
+        if self.debug:
+            self.last_mode_state = None
+            self.debug_counter = 0
+
+    def settings_changed(self, names):
+        """調整値ファイルで変わった移動速度・弧のふくらみを反映（次の区間から）"""
+        self.motion.speed = MOVE_SPEED
+        self.max_bend = int(PATH_BEND * cuskey_motion.BEND_ONE)
+
+    def banner(self):
+        """起動メッセージ"""
+        super().banner()
+        print("-" * 40)
+        print("【操作方法】")
+        print("  ボタン押下 → 開始 / 停止 を切り替え")
+        print(f"  Mode A（スイッチON）: 移動範囲 ±{MOVE_RANGE}px")
+        print(f"  Mode B（スイッチOFF）: 移動範囲 ±{MOVE_RANGE_B}px")
+        print(f"  移動間隔: {MOVE_INTERVAL_MIN}〜{MOVE_INTERVAL_MAX}秒（ランダム）")
+        print(f"  移動速度: {MOVE_SPEED}px/秒 / 元の位置に戻る: {RETURN_TO_ORIGIN}")
+        print("-" * 40)
+        print("状態: 停止中")
+
+    def on_press(self, now):
+        """ボタンが押された瞬間を検出（High → Low）"""
         # 開始 / 停止 をトグル
-        is_running = not is_running
+        self.is_running = not self.is_running
 
-        if is_running:
-            last_move_time = time.monotonic()
-            next_move_interval = random.uniform(MOVE_INTERVAL_MIN, MOVE_INTERVAL_MAX)
-            if features["debug_enabled"]:
-                print(f"[DEBUG] 開始しました (mode_a.value = {mode_a.value}, 次の移動まで {next_move_interval:.1f}秒)")
+        if self.is_running:
+            self.last_move_time = time.monotonic()
+            self.next_move_interval = self.rng.uniform(MOVE_INTERVAL_MIN, MOVE_INTERVAL_MAX)
+            if self.debug:
+                print(f"[DEBUG] 開始しました (mode_a.value = {self.ctx.read_mode()}, 次の移動まで {self.next_move_interval:.1f}秒)")
             else:
                 print("▶ 開始しました")
         else:
-            if features["debug_enabled"]:
+            # 移動の途中で止めた場合も、元の位置へ戻してから止まる
+            if RETURN_TO_ORIGIN:
+                self.motion.home()
+            else:
+                self.motion.clear()
+            if self.debug:
                 print("[DEBUG] 停止しました")
             else:
                 print("■ 停止しました")
 
-    # 前回の状態を更新
-    last_button_state = current_button_state
-
-    # 動作中はランダム間隔でマウスを移動
-    if is_running:
-        if now - last_move_time >= next_move_interval:
-            current_mode = mode_a.value
+    def tick(self, now):
+        """動作中はランダム間隔でマウスを移動"""
+        # デバッグモード: mode_a の値を定期的に表示
+        if self.debug:
+            self.debug_counter += 1
+            if self.debug_counter >= cuskey_settings.DEBUG_COUNTER_THRESHOLD:
+                current_mode = self.ctx.read_mode()
+                if self.last_mode_state != current_mode:
+                    print(f"[DEBUG] モード切替検出: mode_a.value = {current_mode} (False=Mode A, True=Mode B)")
+                    self.last_mode_state = current_mode
+                self.debug_counter = 0
+
+        # 移動中（停止後に元の位置へ戻る分を含む）はフレームごとに送信
+        motion = self.motion
+        if motion.busy():
+            return motion.poll(now)
+
+        if not self.is_running:
+            return None
+
+        if now - self.last_move_time >= self.next_move_interval:
+            rng = self.rng
+            current_mode = self.ctx.read_mode()
             if current_mode == False:  # Mode A（スイッチがGNDに接続）
-                dx = random.randint(-MOVE_RANGE, MOVE_RANGE)
-                dy = random.randint(-MOVE_RANGE, MOVE_RANGE)
+                move_range = MOVE_RANGE
             else:  # Mode B（スイッチが開いている）
-                dx = random.randint(-MOVE_RANGE_B, MOVE_RANGE_B)
-                dy = random.randint(-MOVE_RANGE_B, MOVE_RANGE_B)
-
-            mouse.move(x=dx, y=dy)
-            last_move_time = now
-            next_move_interval = random.uniform(MOVE_INTERVAL_MIN, MOVE_INTERVAL_MAX)
-
-            if features["debug_enabled"]:
-                print(f"[DEBUG] マウス移動: dx={dx:+d}, dy={dy:+d} → 次の移動まで {next_move_interval:.1f}秒")
+                move_range = MOVE_RANGE_B
+            dx = rng.randint(-move_range, move_range)
+            dy = rng.randint(-move_range, move_range)
+            bend = rng.randint(-self.max_bend, self.max_bend)
+
+            motion.move(dx, dy, bend)
+            if RETURN_TO_ORIGIN:
+                # 行きと同じ速さ・反対側の弧で戻る（ポインターの加速が効いても元の位置に戻る）
+                motion.move(-dx, -dy, bend, rng.uniform(RETURN_PAUSE_MIN, RETURN_PAUSE_MAX))
+            self.last_move_time = now
+            self.next_move_interval = rng.uniform(MOVE_INTERVAL_MIN, MOVE_INTERVAL_MAX)
+
+            if self.debug:
+                print(f"[DEBUG] マウス移動: dx={dx:+d}, dy={dy:+d} → 次の移動まで {self.next_move_interval:.1f}秒")
             else:
-                print(f"マウス移動: dx={dx:+d}, dy={dy:+d} → 次の移動まで {next_move_interval:.1f}秒")
+                print(f"マウス移動: dx={dx:+d}, dy={dy:+d} → 次の移動まで {self.next_move_interval:.1f}秒")
+            return motion.poll(now)
 
-    # CPU負荷軽減のため短時間待機
-    time.sleep(cuskey_settings.LOOP_DELAY)
+        # 次の移動予定時刻
+        return self.last_move_time + self.next_move_interval
 
 
+# ===========================
+# メインループ（このファイルを code.py としてコピーした場合）
+# ===========================
+if __name__ == "__main__":
+    cuskey_runtime.run(App)
+
 """
 【使用方法】
 1. cuskey_settings.py と本ファイル（randam_mouse.py）を CIRCUITPY にコピー。
+   cuskey_runtime.py など cuskey_ で始まるファイルもすべて CIRCUITPY にコピー。
 2. randam_mouse.py を code.py にリネームするか、直接実行。
 3. adafruit_hid モジュールが CIRCUITPY/lib/ に必要。
 
 【動作説明】
 - ボタンを押すごとに「開始」「停止」をトグル。
 - 動作中は MOVE_INTERVAL 秒ごとにマウスをランダムな方向へ移動し続ける。
+- 移動は MOVE_SPEED の速さで加減速しながら弧を描いてなめらかに動く（USB のフレームごとに少しずつ送信）。
+- RETURN_TO_ORIGIN が True なら移動のたびに元の位置へ戻り、停止したときも元の位置へ戻ってから止まる。
 - Mode A（モードスイッチON）: 移動範囲が広い（±MOVE_RANGE px）。
 - Mode B（モードスイッチOFF）: 移動範囲が狭い（±MOVE_RANGE_B px）。
 - 動作中にモードスイッチを切り替えると移動範囲が即座に切り替わる。
@@ -184,4 +192,8 @@ while True:
   MOVE_RANGE_B       : Mode B 移動範囲 (±px)
   MOVE_INTERVAL_MIN  : 移動間隔の最小値 (秒)
   MOVE_INTERVAL_MAX  : 移動間隔の最大値 (秒)
+  MOVE_SPEED         : 移動の平均速度 (px/秒)
+  PATH_BEND          : 経路の弧のふくらみの最大値 (移動距離に対する割合)
+  RETURN_TO_ORIGIN   : 移動のたびに元の位置へ戻るか
+  RETURN_PAUSE_MIN/MAX : 元の位置へ戻り始めるまでの待ち時間 (秒)
 """
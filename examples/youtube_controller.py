@@ -4,184 +4,170 @@ ProMiroPico と Piromoni_PocoMini の両方に対応
 設定はcuskey_settings.pyで管理
 """
 
-import digitalio
-import time
-import usb_hid
-from adafruit_hid.keyboard import Keyboard
 from adafruit_hid.keycode import Keycode
-from adafruit_hid.consumer_control import ConsumerControl
 from adafruit_hid.consumer_control_code import ConsumerControlCode
-from adafruit_hid.mouse import Mouse
+
+# =============================================================================
+# ===================== ここから設定エリア =====================
+# =============================================================================
+
+# 長押し（Mode A）の巻き戻しで送るキー・回数・キーの間隔（秒）
+REWIND_KEY = Keycode.LEFT_ARROW
+REWIND_COUNT = 2
+REWIND_INTERVAL = 0.05
+
+# =============================================================================
+# ===================== ここまで設定エリア =====================
+# =============================================================================
 
 # ボード設定をインポート
 import cuskey_settings
+import cuskey_runtime
+import cuskey_macro
 
-#
-# ボード設定の取得
-#
-pins = cuskey_settings.get_pins()
-features = cuskey_settings.get_features()
-board_name = cuskey_settings.get_board_name()
 
-#
-# USBキーボード、コンシューマーコントロール、マウスの初期化
-#
-keyboard = Keyboard(usb_hid.devices)
-consumer_control = ConsumerControl(usb_hid.devices)
-mouse = Mouse(usb_hid.devices)
+class App(cuskey_runtime.App):
+    """メディアキーボード（YouTube などの動画プレイヤー操作）"""
 
-#
-# Play/Stop ボタンキー初期化
-#
-# ボタン用GNDピンの設定
-if pins["button_gnd"]:
-    gnd_pin = digitalio.DigitalInOut(pins["button_gnd"])
-    gnd_pin.direction = digitalio.Direction.OUTPUT
-    gnd_pin.value = False  # GND（Low）に設定
+    TITLE = "メディアキーボード"
+    NAME = "youtube_controller"
+    HID_DEVICES = ("keyboard", "consumer_control", "mouse")
 
-# ボタン入力ピンの設定
-button = digitalio.DigitalInOut(pins["button"])
-button.direction = digitalio.Direction.INPUT
-button.pull = digitalio.Pull.UP
+    def __init__(self, ctx):
+        super().__init__(ctx)
 
-#
-# モード切替ピンの初期化
-#
-# モード切替用GNDピンの設定
-if pins["mode_gnd"]:
-    gnd_pin2 = digitalio.DigitalInOut(pins["mode_gnd"])
-    gnd_pin2.direction = digitalio.Direction.OUTPUT
-    gnd_pin2.value = False  # GND（Low）に設定
-
-# MODE_A ピンの設定
-mode_a = digitalio.DigitalInOut(pins["mode_a"])
-mode_a.direction = digitalio.Direction.INPUT
-mode_a.pull = digitalio.Pull.UP
-
-# MODE_B ピンの設定（使用する場合）
-mode_b = None
-if features["dual_mode"] and pins["mode_b"]:
-    mode_b = digitalio.DigitalInOut(pins["mode_b"])
-    mode_b.direction = digitalio.Direction.INPUT
-    mode_b.pull = digitalio.Pull.UP
+        #
+        # USBキーボード、コンシューマーコントロール、マウスの初期化
+        #
+        self.keyboard = ctx.hid.keyboard
+        self.consumer_control = ctx.hid.consumer_control
+        self.mouse = ctx.hid.mouse
 
-#
-# 状態管理変数の初期化
-#
-last_button_state = True  # プルアップなので通常はTrue
-button_pressed = False
-button_press_time = 0  # ボタンが押された時刻を記録
+        #
+        # キー入力マクロ（巻き戻しのキーを間隔をあけて送る。文字列は送らないので配列表は読み込まない）
+        #
+        self.macro = cuskey_macro.MacroPlayer(ctx.hid, None, cuskey_settings.TYPING_RATE)
 
-# デバッグ用変数（デバッグモードが有効な場合のみ使用）
-if features["debug_enabled"]:
-    last_mode_state = None
-    debug_counter = 0
+        #
+        # 状態管理変数の初期化
+        #
+        self.button_pressed = False
+        self.button_press_time = 0  # ボタンが押された時刻を記録
 
-#
-# 起動メッセージ
-#
-print(f"=== {board_name} メディアキーボード起動 ===")
-print(f"ボードタイプ: {cuskey_settings.BOARD_TYPE}")
-print(f"デバッグモード: {features['debug_enabled']}")
-print("-" * 40)
-print("【操作方法】")
-print("通常押下:")
-print("  - Mode A: PLAY_PAUSE")
-print("  - Mode B: マウスホイール下")
-print(f"長押し({cuskey_settings.LONG_PRESS_THRESHOLD}秒):")
-print("  - Mode A: 巻き戻し(左矢印×2)")
-print("  - Mode B: PLAY_PAUSE")
-print("-" * 40)
+        # デバッグ用変数（デバッグモードが有効な場合のみ使用）
+        if self.debug:
+            self.last_mode_state = None
+            self.debug_counter = 0
 
-#
-# メインループ
-#
-while True:
-    # デバッグモード: mode_aの値を定期的に表示
-    if features["debug_enabled"]:
-        debug_counter += 1
-        if debug_counter >= cuskey_settings.DEBUG_COUNTER_THRESHOLD:
-            current_mode = mode_a.value
-            if last_mode_state != current_mode:
-                print(f"[DEBUG] モード切替検出: mode_a.value = {current_mode} (False=Mode A, True=Mode B)")
-                last_mode_state = current_mode
-            debug_counter = 0
-    
-    # ボタンの現在の状態を読み取り
-    current_button_state = button.value
-    
-    # ボタンが押された瞬間を検出（High → Low）
-    if last_button_state and not current_button_state and not button_pressed:
-        button_pressed = True
-        button_press_time = time.monotonic()  # 押された時刻を記録
-        if features["debug_enabled"]:
+    def banner(self):
+        """起動メッセージ"""
+        super().banner()
+        print("-" * 40)
+        print("【操作方法】")
+        print("通常押下:")
+        print("  - Mode A: PLAY_PAUSE")
+        print("  - Mode B: マウスホイール下")
+        print(f"長押し({cuskey_settings.LONG_PRESS_THRESHOLD}秒):")
+        print(f"  - Mode A: 巻き戻し(左矢印×{REWIND_COUNT})")
+        print("  - Mode B: PLAY_PAUSE")
+        print("-" * 40)
+
+    def on_press(self, now):
+        """ボタンが押された瞬間を検出（High → Low）"""
+        if self.button_pressed:
+            return
+        self.button_pressed = True
+        self.button_press_time = now  # 押された時刻を記録
+        if self.debug:
             print("[DEBUG] ボタンが押されました")
         else:
             print("ボタンが押されました")
-        
-        # チャタリング防止のため少し待機
-        time.sleep(cuskey_settings.DEBOUNCE_TIME)
-    
-    # ボタンが離された瞬間を検出（Low → High）
-    elif not last_button_state and current_button_state and button_pressed:
-        button_pressed = False
+
+    def on_release(self, now):
+        """ボタンが離された瞬間を検出（Low → High）"""
+        if not self.button_pressed:
+            return
+        self.button_pressed = False
         # 押されていた時間を計算
-        press_duration = time.monotonic() - button_press_time
-        
-        if features["debug_enabled"]:
+        press_duration = now - self.button_press_time
+
+        if self.debug:
             print(f"[DEBUG] ボタンが離されました（押下時間: {press_duration:.2f}秒）")
         else:
             print(f"ボタンが離されました（押下時間: {press_duration:.2f}秒）")
-        
+
         # 現在のモードを取得
-        current_mode = mode_a.value
-        
+        current_mode = self.ctx.read_mode()
+
         if press_duration >= cuskey_settings.LONG_PRESS_THRESHOLD:
             # 長押しの処理
-            if features["debug_enabled"]:
+            if self.debug:
                 print(f"[DEBUG] 長押しを検出しました (mode_a.value = {current_mode})")
             else:
                 print("長押しを検出しました")
-            
+
             if current_mode == False:  # Mode A（スイッチがGNDに接続）
                 # MEMO: Windowにフォーカスが当たっていないと効かない
-                # 巻き戻し：左矢印キーを2回送信
-                keyboard.send(Keycode.LEFT_ARROW)
-                time.sleep(0.05)  # キー送信間の遅延
-                keyboard.send(Keycode.LEFT_ARROW)
-                
-                mode_label = "[Mode A]" if features["debug_enabled"] else ""
-                print(f"{mode_label} 巻き戻し：左矢印キー×2を送信")
+                # 巻き戻し：左矢印キーを REWIND_INTERVAL 秒間隔で送信（送信は tick で行う）
+                self.rewind()
+
+                mode_label = "[Mode A]" if self.debug else ""
+                print(f"{mode_label} 巻き戻し：左矢印キー×{REWIND_COUNT}を送信")
             else:  # Mode B（スイッチが開いている）
                 # PLAY_PAUSEコマンドを送信
-                consumer_control.send(ConsumerControlCode.PLAY_PAUSE)
-                
-                mode_label = "[Mode B]" if features["debug_enabled"] else ""
+                self.consumer_control.send(ConsumerControlCode.PLAY_PAUSE)
+
+                mode_label = "[Mode B]" if self.debug else ""
                 print(f"{mode_label} PLAY_PAUSEコマンドを送信")
         else:
             # 通常の押下の処理
-            if features["debug_enabled"]:
+            if self.debug:
                 print(f"[DEBUG] 通常の押下を検出しました (mode_a.value = {current_mode})")
             else:
                 print("通常の押下を検出しました")
-            
+
             if current_mode == False:  # Mode A（スイッチがGNDに接続）
                 # PLAY_PAUSEコマンドを送信
-                consumer_control.send(ConsumerControlCode.PLAY_PAUSE)
-                
-                mode_label = "[Mode A]" if features["debug_enabled"] else ""
+                self.consumer_control.send(ConsumerControlCode.PLAY_PAUSE)
+
+                mode_label = "[Mode A]" if self.debug else ""
                 print(f"{mode_label} PLAY_PAUSEコマンドを送信")
             else:  # Mode B（スイッチが開いている）
                 # マウスホイール下方向を送信
-                mouse.move(wheel=-1)  # 負の値で下方向
-                
-                mode_label = "[Mode B]" if features["debug_enabled"] else ""
+                self.mouse.move(wheel=-1)  # 負の値で下方向
+
+                mode_label = "[Mode B]" if self.debug else ""
                 print(f"{mode_label} マウスホイール下方向を送信")
-        
-        time.sleep(cuskey_settings.DEBOUNCE_TIME)  # チャタリング防止
-    
-    # 前回の状態を更新
-    last_button_state = current_button_state
-    
-    # CPU負荷軽減のため短時間待機
-    time.sleep(cuskey_settings.LOOP_DELAY)
+
+    def rewind(self):
+        """巻き戻しのキー送信を予約（送信は tick で行う）"""
+        macro = self.macro
+        for i in range(REWIND_COUNT):
+            if i:
+                macro.wait(REWIND_INTERVAL)
+            macro.key(REWIND_KEY)
+
+    def deinit(self):
+        """送信待ちの手順を取り消してキーを離す"""
+        self.macro.clear()
+        super().deinit()
+
+    def tick(self, now):
+        """巻き戻しのキーを送信し、次の送信予定時刻を返す（デバッグモード: mode_aの値を定期的に表示）"""
+        deadline = self.macro.tick(now)
+        if self.debug:
+            self.debug_counter += 1
+            if self.debug_counter >= cuskey_settings.DEBUG_COUNTER_THRESHOLD:
+                current_mode = self.ctx.read_mode()
+                if self.last_mode_state != current_mode:
+                    print(f"[DEBUG] モード切替検出: mode_a.value = {current_mode} (False=Mode A, True=Mode B)")
+                    self.last_mode_state = current_mode
+                self.debug_counter = 0
+        return deadline
+
+
+#
+# メインループ（このファイルを code.py としてコピーした場合）
+#
+if __name__ == "__main__":
+    cuskey_runtime.run(App)
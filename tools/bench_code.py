@@ -0,0 +1,15 @@
+"""
+マイクロベンチマーク（実機用の code.py）
+CIRCUITPY の code.py としてコピーし、cuskey_bench.py と一緒に置く（cuskey_*.py・cuskey_settings.py は通常どおり）
+ピン読み取り・チャタリング除去・押し方の判定・アプリへの振り分け・レポート送信・トレース記録を
+それぞれ繰り返し呼び、1 秒あたりの回数・1 回あたりの時間・確保するメモリをシリアルに表示する
+レポート送信は空のレポート（全キー解放）なので、計測中にホストへ何も入力されない
+計測が終わったら元の code.py に戻す
+"""
+
+import cuskey_bench
+
+# 1 部品あたりの呼び出し回数
+COUNT = 1000
+
+cuskey_bench.main(COUNT)
@@ -0,0 +1,209 @@
+"""
+チャタリング注入ベンチマーク
+接点バウンスやノイズを含む合成ボタン入力を作り、シミュレーター上の ptt_key（Mode A）で
+入力処理からジェスチャー判定までを通して、誤検出・取りこぼし・誤判定と遅延を測る
+DEBOUNCE_TIME・MIN_PRESS_TIME・DEBOUNCE_STABLE_TIME を総当たりで試し、
+安いスイッチでも誤動作しない最小遅延の設定を表示する
+
+使い方:
+    python tools/bounce_bench.py
+    python tools/bounce_bench.py --profile cheap --profile noisy --presses 20
+    python tools/bounce_bench.py --debounce 0 0.02 0.05 --stable 0 0.005 0.01
+"""
+
+import argparse
+import itertools
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import cuskey_sim  # noqa: E402
+
+# バウンスのモデル
+#   bounce: 1 エッジあたりのバウンス継続時間の範囲（秒）
+#   toggles: バウンス中に余分に往復する回数の範囲
+#   spikes: 1 スロットあたりのノイズスパイク数、spike: スパイク幅の範囲（秒）
+PROFILES = {
+    "clean": {"bounce": (0.0, 0.0), "toggles": (0, 0), "spikes": 0, "spike": (0.0, 0.0)},
+    "typical": {"bounce": (0.0005, 0.003), "toggles": (1, 3), "spikes": 0, "spike": (0.0, 0.0)},
+    "cheap": {"bounce": (0.003, 0.015), "toggles": (2, 8), "spikes": 0, "spike": (0.0, 0.0)},
+    "noisy": {"bounce": (0.003, 0.015), "toggles": (2, 8), "spikes": 2, "spike": (0.0002, 0.004)},
+}
+
+GESTURES = ("single", "double", "long", "idle")
+
+# ジェスチャー 1 回分の時間枠（秒）
+SLOT = 1.6
+SLOT_OFFSET = 0.2
+
+# ptt_key（Mode A）のレポートからジェスチャーを判定するためのキー
+ENTER = cuskey_sim.KEYCODES["ENTER"]
+ESCAPE = cuskey_sim.KEYCODES["ESCAPE"]
+
+
+def gesture_presses(gesture, rng):
+    """ジェスチャーの押下区間 [(押した時刻, 離した時刻), ...]（スロット先頭からの秒）"""
+    if gesture == "single":
+        return [(0.0, rng.uniform(0.08, 0.18))]
+    if gesture == "double":
+        first = rng.uniform(0.07, 0.12)
+        gap = rng.uniform(0.06, 0.12)
+        return [(0.0, first), (first + gap, first + gap + rng.uniform(0.07, 0.12))]
+    if gesture == "long":
+        return [(0.0, rng.uniform(0.6, 1.0))]
+    return []
+
+
+def bounce_edges(t, level, profile, rng):
+    """時刻 t にピンを level にするエッジと、その後のバウンスを返す"""
+    edges = [(t, level)]
+    toggles = rng.randint(*profile["toggles"])
+    if toggles:
+        length = rng.uniform(*profile["bounce"])
+        times = sorted(rng.uniform(0, length) for _ in range(toggles * 2))
+        for i, dt in enumerate(times):
+            edges.append((t + dt, level if i % 2 else not level))
+    return edges
+
+
+def build_trace(plan, profile, rng):
+    """ジェスチャー計画からトレース（ピン値）と期待値を生成"""
+    edges = []
+    expected = []  # (スロット開始, スロット終了, ジェスチャー, 基準時刻)
+    for index, gesture in enumerate(plan):
+        slot_start = SLOT_OFFSET + index * SLOT
+        presses = gesture_presses(gesture, rng)
+        for down, up in presses:
+            edges += bounce_edges(slot_start + down, False, profile, rng)
+            edges += bounce_edges(slot_start + up, True, profile, rng)
+
+        # 遅延の基準: シングル/ダブルは最後に離した時刻、長押しは押した時刻
+        if gesture == "long":
+            reference = slot_start + presses[0][0]
+        elif presses:
+            reference = slot_start + presses[-1][1]
+        else:
+            reference = None
+        expected.append((slot_start, slot_start + SLOT, gesture, reference))
+
+        # ノイズスパイク（本来のレベルと逆の短いパルス）
+        for _ in range(profile["spikes"]):
+            t = slot_start + rng.uniform(0.0, SLOT - 0.05)
+            level = not any(slot_start + down <= t < slot_start + up for down, up in presses)
+            width = rng.uniform(*profile["spike"])
+            edges.append((t, not level))
+            edges.append((t + width, level))
+
+    edges.sort(key=lambda e: e[0])
+    events = [(0.0, True, False)]  # ボタン開放・Mode A
+    for t, level in edges:
+        events.append((t, level, False))
+    return events, expected
+
+
+def detect(reports):
+    """ptt_key（Mode A）のレポート列からジェスチャー [(時刻, 種類)] を取り出す"""
+    detected = []
+    previous = bytes(8)
+    for t, device, report in reports:
+        if device != "keyboard":
+            continue
+        if ENTER in report[2:] and ENTER not in previous[2:]:
+            detected.append((t, "single"))
+        if ESCAPE in report[2:] and ESCAPE not in previous[2:]:
+            detected.append((t, "double"))
+        if report[0] and not previous[0]:
+            detected.append((t, "long"))
+        previous = report
+    return detected
+
+
+def score(expected, detected):
+    """期待値と検出結果を突き合わせて集計"""
+    result = {"false": 0, "missed": 0, "misclassified": 0, "latency": {"single": [], "double": [], "long": []}}
+    for slot_start, slot_end, gesture, reference in expected:
+        found = [d for d in detected if slot_start <= d[0] < slot_end]
+        if gesture == "idle":
+            result["false"] += len(found)
+            continue
+        if not found:
+            result["missed"] += 1
+            continue
+        t, kind = found[0]
+        if kind != gesture:
+            result["misclassified"] += 1
+        else:
+            result["latency"][gesture].append(t - reference)
+        result["false"] += len(found) - 1
+    return result
+
+
+def run_case(overrides, profile_name, presses, seed):
+    """1 つの設定・プロファイルで計測"""
+    rng = random.Random(seed)
+    plan = [g for g in GESTURES for _ in range(presses)]
+    rng.shuffle(plan)
+    events, expected = build_trace(plan, PROFILES[profile_name], rng)
+    reports = cuskey_sim.Simulator(overrides=overrides, seed=seed).run("ptt_key", events, tail=SLOT)
+    return score(expected, detect(reports))
+
+
+def mean(values):
+    return sum(values) / len(values) if values else float("nan")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="チャタリング注入によるデバウンス精度と遅延のベンチマーク")
+    parser.add_argument("--profile", action="append", choices=sorted(PROFILES),
+                        help="バウンスのモデル（複数指定可、既定: typical, cheap, noisy）")
+    parser.add_argument("--presses", type=int, default=10, help="ジェスチャー種類ごとの試行回数")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--debounce", type=float, nargs="+", default=[0.0, 0.02, 0.05], help="DEBOUNCE_TIME の候補")
+    parser.add_argument("--min-press", type=float, nargs="+", default=[0.03, 0.05], help="MIN_PRESS_TIME の候補")
+    parser.add_argument("--stable", type=float, nargs="+", default=[0.0, 0.005, 0.01, 0.02],
+                        help="DEBOUNCE_STABLE_TIME の候補")
+    args = parser.parse_args(argv)
+    profiles = args.profile or ["typical", "cheap", "noisy"]
+
+    # 基準: バウンスなし・デバウンスなしの遅延
+    reference = run_case({"DEBOUNCE_TIME": 0.0, "DEBOUNCE_STABLE_TIME": 0.0}, "clean", args.presses, args.seed)
+    reference_latency = {g: mean(v) for g, v in reference["latency"].items()}
+
+    print(f"プロファイル: {', '.join(profiles)} / ジェスチャーごと {args.presses} 回")
+    print("基準遅延（バウンスなし）: " + ", ".join(f"{g} {v * 1000:.0f}ms" for g, v in reference_latency.items()))
+    print()
+    print(f"{'DEBOUNCE':>8} {'MIN_PRESS':>9} {'STABLE':>6} | {'誤検出':>4} {'取りこぼし':>5} {'誤判定':>4} |"
+          f" {'single+':>7} {'double+':>7} {'long+':>6} (ms)")
+
+    rows = []
+    for debounce, min_press, stable in itertools.product(args.debounce, args.min_press, args.stable):
+        overrides = {"DEBOUNCE_TIME": debounce, "MIN_PRESS_TIME": min_press, "DEBOUNCE_STABLE_TIME": stable}
+        totals = {"false": 0, "missed": 0, "misclassified": 0}
+        latency = {"single": [], "double": [], "long": []}
+        for profile_name in profiles:
+            result = run_case(overrides, profile_name, args.presses, args.seed)
+            for key in totals:
+                totals[key] += result[key]
+            for gesture, values in result["latency"].items():
+                latency[gesture] += values
+        added = {g: mean(v) - reference_latency[g] for g, v in latency.items()}
+        errors = totals["false"] + totals["missed"] + totals["misclassified"]
+        rows.append((errors, mean(list(added.values())), overrides))
+        print(f"{debounce:8.3f} {min_press:9.3f} {stable:6.3f} | {totals['false']:6d} {totals['missed']:10d}"
+              f" {totals['misclassified']:6d} | {added['single'] * 1000:7.1f} {added['double'] * 1000:7.1f}"
+              f" {added['long'] * 1000:6.1f}")
+
+    best = min(rows, key=lambda r: (r[0], round(r[1], 4), r[2]["DEBOUNCE_TIME"], r[2]["DEBOUNCE_STABLE_TIME"]))
+    print()
+    if best[0]:
+        print(f"※ すべての候補で誤動作が残りました（最小 {best[0]} 件）。候補を広げてください")
+    print("# 推奨設定（誤動作が最も少なく、その中で追加遅延が最小）")
+    print(f"DEBOUNCE_TIME = {best[2]['DEBOUNCE_TIME']}")
+    print(f"DEBOUNCE_STABLE_TIME = {best[2]['DEBOUNCE_STABLE_TIME']}")
+    print(f"MIN_PRESS_TIME = {best[2]['MIN_PRESS_TIME']}  # ptt_key.py")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+"""
+設定の一括配布
+設定ファイル（JSON: ボード名・アプリの定数・プリセット・マクロ）を PC でデバイスのバイナリ
+（cuskey_preset・cuskey_config の形式）に変換し、データチャンネル（cuskey_link）で NVM に書き込む
+CIRCUITPY に .py をコピーし直す代わりに、複数台へまとめて配布できる
+
+書き込みは領域ごとに
+    1. CHECK でデバイスの内容のブロックごとの CRC を読み、変換したバイナリと比べる
+    2. 違うブロックだけを WRITE で送る（続いたブロックはペイロードの上限までまとめて 1 フレームにする）
+    3. COMMIT で全体の CRC を確かめてから NVM に 1 回で書き込む
+途中で切れても NVM は元のままで、次に実行すると CHECK で送り終えたブロックを飛ばして続きから送る
+
+設定ファイルの形式:
+    {
+        "board": "4pin",                                  # 違うボードには書き込まない（--force で無視）
+        "apps": {"ptt_key": {"LONG_PRESS_TIME": 0.35},
+                 "meeting_controller": {"CUSTOM_MUTE_KEYS": "key:CONTROL+SHIFT+M"}},
+        "presets": "default",                             # tools/gen_presets.py の PRESETS、または
+                                                          # [[名前, [キー名, ...], 表示名, 対象アプリ名], ...]
+        "macros": {"greeting": ["text:hello", "key:ENTER", "wait:0.5"]}
+    }
+定数の値の "key:A+B" はキーコードのタプルに変換する。マクロは tools/linkctl.py play NAME で再生
+
+使い方:
+    python tools/cuskey_deploy.py config.json /dev/ttyACM1 /dev/ttyACM3 ...
+    python tools/cuskey_deploy.py config.json --compile-only             # 変換したバイナリの大きさを表示
+    python tools/cuskey_deploy.py config.json --sim meeting_controller   # シミュレーター（pty）に書き込む
+    python tools/cuskey_deploy.py config.json /dev/pts/5 --max-writes 1  # 途中で止める（再開の確認用）
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+TOOLS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(TOOLS)
+sys.path.insert(0, ROOT)
+import cuskey_config  # noqa: E402
+import cuskey_link  # noqa: E402
+import cuskey_preset  # noqa: E402
+
+sys.path.insert(0, TOOLS)
+import cuskey_sim  # noqa: E402
+import gen_presets  # noqa: E402
+import linkctl  # noqa: E402
+
+# CHECK で CRC を比べるブロックの大きさ（bytes）
+BLOCK_SIZE = 64
+
+# WRITE のペイロードのうち、領域(1)・位置(2) を除いたデータの上限
+WRITE_HEADER_SIZE = 3
+
+
+class Interrupted(Exception):
+    """--max-writes で送信を打ち切った"""
+
+
+def compile_value(value):
+    """設定ファイルの値をデバイスの定数の値にする（"key:A+B" はキーコードのタプル、リストはタプル）"""
+    if isinstance(value, str) and value.startswith("key:"):
+        return tuple(cuskey_sim.KEYCODES[name] for name in value[4:].split("+"))
+    if isinstance(value, list):
+        return tuple(compile_value(item) for item in value)
+    if isinstance(value, dict):
+        return {key: compile_value(item) for key, item in value.items()}
+    return value
+
+
+def compile_presets(presets):
+    """プリセットの指定を cuskey_preset のバイナリにする（指定がなければ None）"""
+    if presets is None:
+        return None
+    if presets == "default":
+        presets = gen_presets.PRESETS
+    return cuskey_preset.pack([(name, tuple(cuskey_sim.KEYCODES[key] for key in keys), label, app_label)
+                               for name, keys, label, app_label in presets], deployed=True)
+
+
+def compile_config(config):
+    """設定ファイルの内容を {領域: バイナリ} にする"""
+    constants = []
+    for app, values in config.get("apps", {}).items():
+        for key, value in values.items():
+            constants.append((app, key, compile_value(value)))
+    macros = []
+    for name, steps in config.get("macros", {}).items():
+        macros.append((name, cuskey_link.encode_macro(linkctl.parse_macro(steps))))
+    images = {cuskey_link.REGION_CONFIG: cuskey_config.pack(constants, macros)}
+    presets = compile_presets(config.get("presets"))
+    if presets is not None:
+        images[cuskey_link.REGION_PRESETS] = presets
+    return images
+
+
+def block_crcs(image, block=BLOCK_SIZE):
+    return [cuskey_preset.crc16(image[start:start + block]) for start in range(0, len(image), block)]
+
+
+def changed_runs(image, device_crcs, block=BLOCK_SIZE):
+    """デバイスと CRC が違うブロックを、続いたものをまとめて (位置, 長さ) のリストにする"""
+    runs = []
+    for index, crc in enumerate(block_crcs(image, block)):
+        if index < len(device_crcs) and device_crcs[index] == crc:
+            continue
+        start = index * block
+        length = min(block, len(image) - start)
+        if runs and runs[-1][0] + runs[-1][1] == start:
+            runs[-1] = (runs[-1][0], runs[-1][1] + length)
+        else:
+            runs.append((start, length))
+    return runs
+
+
+class Deployer:
+    """1 台のデバイスに領域ごとのバイナリを書き込む
+
+    log: 進み具合を表示する関数
+    max_writes: この数の WRITE を送ったら打ち切る（None なら最後まで）
+    """
+
+    def __init__(self, client, max_payload, log, max_writes=None):
+        self.client = client
+        self.frame_data = max_payload - WRITE_HEADER_SIZE
+        self.log = log
+        self.max_writes = max_writes
+        self.writes = 0
+        self.data_bytes = 0  # WRITE で送ったデータのバイト数
+
+    def deploy(self, region, image):
+        """image を領域 region に書き込み、NVM を書き換えたら True"""
+        client = self.client
+        for _ in range(2):
+            runs = changed_runs(image, client.check(region, 0, len(image), BLOCK_SIZE))
+            changed = sum(length for _, length in runs)
+            if changed:
+                self.log(f"領域 {region}: {len(image)} bytes のうち {changed} bytes を送信")
+            for start, length in runs:
+                for position in range(start, start + length, self.frame_data):
+                    if self.max_writes is not None and self.writes >= self.max_writes:
+                        raise Interrupted()
+                    chunk = image[position:min(position + self.frame_data, start + length)]
+                    client.write(region, position, chunk)
+                    self.writes += 1
+                    self.data_bytes += len(chunk)
+            try:
+                return client.commit(region, len(image), cuskey_preset.crc16(image))
+            except linkctl.LinkError as e:
+                # 作業領域とずれていれば（デバイスの再起動など）CHECK からやり直す
+                self.log(f"領域 {region}: {e} -> 確認し直します")
+        raise linkctl.LinkError(f"領域 {region} を書き込めません")
+
+
+def deploy_port(port, images, board, args, lock):
+    """1 台に配布し、成功したら True"""
+    def log(message):
+        with lock:
+            print(f"[{port}] {message}", flush=True)
+
+    try:
+        client = linkctl.LinkClient(port, timeout=args.timeout)
+    except OSError as e:
+        log(f"開けません: {e}")
+        return False
+    start = time.monotonic()
+    deployer = None
+    try:
+        version, max_payload, device_board, names = client.ping()
+        if version < cuskey_link.PROTOCOL_VERSION:
+            log(f"プロトコルのバージョン {version} は書き込みに対応していません")
+            return False
+        if board is not None and device_board != board and not args.force:
+            log(f"ボードが違います（設定 {board} / デバイス {device_board}、--force で書き込み）")
+            return False
+        deployer = Deployer(client, max_payload, log, args.max_writes)
+        for region in sorted(images):
+            written = deployer.deploy(region, images[region])
+            log(f"領域 {region}: {'書き込みました' if written else '変更なし'}")
+    except Interrupted:
+        log(f"WRITE {deployer.writes} 回で打ち切りました（もう一度実行すると続きから送ります）")
+        return False
+    except linkctl.LinkError as e:
+        log(f"エラー: {e}")
+        return False
+    finally:
+        client.close()
+    total = sum(len(image) for image in images.values())
+    log(f"完了: データ {deployer.data_bytes} / {total} bytes、送信 {client.sent_bytes} bytes"
+        f"（再送 {client.resent} 回）、{time.monotonic() - start:.2f} 秒")
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="設定ファイルを変換してデータチャンネルで複数台に書き込む")
+    parser.add_argument("config", help="設定ファイル（JSON）")
+    parser.add_argument("ports", nargs="*", help="データチャンネルのシリアルポート（/dev/ttyACM1 など）")
+    parser.add_argument("--sim", metavar="APP", help="実機の代わりにシミュレーターを pty で起動して書き込む")
+    parser.add_argument("--compile-only", action="store_true", help="変換したバイナリの大きさだけを表示")
+    parser.add_argument("--force", action="store_true", help="ボード名が違っても書き込む")
+    parser.add_argument("--max-writes", type=int, metavar="N", help="WRITE を N 回送ったら打ち切る（再開の確認用）")
+    parser.add_argument("--jobs", type=int, default=8, help="同時に書き込む台数")
+    parser.add_argument("--timeout", type=float, default=1.0, help="応答を待つ秒数")
+    args = parser.parse_args(argv)
+
+    with open(args.config, encoding="utf-8") as f:
+        config = json.load(f)
+    images = compile_config(config)
+    for region, image in sorted(images.items()):
+        print(f"領域 {region}: {len(image)} bytes（CRC {cuskey_preset.crc16(image):04x}）")
+    if args.compile_only:
+        return 0
+
+    ports = list(args.ports)
+    process = None
+    if args.sim:
+        process, port = linkctl.start_simulator(args.sim)
+        ports.append(port)
+    if not ports:
+        parser.error("ポートを指定してください（または --sim APP / --compile-only）")
+
+    lock = threading.Lock()
+    results = {}
+    pending = list(ports)
+
+    def worker():
+        while True:
+            with lock:
+                if not pending:
+                    return
+                port = pending.pop(0)
+            results[port] = deploy_port(port, images, config.get("board"), args, lock)
+
+    threads = [threading.Thread(target=worker) for _ in range(max(1, min(args.jobs, len(ports))))]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    failed = [port for port in ports if not results.get(port)]
+    print(f"{len(ports) - len(failed)} / {len(ports)} 台に配布しました")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,648 @@
+"""
+cuskey シミュレーター（Linux / CPython 用）
+CircuitPython のモジュール（board, digitalio, usb_hid, adafruit_hid など）を
+仮想実装に差し替え、仮想時刻でアプリを実行して HID レポート列を記録する
+
+使い方:
+    python tools/cuskey_sim.py trace.csv --app ptt_key
+    python tools/cuskey_sim.py trace.csv --app meeting_controller --app auto_keysend --tail 10
+    python tools/cuskey_sim.py --link --app meeting_controller   # データチャンネルを pty で開いて実時間で動かす
+    python tools/cuskey_sim.py --link --app meeting_controller --nvm nvm.bin   # NVM をファイルに保存・復元
+"""
+
+import argparse
+import ast
+import contextlib
+import io
+import os
+import random
+import signal
+import sys
+import time
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+# 実時間モードで使う本物の sleep（run の間 time.sleep は仮想時刻の sleep に差し替わる）
+_real_sleep = time.sleep
+
+
+class SimulationEnd(Exception):
+    """仮想時刻が終了時刻に達した"""
+
+
+#
+# adafruit_hid.keycode.Keycode と同じ値
+#
+KEYCODES = {
+    "A": 0x04, "B": 0x05, "C": 0x06, "D": 0x07, "E": 0x08, "F": 0x09, "G": 0x0A,
+    "H": 0x0B, "I": 0x0C, "J": 0x0D, "K": 0x0E, "L": 0x0F, "M": 0x10, "N": 0x11,
+    "O": 0x12, "P": 0x13, "Q": 0x14, "R": 0x15, "S": 0x16, "T": 0x17, "U": 0x18,
+    "V": 0x19, "W": 0x1A, "X": 0x1B, "Y": 0x1C, "Z": 0x1D,
+    "ONE": 0x1E, "TWO": 0x1F, "THREE": 0x20, "FOUR": 0x21, "FIVE": 0x22,
+    "SIX": 0x23, "SEVEN": 0x24, "EIGHT": 0x25, "NINE": 0x26, "ZERO": 0x27,
+    "ENTER": 0x28, "RETURN": 0x28, "ESCAPE": 0x29, "BACKSPACE": 0x2A, "TAB": 0x2B,
+    "SPACEBAR": 0x2C, "SPACE": 0x2C, "MINUS": 0x2D, "EQUALS": 0x2E,
+    "LEFT_BRACKET": 0x2F, "RIGHT_BRACKET": 0x30, "BACKSLASH": 0x31, "POUND": 0x32,
+    "SEMICOLON": 0x33, "QUOTE": 0x34, "GRAVE_ACCENT": 0x35, "COMMA": 0x36,
+    "PERIOD": 0x37, "FORWARD_SLASH": 0x38, "CAPS_LOCK": 0x39,
+    "F1": 0x3A, "F2": 0x3B, "F3": 0x3C, "F4": 0x3D, "F5": 0x3E, "F6": 0x3F,
+    "F7": 0x40, "F8": 0x41, "F9": 0x42, "F10": 0x43, "F11": 0x44, "F12": 0x45,
+    "PRINT_SCREEN": 0x46, "SCROLL_LOCK": 0x47, "PAUSE": 0x48, "INSERT": 0x49,
+    "HOME": 0x4A, "PAGE_UP": 0x4B, "DELETE": 0x4C, "END": 0x4D, "PAGE_DOWN": 0x4E,
+    "RIGHT_ARROW": 0x4F, "LEFT_ARROW": 0x50, "DOWN_ARROW": 0x51, "UP_ARROW": 0x52,
+    "KEYPAD_NUMLOCK": 0x53, "KEYPAD_FORWARD_SLASH": 0x54, "KEYPAD_ASTERISK": 0x55,
+    "KEYPAD_MINUS": 0x56, "KEYPAD_PLUS": 0x57, "KEYPAD_ENTER": 0x58,
+    "KEYPAD_ONE": 0x59, "KEYPAD_TWO": 0x5A, "KEYPAD_THREE": 0x5B, "KEYPAD_FOUR": 0x5C,
+    "KEYPAD_FIVE": 0x5D, "KEYPAD_SIX": 0x5E, "KEYPAD_SEVEN": 0x5F, "KEYPAD_EIGHT": 0x60,
+    "KEYPAD_NINE": 0x61, "KEYPAD_ZERO": 0x62, "KEYPAD_PERIOD": 0x63,
+    "KEYPAD_BACKSLASH": 0x64, "APPLICATION": 0x65, "POWER": 0x66, "KEYPAD_EQUALS": 0x67,
+    "F13": 0x68, "F14": 0x69, "F15": 0x6A, "F16": 0x6B, "F17": 0x6C, "F18": 0x6D,
+    "F19": 0x6E, "F20": 0x6F, "F21": 0x70, "F22": 0x71, "F23": 0x72, "F24": 0x73,
+    "LEFT_CONTROL": 0xE0, "CONTROL": 0xE0, "LEFT_SHIFT": 0xE1, "SHIFT": 0xE1,
+    "LEFT_ALT": 0xE2, "ALT": 0xE2, "OPTION": 0xE2, "LEFT_GUI": 0xE3, "GUI": 0xE3,
+    "WINDOWS": 0xE3, "COMMAND": 0xE3, "RIGHT_CONTROL": 0xE4, "RIGHT_SHIFT": 0xE5,
+    "RIGHT_ALT": 0xE6, "RIGHT_GUI": 0xE7,
+}
+
+#
+# adafruit_hid.consumer_control_code.ConsumerControlCode と同じ値
+#
+CONSUMER_CODES = {
+    "RECORD": 0xB2, "FAST_FORWARD": 0xB3, "REWIND": 0xB4, "SCAN_NEXT_TRACK": 0xB5,
+    "SCAN_PREVIOUS_TRACK": 0xB6, "STOP": 0xB7, "EJECT": 0xB8, "PLAY_PAUSE": 0xCD,
+    "MUTE": 0xE2, "VOLUME_DECREMENT": 0xEA, "VOLUME_INCREMENT": 0xE9,
+    "BRIGHTNESS_DECREMENT": 0x70, "BRIGHTNESS_INCREMENT": 0x6F,
+}
+
+
+class VirtualClock:
+    """仮想時刻（sleep で進み、予定されたピン変化を適用する）"""
+
+    def __init__(self, end, realtime=False):
+        self.now = 0.0
+        self.end = end
+        self.realtime = realtime  # True なら sleep で実際に待つ（pty 越しに PC のツールとやり取りする場合）
+        self.events = []  # (時刻, 関数)
+
+    def schedule(self, t, action):
+        self.events.append((t, action))
+        self.events.sort(key=lambda e: e[0])
+
+    def _apply_due(self):
+        while self.events and self.events[0][0] <= self.now:
+            _, action = self.events.pop(0)
+            action()
+
+    def monotonic(self):
+        return self.now
+
+    def monotonic_ns(self):
+        return int(round(self.now * 1000000000))
+
+    def sleep(self, seconds):
+        if self.realtime:
+            _real_sleep(seconds)
+        self.now += seconds
+        self._apply_due()
+        if self.now > self.end:
+            raise SimulationEnd()
+
+
+class Pin:
+    """board のピン"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return f"board.{self.name}"
+
+
+class HidLog:
+    """送信された HID レポートの記録"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.reports = []  # (時刻, デバイス名, bytes)
+        self.listeners = []
+        self.blocked = False  # True の間は送信で OSError（ホストのスリープ・エンドポイント混雑を再現）
+
+    def add(self, device, report):
+        entry = (self.clock.now, device, bytes(report))
+        self.reports.append(entry)
+        for listener in self.listeners:
+            listener(entry)
+
+
+class Nvm(bytearray):
+    """microcontroller.nvm の代わり（消去済みの 0xFF で始まる）
+
+    CircuitPython の RP2040 と同じく、書き込み先がすべて 0xFF なら消去せずに書き込み、
+    そうでなければセクタを消去して書き直したものとして erases を数える
+    """
+
+    def __init__(self, size):
+        super().__init__(b"\xff" * size)
+        self.writes = 0
+        self.erases = 0
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            start, stop, _ = index.indices(len(self))
+            erased = self[start:stop].count(0xFF) == max(stop - start, 0)
+        else:
+            erased = self[index] == 0xFF
+        self.writes += 1
+        if not erased:
+            self.erases += 1
+        super().__setitem__(index, value)
+
+
+class Device:
+    """usb_hid.Device の仮想実装"""
+
+    def __init__(self, name, usage_page, usage, log):
+        self.name = name
+        self.usage_page = usage_page
+        self.usage = usage
+        self.log = log
+
+    def send_report(self, report, report_id=None):
+        if self.log.blocked:
+            raise OSError("USB busy")
+        self.log.add(self.name, report)
+
+
+def _find_device(devices, usage_page, usage):
+    for device in devices:
+        if device.usage_page == usage_page and device.usage == usage:
+            return device
+    raise ValueError("Could not find matching HID device.")
+
+
+class Keyboard:
+    """adafruit_hid.keyboard.Keyboard と同じレポートを生成する仮想実装"""
+
+    def __init__(self, devices):
+        self._device = _find_device(devices, 0x01, 0x06)
+        self.report = bytearray(8)
+
+    def _add(self, keycode):
+        if 0xE0 <= keycode <= 0xE7:
+            self.report[0] |= 1 << (keycode - 0xE0)
+            return
+        keys = self.report[2:]
+        if keycode in keys:
+            return
+        for i in range(6):
+            if keys[i] == 0:
+                self.report[2 + i] = keycode
+                return
+        raise ValueError("Trying to press more than six keys at once.")
+
+    def _remove(self, keycode):
+        if 0xE0 <= keycode <= 0xE7:
+            self.report[0] &= ~(1 << (keycode - 0xE0)) & 0xFF
+            return
+        for i in range(2, 8):
+            if self.report[i] == keycode:
+                self.report[i] = 0
+
+    def press(self, *keycodes):
+        for keycode in keycodes:
+            self._add(keycode)
+        self._device.send_report(self.report)
+
+    def release(self, *keycodes):
+        for keycode in keycodes:
+            self._remove(keycode)
+        self._device.send_report(self.report)
+
+    def release_all(self):
+        for i in range(8):
+            self.report[i] = 0
+        self._device.send_report(self.report)
+
+    def send(self, *keycodes):
+        self.press(*keycodes)
+        self.release_all()
+
+
+class ConsumerControl:
+    """adafruit_hid.consumer_control.ConsumerControl の仮想実装"""
+
+    def __init__(self, devices):
+        self._device = _find_device(devices, 0x0C, 0x01)
+        self.report = bytearray(2)
+
+    def press(self, consumer_code):
+        self.report[0] = consumer_code & 0xFF
+        self.report[1] = (consumer_code >> 8) & 0xFF
+        self._device.send_report(self.report)
+
+    def release(self):
+        self.report[0] = 0
+        self.report[1] = 0
+        self._device.send_report(self.report)
+
+    def send(self, consumer_code):
+        self.press(consumer_code)
+        self.release()
+
+
+class Mouse:
+    """adafruit_hid.mouse.Mouse の仮想実装"""
+
+    LEFT_BUTTON = 1
+    RIGHT_BUTTON = 2
+    MIDDLE_BUTTON = 4
+
+    def __init__(self, devices):
+        self._device = _find_device(devices, 0x01, 0x02)
+        self.report = bytearray(4)
+
+    def _send_no_move(self):
+        self.report[1] = 0
+        self.report[2] = 0
+        self.report[3] = 0
+        self._device.send_report(self.report)
+
+    def press(self, buttons):
+        self.report[0] |= buttons
+        self._send_no_move()
+
+    def release(self, buttons):
+        self.report[0] &= ~buttons & 0xFF
+        self._send_no_move()
+
+    def release_all(self):
+        self.report[0] = 0
+        self._send_no_move()
+
+    def click(self, buttons):
+        self.press(buttons)
+        self.release(buttons)
+
+    def move(self, x=0, y=0, wheel=0):
+        while x != 0 or y != 0 or wheel != 0:
+            partial_x = max(-127, min(127, x))
+            partial_y = max(-127, min(127, y))
+            partial_wheel = max(-127, min(127, wheel))
+            self.report[1] = partial_x & 0xFF
+            self.report[2] = partial_y & 0xFF
+            self.report[3] = partial_wheel & 0xFF
+            self._device.send_report(self.report)
+            x -= partial_x
+            y -= partial_y
+            wheel -= partial_wheel
+
+
+def _module(name, **attrs):
+    module = types.ModuleType(name)
+    for key, value in attrs.items():
+        setattr(module, key, value)
+    return module
+
+
+class Simulator:
+    """仮想モジュールを組み込み、仮想時刻でアプリを実行する"""
+
+    def __init__(self, overrides=None, quiet=True, seed=0, end=3600.0, realtime=False):
+        self.overrides = overrides or {}
+        self.quiet = quiet
+        self.seed = seed
+        self.clock = VirtualClock(end, realtime)
+        self.log = HidLog(self.clock)
+        self.pins = {}
+        self.output = io.StringIO()
+        self.nvm = Nvm(8192)
+        self.serial_input = []
+        self.usb_connected = True
+        self.cpu_frequency = 125000000
+        self.link_serial = None  # usb_cdc.data（PtySerial など、None ならデータチャンネル無効）
+        self._saved_time = None
+
+    #
+    # 仮想モジュール
+    #
+    def _install_modules(self):
+        sim = self
+
+        class DigitalInOut:
+            def __init__(self, pin):
+                self.pin = pin
+                self.direction = None
+                self.pull = None
+                self.value = True
+                sim.pins[pin.name] = self
+
+            def deinit(self):
+                pass
+
+        class Direction:
+            INPUT = "INPUT"
+            OUTPUT = "OUTPUT"
+
+        class Pull:
+            UP = "UP"
+            DOWN = "DOWN"
+
+        class Cpu:
+            @property
+            def frequency(self):
+                return sim.cpu_frequency
+
+            @frequency.setter
+            def frequency(self, value):
+                sim.cpu_frequency = value
+
+        class Runtime:
+            autoreload = True
+
+            @property
+            def usb_connected(self):
+                return sim.usb_connected
+
+            @property
+            def serial_bytes_available(self):
+                return len(sim.serial_input)
+
+        class Stdin:
+            def read(self, n=1):
+                data = "".join(sim.serial_input[:n])
+                del sim.serial_input[:n]
+                return data
+
+        board = _module("board")
+        for i in range(30):
+            setattr(board, f"D{i}", Pin(f"D{i}"))
+            setattr(board, f"GP{i}", Pin(f"GP{i}"))
+
+        devices = [
+            Device("keyboard", 0x01, 0x06, self.log),
+            Device("mouse", 0x01, 0x02, self.log),
+            Device("consumer_control", 0x0C, 0x01, self.log),
+        ]
+
+        keycode = type("Keycode", (), dict(KEYCODES))
+        keycode.modifier_bit = staticmethod(lambda k: 1 << (k - 0xE0) if 0xE0 <= k <= 0xE7 else 0)
+        consumer_code = type("ConsumerControlCode", (), dict(CONSUMER_CODES))
+
+        self.stdin = Stdin()
+        modules = {
+            "board": board,
+            "digitalio": _module("digitalio", DigitalInOut=DigitalInOut, Direction=Direction, Pull=Pull),
+            "usb_hid": _module("usb_hid", devices=devices),
+            "microcontroller": _module("microcontroller", cpu=Cpu(), nvm=self.nvm),
+            "usb_cdc": _module("usb_cdc", data=self.link_serial),
+            "supervisor": _module("supervisor", runtime=Runtime(),
+                                  ticks_ms=lambda: int(self.clock.now * 1000) & 0x3FFFFFFF),
+            "adafruit_hid": _module("adafruit_hid"),
+            "adafruit_hid.keyboard": _module("adafruit_hid.keyboard", Keyboard=Keyboard),
+            "adafruit_hid.keycode": _module("adafruit_hid.keycode", Keycode=keycode),
+            "adafruit_hid.consumer_control": _module("adafruit_hid.consumer_control", ConsumerControl=ConsumerControl),
+            "adafruit_hid.consumer_control_code": _module("adafruit_hid.consumer_control_code",
+                                                          ConsumerControlCode=consumer_code),
+            "adafruit_hid.mouse": _module("adafruit_hid.mouse", Mouse=Mouse),
+        }
+        # 前回の実行で読み込んだ cuskey モジュールとアプリは破棄して読み直す
+        for name in list(sys.modules):
+            if name.startswith("cuskey_") or name == "examples" or name.startswith("examples."):
+                del sys.modules[name]
+        sys.modules.update(modules)
+
+    def _patch_time(self):
+        self._saved_time = (time.monotonic, time.monotonic_ns, time.sleep)
+        time.monotonic = self.clock.monotonic
+        time.monotonic_ns = self.clock.monotonic_ns
+        time.sleep = self.clock.sleep
+
+    def _restore_time(self):
+        if self._saved_time is not None:
+            time.monotonic, time.monotonic_ns, time.sleep = self._saved_time
+            self._saved_time = None
+
+    def _apply_overrides(self, modules):
+        for module in modules:
+            for key, value in self.overrides.items():
+                if hasattr(module, key):
+                    setattr(module, key, value)
+
+    #
+    # 入力操作
+    #
+    def _button_pin(self):
+        import cuskey_settings
+        return cuskey_settings.get_pins()["button"].name
+
+    def _mode_pin(self):
+        import cuskey_settings
+        return cuskey_settings.get_pins()["mode_a"].name
+
+    def schedule_trace(self, events):
+        """トレース (秒, ボタンのピン値, モードのピン値) の各変化を仮想時刻に予約"""
+        button_pin = self._button_pin()
+        mode_pin = self._mode_pin()
+        for t, button, mode in events:
+            def apply(button=button, mode=mode):
+                self.pins[button_pin].value = button
+                self.pins[mode_pin].value = mode
+            self.clock.schedule(t, apply)
+
+    #
+    # 実行
+    #
+    def run(self, apps, events, tail=2.0, until=None):
+        """アプリを起動し、トレースを再生して HID レポート列を返す"""
+        self._install_modules()
+        self._patch_time()
+        random.seed(self.seed)
+        if events:
+            self.clock.end = until if until is not None else events[-1][0] + tail
+        elif until is not None:
+            self.clock.end = until
+        redirect = contextlib.redirect_stdout(self.output) if self.quiet else contextlib.nullcontext()
+        saved_stdin = sys.stdin
+        sys.stdin = self.stdin
+        try:
+            with redirect:
+                import cuskey_settings
+                self._apply_overrides([cuskey_settings])
+                import cuskey_runtime
+                # アプリの定数はモジュール読み込み直後（App 生成前）に上書き
+                apply_app_settings = cuskey_runtime.apply_app_settings
+
+                def apply_overrides(module, name):
+                    apply_app_settings(module, name)
+                    self._apply_overrides([module])
+                cuskey_runtime.apply_app_settings = apply_overrides
+                ctx = cuskey_runtime.Context()
+                self.ctx = ctx
+                # 初期状態（トレース先頭）を反映してから開始
+                if events:
+                    _, button, mode = events[0]
+                    ctx.hw.button.value = button
+                    ctx.hw.mode_a.value = mode
+                    self.schedule_trace(events[1:])
+                host = cuskey_runtime.AppHost(ctx)
+                self.host = host
+                host.start(apps)
+                try:
+                    host.loop()
+                except SimulationEnd:
+                    pass
+        finally:
+            sys.stdin = saved_stdin
+            self._restore_time()
+        return self.log.reports
+
+
+class PtySerial:
+    """usb_cdc.data の代わりに疑似端末（pty）を使う（PC のツールは slave_path を USB シリアルとして開く）"""
+
+    def __init__(self):
+        import pty
+        import tty
+        self.master, slave = pty.openpty()
+        tty.setraw(slave)
+        self.slave_path = os.ttyname(slave)
+        self._slave = slave  # 開いたままにしておく（閉じると master の読み込みがエラーになる）
+        self.timeout = 0
+
+    @property
+    def in_waiting(self):
+        import fcntl
+        import termios
+        import struct
+        return struct.unpack("i", fcntl.ioctl(self.master, termios.FIONREAD, b"\0\0\0\0"))[0]
+
+    def read(self, n=1):
+        return os.read(self.master, n)
+
+    def write(self, data):
+        return os.write(self.master, bytes(data))
+
+    def close(self):
+        os.close(self.master)
+        os.close(self._slave)
+
+
+def replay(events, apps, overrides=None, tail=2.0, seed=0):
+    """トレースをアプリで再生して HID レポート列を返す"""
+    return Simulator(overrides=overrides, seed=seed).run(apps, events, tail=tail)
+
+
+def load_trace(path):
+    """トレースファイル（またはトレースを含むシリアルログ）を読み込む"""
+    import cuskey_trace
+    with open(path, encoding="utf-8") as f:
+        return cuskey_trace.parse_trace(f)
+
+
+def load_nvm(sim, path):
+    """ファイルの内容を仮想の NVM に読み込む（path が None・ファイルがなければ何もしない）"""
+    if path is None or not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        data = f.read(len(sim.nvm))
+    sim.nvm[:len(data)] = data
+    sim.nvm.writes = sim.nvm.erases = 0
+
+
+def save_nvm(sim, path):
+    if path is not None:
+        with open(path, "wb") as f:
+            f.write(sim.nvm)
+
+
+def format_report(entry):
+    """HID レポートを "時刻 デバイス 16進" 形式の文字列にする"""
+    t, device, report = entry
+    return f"{t:10.6f} {device:<16} {report.hex(' ')}"
+
+
+def parse_overrides(items):
+    """--set NAME=VALUE の並びを {定数名: 値} にする（値は Python のリテラル。読めなければ ValueError）"""
+    overrides = {}
+    for item in items:
+        key, sep, value = item.partition("=")
+        if not sep or not key:
+            raise ValueError(f"--set は NAME=VALUE の形式で指定してください: {item}")
+        try:
+            overrides[key] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            raise ValueError(f"--set {key} の値 {value} を読めません（数値・True・None・(0.1, 2) などのリテラルで指定し、"
+                             f"文字列は '...' で囲む）") from None
+    return overrides
+
+
+def run_link(sim, apps, duration):
+    """データチャンネル（usb_cdc.data）を pty で開き、実時間でアプリを動かす（PC のツールの相手役）"""
+    # terminate（SIGTERM）でも finally を通して終了する（--nvm の保存のため）
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    serial = PtySerial()
+    sim.link_serial = serial
+    sim.overrides.setdefault("LINK_ENABLED", True)
+    # tools/linkctl.py --sim はこの行から pty のパスを読む
+    print(f"PTY: {serial.slave_path}", flush=True)
+    try:
+        sim.run(apps, [(0.0, True, False)], until=duration)
+    finally:
+        serial.close()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="cuskey のトレースを仮想時刻で再生し HID レポート列を出力")
+    parser.add_argument("trace", nargs="?", help="トレースファイル（TRACE_FILE またはシリアルログ）")
+    parser.add_argument("--app", action="append", required=True,
+                        help="再生するアプリ（2 回指定するとモードスイッチで振り分け）")
+    parser.add_argument("--tail", type=float, default=2.0, help="最後のピン変化の後に実行する秒数")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="設定値の上書き（例: --set DOUBLE_CLICK_TIME=0.25）")
+    parser.add_argument("--link", action="store_true",
+                        help="トレースの代わりにデータチャンネルを pty で開き、実時間で動かす")
+    parser.add_argument("--duration", type=float, default=3600.0, help="--link で動かす秒数")
+    parser.add_argument("--nvm", metavar="FILE",
+                        help="microcontroller.nvm の内容をファイルから読み込み、終了時に書き戻す（再起動の再現）")
+    parser.add_argument("--root", metavar="DIR",
+                        help="cuskey_*.py・examples/ をこのディレクトリから読み込む（tools/strip_messages.py のビルドなど）")
+    parser.add_argument("--verbose", action="store_true", help="アプリの print 出力も表示")
+    args = parser.parse_args(argv)
+    if args.root:
+        sys.path.insert(0, os.path.abspath(args.root))
+
+    try:
+        overrides = parse_overrides(args.set)
+    except ValueError as e:
+        parser.error(str(e))
+
+    apps = args.app[0] if len(args.app) == 1 else tuple(args.app)
+    if args.link:
+        sim = Simulator(overrides=overrides, quiet=not args.verbose, realtime=True)
+        load_nvm(sim, args.nvm)
+        try:
+            return run_link(sim, apps, args.duration)
+        finally:
+            save_nvm(sim, args.nvm)
+
+    if args.trace is None:
+        parser.error("トレースファイルを指定してください（または --link）")
+    events = load_trace(args.trace)
+    if not events:
+        print("トレースが空です", file=sys.stderr)
+        return 1
+    sim = Simulator(overrides=overrides, quiet=not args.verbose)
+    load_nvm(sim, args.nvm)
+    for entry in sim.run(apps, events, tail=args.tail):
+        print(format_report(entry))
+    save_nvm(sim, args.nvm)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
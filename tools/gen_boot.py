@@ -0,0 +1,241 @@
+"""
+boot.py ジェネレーター
+アプリ（examples/）が使う HID デバイス（App.HID_DEVICES）を調べ、必要な HID レポートディスクリプタだけを
+usb_hid.enable で有効にし、MIDI・CIRCUITPY ドライブ（MSC）・シリアル（CDC）を無効にする boot.py を生成する
+モードスイッチを Mode B にしてボタンを押したまま起動するとセットアップモードになり、ドライブとシリアルを残して起動する
+（Mode A でボタンを押したまま起動した場合は、code.py のアプリ選択モードになる）
+
+使い方:
+    python tools/gen_boot.py --app ptt_key -o boot.py
+    python tools/gen_boot.py --app meeting_controller --app auto_keysend --keep-serial
+    python tools/gen_boot.py --app ptt_key --link    # 設定用のデータチャンネル（cuskey_link）を残す
+    python tools/gen_boot.py --compare before.log after.log   # デバイスの計測結果を比較
+
+計測:
+    DEBUG_MODE = True で起動すると、USB 接続までの時間と空きメモリがシリアルに
+    "[USB] 接続: 起動から N ms / 空きメモリ: M bytes" と表示される
+    boot.py なし（既定の USB 構成）と生成した boot.py（--keep-serial）のそれぞれで
+    リセット直後のログを保存し、--compare で比較する
+"""
+
+import argparse
+import ast
+import os
+import re
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXAMPLES = os.path.join(ROOT, "examples")
+
+# cuskey_hid.HidOutput の属性と usb_hid.Device の対応
+HID_DEVICES = (
+    ("keyboard", "KEYBOARD"),
+    ("mouse", "MOUSE"),
+    ("consumer_control", "CONSUMER_CONTROL"),
+)
+
+# CircuitPython の既定の USB 構成（インターフェース数, エンドポイント数）
+# エンドポイント 0（コントロール転送）は含まない
+USB_FUNCTIONS = {
+    "CDC": (2, 3),
+    "MSC": (1, 2),
+    "HID": (1, 2),
+    "MIDI": (2, 2),
+}
+DEFAULT_HID = ("KEYBOARD", "MOUSE", "CONSUMER_CONTROL")
+
+MEASURE_PATTERN = re.compile(r"\[USB\] 接続: 起動から (\d+) ms / 空きメモリ: (\S+) bytes")
+
+BOOT_TEMPLATE = '''"""
+cuskey boot.py（tools/gen_boot.py で生成）
+対象アプリ: {apps}
+USB を必要最小限にする: HID は {devices} のみ、MIDI・CIRCUITPY ドライブ・シリアルは無効
+モードスイッチを Mode B にしてボタンを押したまま起動するとセットアップモード（ドライブとシリアルを有効のまま起動）
+Mode A でボタンを押したまま起動した場合は code.py のアプリ選択モード（USB 構成は通常どおり）
+"""
+
+import digitalio
+import storage
+import usb_cdc
+import usb_hid
+import usb_midi
+
+# ボード設定をインポート
+import cuskey_settings
+
+# 計測・デバッグ用: True にするとシリアル（CDC）だけ有効のまま起動
+KEEP_SERIAL = {keep_serial}
+
+# 設定・問い合わせ用のデータチャンネル（usb_cdc.data、cuskey_link）を有効にする
+LINK = {link}
+
+#
+# セットアップモードの判定（Mode B でボタンを押したまま起動）
+#
+pins = cuskey_settings.get_pins()
+mode_gnd = None
+if pins["mode_gnd"]:
+    mode_gnd = digitalio.DigitalInOut(pins["mode_gnd"])
+    mode_gnd.direction = digitalio.Direction.OUTPUT
+    mode_gnd.value = False  # GND（Low）に設定
+mode_a = digitalio.DigitalInOut(pins["mode_a"])
+mode_a.direction = digitalio.Direction.INPUT
+mode_a.pull = digitalio.Pull.UP
+button_gnd = None
+if pins["button_gnd"]:
+    button_gnd = digitalio.DigitalInOut(pins["button_gnd"])
+    button_gnd.direction = digitalio.Direction.OUTPUT
+    button_gnd.value = False  # GND（Low）に設定
+button = digitalio.DigitalInOut(pins["button"])
+button.direction = digitalio.Direction.INPUT
+button.pull = digitalio.Pull.UP
+setup_mode = not button.value and mode_a.value
+
+# code.py で同じピンを使うので解放しておく
+button.deinit()
+if button_gnd is not None:
+    button_gnd.deinit()
+mode_a.deinit()
+if mode_gnd is not None:
+    mode_gnd.deinit()
+
+#
+# USB 構成
+#
+usb_hid.enable((
+{device_lines}))
+usb_midi.disable()
+
+if setup_mode:
+    print("セットアップモード: CIRCUITPY ドライブとシリアルを有効にしたまま起動")
+    if LINK:
+        usb_cdc.enable(console=True, data=True)
+else:
+    storage.disable_usb_drive()
+    if LINK:
+        usb_cdc.enable(console=KEEP_SERIAL, data=True)
+    elif not KEEP_SERIAL:
+        usb_cdc.disable()
+'''
+
+
+def declared_devices(tree):
+    """App クラスの HID_DEVICES（cuskey_hid.HidOutput の属性名のタプル）を返す（宣言がなければ None）"""
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef) or node.name != "App":
+            continue
+        for item in node.body:
+            if (isinstance(item, ast.Assign) and len(item.targets) == 1
+                    and isinstance(item.targets[0], ast.Name) and item.targets[0].id == "HID_DEVICES"):
+                return ast.literal_eval(item.value)
+    return None
+
+
+def used_devices(app):
+    """アプリが使用する HID デバイス（usb_hid.Device の名前）を返す
+
+    App.HID_DEVICES の宣言を使う。宣言のないアプリはソースの hid.<属性> から推定する
+    （cuskey_macro・cuskey_motion など、ctx.hid を渡した先で使うデバイスは数えられない）
+    """
+    path = os.path.join(EXAMPLES, app + ".py")
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    attrs = declared_devices(ast.parse(source, path))
+    if attrs is None:
+        return [device for attr, device in HID_DEVICES if re.search(r"\bhid\." + attr + r"\b", source)]
+    names = dict(HID_DEVICES)
+    for attr in attrs:
+        if attr not in names:
+            raise ValueError(f"{app}: 不明な HID_DEVICES の値: {attr}（{', '.join(names)}）")
+    return [device for attr, device in HID_DEVICES if attr in attrs]
+
+
+def usb_summary(functions, hid_devices):
+    """USB 構成のインターフェース数・エンドポイント数を返す"""
+    interfaces = sum(USB_FUNCTIONS[name][0] for name in functions)
+    endpoints = sum(USB_FUNCTIONS[name][1] for name in functions)
+    return f"{'+'.join(functions)}（HID: {', '.join(hid_devices)}）: インターフェース {interfaces} / エンドポイント {endpoints}"
+
+
+def read_measure(path):
+    """ログから最初の計測結果 (ms, 空きメモリ) を返す"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            match = MEASURE_PATTERN.search(line)
+            if match:
+                mem_free = match.group(2)
+                return int(match.group(1)), int(mem_free) if mem_free.isdigit() else None
+    return None
+
+
+def compare(before_path, after_path):
+    before = read_measure(before_path)
+    after = read_measure(after_path)
+    if before is None or after is None:
+        print("ログに [USB] 接続 の行がありません（DEBUG_MODE = True で起動してください）", file=sys.stderr)
+        return 1
+    print(f"{'':>12} {'USB接続(ms)':>12} {'空きメモリ(bytes)':>18}")
+    for label, (ms, mem_free) in (("before", before), ("after", after)):
+        print(f"{label:>12} {ms:12d} {str(mem_free):>18}")
+    print(f"{'差':>12} {after[0] - before[0]:+12d}", end="")
+    if before[1] is not None and after[1] is not None:
+        print(f" {after[1] - before[1]:+18d}")
+    else:
+        print()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="アプリが使う HID デバイスだけを有効にする boot.py を生成")
+    parser.add_argument("--app", action="append", help="対象アプリ（複数指定可、既定: examples/ のすべて）")
+    parser.add_argument("-o", "--output", help="出力先（省略時は標準出力）")
+    parser.add_argument("--keep-serial", action="store_true", help="通常起動でもシリアル（CDC）を残す")
+    parser.add_argument("--link", action="store_true",
+                        help="設定用のデータチャンネル（usb_cdc.data）を有効にする（LINK_ENABLED と合わせて使う）")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="計測ログを比較")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return compare(*args.compare)
+
+    apps = args.app or sorted(name[:-3] for name in os.listdir(EXAMPLES) if name.endswith(".py"))
+    devices = []
+    for app in apps:
+        try:
+            used = used_devices(app)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+        for device in used:
+            if device not in devices:
+                devices.append(device)
+    if not devices:
+        print("HID デバイスを使うアプリがありません", file=sys.stderr)
+        return 1
+    devices.sort(key=[device for _, device in HID_DEVICES].index)
+
+    source = BOOT_TEMPLATE.format(
+        apps=", ".join(apps),
+        devices=", ".join(devices),
+        keep_serial=args.keep_serial,
+        link=args.link,
+        device_lines="".join(f"    usb_hid.Device.{device},\n" for device in devices),
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(source)
+    else:
+        sys.stdout.write(source)
+
+    # USB 構成の比較（標準出力を boot.py に使う場合に備えて標準エラーへ）
+    after = ["HID"] + ["CDC"] * (args.keep_serial + args.link)
+    print("USB 構成:", file=sys.stderr)
+    print("  既定      " + usb_summary(["CDC", "MSC", "HID", "MIDI"], DEFAULT_HID), file=sys.stderr)
+    print("  生成後    " + usb_summary(after, devices), file=sys.stderr)
+    print("  セットアップモード " + usb_summary(["CDC"] * (1 + args.link) + ["MSC", "HID"], devices), file=sys.stderr)
+    print("※ 起動時のアプリ選択で対象外のアプリを選ぶと、無効にした HID デバイスは使えません", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
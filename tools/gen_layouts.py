@@ -0,0 +1,120 @@
+"""
+キーボード配列表ジェネレーター
+文字 → (Shift の有無, HID キーコード) の対応を配列ごとに定義し、デバイスで使う
+cuskey_layout_us.py / cuskey_layout_jis.py を生成する（デバイス上では表を引くだけ）
+
+使い方:
+    python tools/gen_layouts.py            # リポジトリ直下に生成
+    python tools/gen_layouts.py -o /media/CIRCUITPY
+"""
+
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LEFT_SHIFT = 0xE1
+
+# 配列に共通のキー（HID Usage Tables: Keyboard/Keypad Page）
+COMMON = {"\n": (False, 0x28), "\t": (False, 0x2B), " ": (False, 0x2C)}
+for _i, _c in enumerate("abcdefghijklmnopqrstuvwxyz"):
+    COMMON[_c] = (False, 0x04 + _i)
+    COMMON[_c.upper()] = (True, 0x04 + _i)
+for _i, _c in enumerate("1234567890"):
+    COMMON[_c] = (False, 0x1E + _i)
+
+
+def _keys(pairs):
+    """"キーコード: 通常の文字, Shift 時の文字" の表を文字 → (Shift, キーコード) に展開"""
+    table = {}
+    for keycode, (normal, shifted) in pairs.items():
+        if normal:
+            table[normal] = (False, keycode)
+        if shifted:
+            table[shifted] = (True, keycode)
+    return table
+
+
+LAYOUTS = {
+    # US 配列
+    "us": {
+        "title": "US",
+        "keys": _keys({
+            0x1E: ("1", "!"), 0x1F: ("2", "@"), 0x20: ("3", "#"), 0x21: ("4", "$"), 0x22: ("5", "%"),
+            0x23: ("6", "^"), 0x24: ("7", "&"), 0x25: ("8", "*"), 0x26: ("9", "("), 0x27: ("0", ")"),
+            0x2D: ("-", "_"), 0x2E: ("=", "+"), 0x2F: ("[", "{"), 0x30: ("]", "}"), 0x31: ("\\", "|"),
+            0x33: (";", ":"), 0x34: ("'", '"'), 0x35: ("`", "~"), 0x36: (",", "<"), 0x37: (".", ">"),
+            0x38: ("/", "?"),
+        }),
+    },
+    # JIS 配列（0x87: International1「ろ」キー、0x89: International3「¥」キー）
+    "jis": {
+        "title": "JIS",
+        "keys": _keys({
+            0x1E: ("1", "!"), 0x1F: ("2", '"'), 0x20: ("3", "#"), 0x21: ("4", "$"), 0x22: ("5", "%"),
+            0x23: ("6", "&"), 0x24: ("7", "'"), 0x25: ("8", "("), 0x26: ("9", ")"), 0x27: ("0", None),
+            0x2D: ("-", "="), 0x2E: ("^", "~"), 0x2F: ("@", "`"), 0x30: ("[", "{"), 0x32: ("]", "}"),
+            0x33: (";", "+"), 0x34: (":", "*"), 0x36: (",", "<"), 0x37: (".", ">"), 0x38: ("/", "?"),
+            0x87: ("\\", "_"), 0x89: ("¥", "|"),
+        }),
+    },
+}
+
+MODULE_TEMPLATE = '''"""
+キーボード配列表（{title} 配列）
+tools/gen_layouts.py で生成（直接編集しない）
+KEYMAP: ASCII コード（0〜127）ごとに 2 バイト（修飾キー, HID キーコード）。キーコード 0 は入力できない文字
+EXTRA: ASCII 以外の文字 → (修飾キー, HID キーコード)
+"""
+
+KEYMAP = (
+{keymap})
+
+EXTRA = {extra}
+'''
+
+
+def build(name):
+    """配列の表を (KEYMAP の bytes, EXTRA の dict) にする"""
+    table = dict(COMMON)
+    table.update(LAYOUTS[name]["keys"])
+    keymap = bytearray(256)
+    extra = {}
+    for char, (shift, keycode) in table.items():
+        modifier = LEFT_SHIFT if shift else 0
+        code = ord(char)
+        if code < 128:
+            keymap[code * 2] = modifier
+            keymap[code * 2 + 1] = keycode
+        else:
+            extra[code] = (modifier, keycode)
+    return bytes(keymap), extra
+
+
+def render(name):
+    keymap, extra = build(name)
+    lines = []
+    for start in range(0, len(keymap), 32):
+        chunk = keymap[start:start + 32]
+        lines.append('    b"' + "".join(f"\\x{b:02x}" for b in chunk) + '"\n')
+    extra_text = "{" + ", ".join(f"0x{code:04x}: (0x{m:02x}, 0x{k:02x})" for code, (m, k) in sorted(extra.items())) + "}"
+    return MODULE_TEMPLATE.format(title=LAYOUTS[name]["title"], keymap="".join(lines), extra=extra_text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="キーボード配列表（cuskey_layout_*.py）を生成")
+    parser.add_argument("-o", "--output", default=ROOT, help="出力先ディレクトリ")
+    args = parser.parse_args(argv)
+    for name in LAYOUTS:
+        path = os.path.join(args.output, f"cuskey_layout_{name}.py")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(render(name))
+        keymap, extra = build(name)
+        count = sum(1 for i in range(1, len(keymap), 2) if keymap[i]) + len(extra)
+        print(f"{path}: {count} 文字")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
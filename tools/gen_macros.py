@@ -0,0 +1,280 @@
+"""
+マクロライブラリジェネレーター
+マクロの定義（JSON）を cuskey_macro のマクロライブラリ（cuskey_macros.bin）に変換する
+デバイスは CIRCUITPY の cuskey_macros.bin を再生中に少しずつ読み込むので、空きメモリより長いマクロも置ける
+
+定義の形式（手順は tools/linkctl.py の macro と同じ書き方に file: / down: / up: / *回数 を加えたもの）:
+    {
+        "signature": ["text:Best regards,", "key:ENTER", "text:cuskey"],
+        "release_notes": ["file:notes.txt", "key:CONTROL+S"],    # テキストファイルの内容を入力
+        "unlock": ["key:SPACE", "key:BACKSPACE", "wait:1.0", "text:1234"],
+        "next_page": ["key:DOWN_ARROW*20"],                       # 20 回繰り返す
+        "bold": ["down:CONTROL", "key:B", "up:CONTROL"]           # 押したまま・離す（up: だけですべて離す）
+    }
+file: のパスは定義ファイルからの相対パス
+
+手順はキーの変化（押す・離す）と繰り返し回数・可変長の待ち時間で書き出し、同じ手順の連続や
+同じ文字の連続は 1 つの手順と回数にまとめる（形式は cuskey_macro の docstring）
+--apps を付けると examples/ のアプリの設定（pin_sender の PIN 送信・ptt_key のキー・
+youtube_controller の巻き戻し）もマクロとして収録する
+
+使い方:
+    python tools/gen_macros.py tools/macros_sample.json            # リポジトリ直下に cuskey_macros.bin を生成
+    python tools/gen_macros.py tools/macros_sample.json --list     # 収録するマクロと大きさを表示
+    python tools/gen_macros.py tools/macros_sample.json --apps     # アプリの手順も収録
+    python tools/gen_macros.py tools/macros_sample.json --stress long_text=100000   # 試験用の長い文字列を追加
+"""
+
+import argparse
+import ast
+import json
+import os
+import sys
+
+TOOLS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(TOOLS)
+sys.path.insert(0, ROOT)
+import cuskey_macro  # noqa: E402
+from cuskey_preset import crc16  # noqa: E402
+
+sys.path.insert(0, TOOLS)
+from cuskey_sim import KEYCODES  # noqa: E402
+
+OUTPUT = os.path.join(ROOT, "cuskey_macros.bin")
+
+# 同じ文字がこの数以上続いたら REPEAT にまとめる（短い連続は文字列のままの方が小さい）
+TEXT_RUN_MIN = 4
+
+
+def split_text(text, limit=cuskey_macro.LIBRARY_TEXT_MAX):
+    """文字列を UTF-8 で limit バイト以下の断片に分ける（文字の途中では分けない）"""
+    pieces = []
+    piece = ""
+    size = 0
+    for char in text:
+        char_size = len(char.encode())
+        if size + char_size > limit:
+            pieces.append(piece)
+            piece = ""
+            size = 0
+        piece += char
+        size += char_size
+    if piece:
+        pieces.append(piece)
+    return pieces
+
+
+def text_runs(text):
+    """文字列を [(文字列, 回数)] に分ける（同じ文字の長い連続は (その文字, 回数)）"""
+    runs = []
+    start = 0
+    i = 0
+    while i < len(text):
+        end = i
+        while end < len(text) and text[end] == text[i]:
+            end += 1
+        if end - i >= TEXT_RUN_MIN:
+            if start < i:
+                runs.append((text[start:i], 1))
+            runs.append((text[i], end - i))
+            start = end
+        i = end
+    if start < len(text):
+        runs.append((text[start:], 1))
+    return runs
+
+
+def varint(value):
+    """可変長整数（下位から 7 ビットずつ、続きがあるバイトは最上位ビットを立てる）"""
+    data = bytearray()
+    while value >= 0x80:
+        data.append((value & 0x7F) | 0x80)
+        value >>= 7
+    data.append(value)
+    return bytes(data)
+
+
+def keycodes(value):
+    """CONTROL+A を (キーコード, ...) にする"""
+    try:
+        return tuple(KEYCODES[name] for name in value.split("+") if name)
+    except KeyError as e:
+        raise ValueError(f"不明なキー名: {e.args[0]}") from None
+
+
+def parse_steps(items, base):
+    """定義の手順の並びを [(手順のバイト列, 回数)] にする"""
+    steps = []
+    for item in items:
+        kind, _, value = item.partition(":")
+        if kind in ("text", "file"):
+            if kind == "file":
+                with open(os.path.join(base, value), encoding="utf-8") as f:
+                    value = f.read()
+            for text, count in text_runs(value):
+                for piece in split_text(text):
+                    data = piece.encode()
+                    steps.append((bytes((cuskey_macro.TEXT, len(data))) + data, count))
+            continue
+        count = 1
+        if kind in ("key", "down", "up") and "*" in value:
+            value, _, repeat = value.rpartition("*")
+            count = int(repeat)
+        if kind == "key":
+            codes = keycodes(value)
+            steps.append((bytes((cuskey_macro.KEY, len(codes))) + bytes(codes), count))
+        elif kind == "down":
+            codes = keycodes(value)
+            steps.append((bytes((cuskey_macro.PRESS, len(codes))) + bytes(codes), count))
+        elif kind == "up":
+            codes = keycodes(value)
+            steps.append((bytes((cuskey_macro.RELEASE, len(codes))) + bytes(codes), count))
+        elif kind == "wait":
+            steps.append((bytes((cuskey_macro.DELAY,)) + varint(round(float(value) * 1000)), 1))
+        else:
+            raise ValueError(f"不明な手順: {item}（text: / file: / key: / down: / up: / wait:）")
+    return steps
+
+
+def encode_steps(steps):
+    """[(手順のバイト列, 回数)] をライブラリの手順にする（同じ手順の連続は回数にまとめる）"""
+    merged = []
+    for data, count in steps:
+        if count <= 0:
+            continue
+        if merged and merged[-1][0] == data:
+            merged[-1][1] += count
+        else:
+            merged.append([data, count])
+    encoded = bytearray()
+    for data, count in merged:
+        if count > 1:
+            encoded += bytes((cuskey_macro.REPEAT,)) + varint(count)
+        encoded += data
+    return bytes(encoded)
+
+
+def compile_steps(items, base):
+    """定義の手順の並びを cuskey_macro のライブラリの手順（バイト列）にする"""
+    return encode_steps(parse_steps(items, base))
+
+
+def _literal(node):
+    """アプリの設定値の式を値にする（Keycode.X はキー名の文字列 X）"""
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "Keycode":
+        return node.attr
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return [_literal(item) for item in node.elts]
+    if isinstance(node, ast.Dict):
+        return {_literal(k): _literal(v) for k, v in zip(node.keys, node.values)}
+    return ast.literal_eval(node)
+
+
+def app_constants(name):
+    """examples/<name>.py の先頭の設定値を {定数名: 値} で読む（ボードがなくても読めるよう実行はしない）"""
+    with open(os.path.join(ROOT, "examples", name + ".py"), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    constants = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            target = node.targets[0].id
+            if target.isupper():
+                try:
+                    constants[target] = _literal(node.value)
+                except ValueError:
+                    pass
+    return constants
+
+
+def app_definitions():
+    """examples/ のアプリが送るキー入力の手順をマクロの定義にする"""
+    definitions = {}
+    # pin_sender: PIN の送信（send_pin と同じ手順。文字の間隔は再生時の入力速度）
+    pin = app_constants("pin_sender")
+    for mode in ("A", "B"):
+        items = []
+        if pin["PRE_SEND_ESCAPE"]:
+            items += ["key:SPACE", "key:BACKSPACE", f"wait:{pin['PRE_SEND_DELAY']}"]
+        items.append("text:" + "".join(pin["PIN_MODE_" + mode]))
+        if pin["POST_SEND_ENTER"]:
+            items.append("key:ENTER")
+        definitions["pin_sender.mode_" + mode.lower()] = items
+    # ptt_key: PTT のキーを押して離す、クリックで送るキー
+    ptt = app_constants("ptt_key")
+    keys = "+".join(ptt["PTT_KEYS"])
+    definitions["ptt_key.ptt"] = [f"down:{keys}", "wait:1.0", "up:"]
+    for mode in ("A", "B"):
+        for action, assignment in ptt[f"MODE_{mode}_CLICKS"].items():
+            if assignment is not None and action != "undo":
+                definitions[f"ptt_key.mode_{mode.lower()}.{action}"] = ["key:" + assignment[0]]
+    # youtube_controller: 長押しの巻き戻し（rewind と同じ手順）
+    youtube = app_constants("youtube_controller")
+    items = []
+    for i in range(youtube["REWIND_COUNT"]):
+        if i:
+            items.append(f"wait:{youtube['REWIND_INTERVAL']}")
+        items.append("key:" + youtube["REWIND_KEY"])
+    definitions["youtube_controller.rewind"] = items
+    return definitions
+
+
+def stress_text(size):
+    """試験用の長い文字列（英数字と改行）"""
+    line = "The quick brown fox jumps over the lazy dog 0123456789.\n"
+    return (line * (size // len(line) + 1))[:size]
+
+
+def build(macros):
+    """{名前: 手順のバイト列} をマクロライブラリにする"""
+    if len(macros) > 255:
+        raise ValueError("マクロが多すぎます")
+    keys = {}
+    for name in macros:
+        key = crc16(name.encode())
+        if key in keys:
+            raise ValueError(f"マクロ名の CRC が重なっています: {keys[key]} / {name}（どちらかの名前を変えてください）")
+        keys[key] = name
+    index = bytearray()
+    position = cuskey_macro.LIBRARY_HEADER_SIZE + cuskey_macro.LIBRARY_ENTRY_SIZE * len(macros)
+    for name, steps in macros.items():
+        index += crc16(name.encode()).to_bytes(2, "little") + position.to_bytes(4, "little") \
+            + len(steps).to_bytes(4, "little")
+        position += len(steps)
+    header = cuskey_macro.LIBRARY_MAGIC + bytes((cuskey_macro.LIBRARY_VERSION, len(macros)))
+    return header + bytes(index) + b"".join(macros.values())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="マクロの定義（JSON）からマクロライブラリを生成")
+    parser.add_argument("definitions", help="マクロの定義ファイル（JSON）")
+    parser.add_argument("-o", "--output", default=OUTPUT, help="出力先（既定: リポジトリ直下の cuskey_macros.bin）")
+    parser.add_argument("--list", action="store_true", help="収録するマクロと大きさを表示するだけ")
+    parser.add_argument("--apps", action="store_true", help="examples/ のアプリのキー入力の手順も収録")
+    parser.add_argument("--stress", action="append", default=[], metavar="NAME=BYTES",
+                        help="試験用の長い文字列のマクロを追加")
+    args = parser.parse_args(argv)
+
+    with open(args.definitions, encoding="utf-8") as f:
+        definitions = json.load(f)
+    if args.apps:
+        definitions.update(app_definitions())
+    base = os.path.dirname(os.path.abspath(args.definitions))
+    macros = {name: compile_steps(items, base) for name, items in definitions.items()}
+    for item in args.stress:
+        name, _, size = item.partition("=")
+        macros[name] = compile_steps(["text:" + stress_text(int(size))], base)
+
+    image = build(macros)
+    for name, steps in macros.items():
+        print(f"  {name:<24} {len(steps):>8} bytes")
+    print(f"{len(macros)} 件、{len(image)} bytes")
+    if args.list:
+        return 0
+    with open(args.output, "wb") as f:
+        f.write(image)
+    print(f"{args.output} を生成しました（CIRCUITPY 直下にコピー）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+プリセットジェネレーター
+会議アプリのミュート切り替えショートカットのプリセットを cuskey_preset の形式のバイナリに詰め、
+デバイスで読み込む cuskey_presets.py（IMAGE）を生成する
+デバイスは起動時に NVM の内容と比べ、違っていれば NVM に書き込んでからモジュールを RAM から外す
+
+プリセットを追加・変更するときは PRESETS を書き換えて実行する（キー名は adafruit_hid の Keycode の名前）
+
+使い方:
+    python tools/gen_presets.py            # リポジトリ直下に生成
+    python tools/gen_presets.py --list     # 収録しているプリセットを表示
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import cuskey_sim  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import cuskey_preset  # noqa: E402
+
+# (名前, キー名, ショートカットの表示名, 対象アプリ名)
+PRESETS = (
+    ("slack_macos", ("COMMAND", "SHIFT", "SPACE"), "Command+Shift+Space", "Slack Huddle macOS"),
+    ("slack_windows", ("CONTROL", "SHIFT", "SPACE"), "Control+Shift+Space", "Slack Huddle Windows/Linux"),
+    ("zoom_macos", ("COMMAND", "SHIFT", "A"), "Command+Shift+A", "Zoom macOS"),
+    ("zoom_windows", ("ALT", "A"), "Alt+A", "Zoom Windows/Linux"),
+    ("teams_macos", ("COMMAND", "SHIFT", "M"), "Command+Shift+M", "Microsoft Teams macOS"),
+    ("teams_windows", ("CONTROL", "SHIFT", "M"), "Control+Shift+M", "Microsoft Teams Windows"),
+    ("google_meet_macos", ("COMMAND", "D"), "Command+D", "Google Meet macOS"),
+    ("google_meet_windows", ("CONTROL", "D"), "Control+D", "Google Meet Windows/Linux"),
+    ("webex_macos", ("COMMAND", "SHIFT", "M"), "Command+Shift+M", "Webex macOS"),
+    ("webex_windows", ("CONTROL", "M"), "Control+M", "Webex Windows"),
+)
+
+MODULE_TEMPLATE = '''"""
+ミュート切り替えショートカットのプリセット（{count} 件、{size} bytes）
+tools/gen_presets.py で生成（直接編集しない）。形式は cuskey_preset を参照
+"""
+
+IMAGE = (
+{image})
+'''
+
+
+def build(presets=PRESETS):
+    """プリセットをバイナリにする"""
+    return cuskey_preset.pack([(name, tuple(cuskey_sim.KEYCODES[key] for key in keys), label, app_label)
+                               for name, keys, label, app_label in presets])
+
+
+def render(image, count):
+    lines = []
+    for start in range(0, len(image), 32):
+        chunk = image[start:start + 32]
+        lines.append('    b"' + "".join(f"\\x{b:02x}" for b in chunk) + '"\n')
+    return MODULE_TEMPLATE.format(count=count, size=len(image), image="".join(lines))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="プリセットのバイナリ（cuskey_presets.py）を生成")
+    parser.add_argument("-o", "--output", default=ROOT, help="出力先ディレクトリ")
+    parser.add_argument("--list", action="store_true", help="収録しているプリセットを表示")
+    args = parser.parse_args(argv)
+
+    image = build()
+    if args.list:
+        store = cuskey_preset.PresetStore(image)
+        for index in range(store.count):
+            keys, label, app_label = store.load(index)
+            print(f"{index:3d} {store.name(index):<20} {label:<22} {app_label}")
+        return 0
+
+    path = os.path.join(args.output, cuskey_preset.IMAGE_MODULE + ".py")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(render(image, len(PRESETS)))
+    print(f"{path}: {len(PRESETS)} 件 / {len(image)} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,326 @@
+"""
+データチャンネル（cuskey_link）のクライアント
+PC（Linux）から 2 つ目の USB シリアル（/dev/ttyACM1 など）にフレームを送り、
+動作中のデバイスの定数の変更・プリセットの選択・マクロの送信・統計やトレースの読み出しを行う
+デバイスは LINK_ENABLED = True、boot.py で usb_cdc.enable(data=True)（tools/gen_boot.py --link）にしておく
+
+--sim APP を付けると実機の代わりにシミュレーター（tools/cuskey_sim.py --link）を起動し、
+その pty と通信する（実機なしでプロトコルを確認できる）
+
+使い方:
+    python tools/linkctl.py /dev/ttyACM1 ping
+    python tools/linkctl.py /dev/ttyACM1 set ptt_key LONG_PRESS_TIME 0.35
+    python tools/linkctl.py /dev/ttyACM1 preset zoom_windows
+    python tools/linkctl.py /dev/ttyACM1 macro text:hello key:ENTER wait:0.5 key:CONTROL+A
+    python tools/linkctl.py /dev/ttyACM1 play greeting     # 配布設定（tools/cuskey_deploy.py）のマクロ
+    python tools/linkctl.py /dev/ttyACM1 stats
+    python tools/linkctl.py /dev/ttyACM1 trace > trace.txt     # tools/cuskey_sim.py で再生できる
+    python tools/linkctl.py --sim meeting_controller check     # pty 越しに全コマンドを確認
+"""
+
+import argparse
+import os
+import select
+import struct
+import subprocess
+import sys
+import time
+
+TOOLS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(TOOLS)
+sys.path.insert(0, ROOT)
+import cuskey_link  # noqa: E402
+import cuskey_trace  # noqa: E402
+
+sys.path.insert(0, TOOLS)
+import cuskey_sim  # noqa: E402
+
+RESULT_NAMES = {
+    cuskey_link.OK: "OK",
+    cuskey_link.ERR_CRC: "CRC 不一致",
+    cuskey_link.ERR_COMMAND: "未対応のコマンド",
+    cuskey_link.ERR_ARGUMENT: "引数が正しくない",
+    cuskey_link.ERR_BUSY: "処理できない状態",
+    cuskey_link.ERR_VERIFY: "書き込んだ内容の CRC が一致しない",
+}
+
+
+class LinkError(Exception):
+    """応答がない・エラーが返った"""
+
+
+class LinkClient:
+    """データチャンネルにフレームを送り、同じ通し番号の応答を待つ（応答がなければ送り直す）"""
+
+    def __init__(self, path, timeout=1.0, retries=3):
+        import termios
+        import tty
+        self.fd = os.open(path, os.O_RDWR | os.O_NOCTTY)
+        if os.isatty(self.fd):
+            tty.setraw(self.fd)
+            termios.tcflush(self.fd, termios.TCIOFLUSH)
+        self.timeout = timeout
+        self.retries = retries
+        self.seq = 0
+        self.parser = cuskey_link.FrameParser()
+        # 統計
+        self.sent_bytes = 0
+        self.resent = 0
+
+    def close(self):
+        os.close(self.fd)
+
+    def _receive(self, seq, deadline):
+        """通し番号 seq の応答を (コマンド, ペイロード) で返す（時間切れなら None）"""
+        parser = self.parser
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            readable, _, _ = select.select([self.fd], [], [], remaining)
+            if not readable:
+                return None
+            data = os.read(self.fd, 4096)
+            position = 0
+            while position < len(data):
+                position = parser.feed(data, position)
+                if parser.ready:
+                    result = None
+                    if parser.error is None and parser.seq == seq and parser.command & cuskey_link.RESPONSE:
+                        result = parser.command, bytes(parser.payload())
+                    parser.reset()
+                    if result is not None:
+                        return result
+
+    def request(self, command, payload=b""):
+        """コマンドを送り、応答のデータ（結果の 1 バイトを除く）を返す"""
+        self.seq = (self.seq + 1) & 0xFF
+        frame = cuskey_link.encode_frame(command, self.seq, payload)
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.resent += 1
+            os.write(self.fd, frame)
+            self.sent_bytes += len(frame)
+            response = self._receive(self.seq, time.monotonic() + self.timeout)
+            if response is None:
+                continue
+            _, data = response
+            status = data[0] if data else cuskey_link.ERR_ARGUMENT
+            if status == cuskey_link.ERR_CRC:
+                continue
+            if status != cuskey_link.OK:
+                raise LinkError(f"コマンド 0x{command:02x}: {RESULT_NAMES.get(status, status)}")
+            return data[1:]
+        raise LinkError(f"コマンド 0x{command:02x}: 応答がありません")
+
+    def ping(self):
+        """(プロトコルのバージョン, ペイロードの上限, ボード名, 動作中のアプリ名のリスト)"""
+        data = self.request(cuskey_link.PING)
+        board, position = cuskey_link.decode_field(data, 3)
+        names = data[position:].decode()
+        return data[0], data[1] | (data[2] << 8), board, names.split(",") if names else []
+
+    def set(self, app, key, value):
+        self.request(cuskey_link.SET, cuskey_link.encode_set(app, key, value))
+
+    def preset(self, name):
+        self.request(cuskey_link.PRESET, name.encode())
+
+    def macro(self, steps):
+        """予約された手順の数を返す"""
+        data = self.request(cuskey_link.MACRO, cuskey_link.encode_macro(steps))
+        return data[0] | (data[1] << 8)
+
+    def play(self, name):
+        """配布設定のマクロを再生し、予約された手順の数を返す"""
+        data = self.request(cuskey_link.PLAY, name.encode())
+        return data[0] | (data[1] << 8)
+
+    def write(self, region, offset, data):
+        self.request(cuskey_link.WRITE, bytes((region,)) + offset.to_bytes(2, "little") + bytes(data))
+
+    def check(self, region, offset, length, block):
+        """offset から length バイトを block ごとに区切った CRC のリスト"""
+        data = self.request(cuskey_link.CHECK, bytes((region,)) + offset.to_bytes(2, "little")
+                            + length.to_bytes(2, "little") + block.to_bytes(2, "little"))
+        return [data[i] | (data[i + 1] << 8) for i in range(0, len(data), 2)]
+
+    def commit(self, region, length, crc):
+        """NVM に書き込んだら True（内容が同じなら False）"""
+        data = self.request(cuskey_link.COMMIT, bytes((region,)) + length.to_bytes(2, "little")
+                            + crc.to_bytes(2, "little"))
+        return bool(data[0])
+
+    def stats(self):
+        """[(名前, 値), ...]"""
+        data = self.request(cuskey_link.STATS)
+        items = []
+        position = 0
+        while position < len(data):
+            name, position = cuskey_link.decode_field(data, position)
+            items.append((name, struct.unpack_from("<I", data, position)[0]))
+            position += 4
+        return items
+
+    def trace(self):
+        """トレースを [(時刻 us, 状態), ...] で返す（32bit の周回は差分で戻す）"""
+        entries = []
+        start = 0
+        while True:
+            data = self.request(cuskey_link.TRACE, start.to_bytes(2, "little"))
+            count = data[0] | (data[1] << 8)
+            position = 4
+            while position + cuskey_link.TRACE_ENTRY_SIZE <= len(data):
+                entries.append((int.from_bytes(data[position:position + 4], "little"), data[position + 4]))
+                position += cuskey_link.TRACE_ENTRY_SIZE
+            start = len(entries)
+            if start >= count or position == 4:
+                break
+        result = []
+        t_us = entries[0][0] if entries else 0
+        previous = t_us
+        for raw, state in entries:
+            t_us += (raw - previous) & 0xFFFFFFFF
+            previous = raw
+            result.append((t_us, state))
+        return result
+
+
+def parse_value(text):
+    """コマンドラインの値を整数・実数・真偽値・文字列のどれかにする"""
+    if text in ("True", "False"):
+        return text == "True"
+    for convert in (int, float):
+        try:
+            return convert(text)
+        except ValueError:
+            pass
+    return text
+
+
+def parse_macro(items):
+    """text:文字列 / key:CONTROL+A / wait:秒 の並びを手順にする"""
+    steps = []
+    for item in items:
+        kind, _, value = item.partition(":")
+        if kind == "text":
+            steps.append((cuskey_link.MACRO_TEXT, value))
+        elif kind == "key":
+            steps.append((cuskey_link.MACRO_KEY, tuple(cuskey_sim.KEYCODES[name] for name in value.split("+"))))
+        elif kind == "wait":
+            steps.append((cuskey_link.MACRO_WAIT, float(value)))
+        else:
+            raise ValueError(f"不明な手順: {item}（text: / key: / wait:）")
+    return steps
+
+
+def start_simulator(app, extra=()):
+    """シミュレーターをデータチャンネル付きで起動し、(プロセス, pty のパス) を返す"""
+    command = [sys.executable, os.path.join(TOOLS, "cuskey_sim.py"), "--link", "--app", app] + list(extra)
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line.startswith("PTY: "):
+        process.kill()
+        raise LinkError("シミュレーターを起動できません")
+    return process, line[5:].strip()
+
+
+def check(client):
+    """全コマンドを順に送り、応答を表示（pty でのプロトコル確認用）"""
+    version, max_payload, board, names = client.ping()
+    print(f"ping: バージョン {version} / ペイロード上限 {max_payload} bytes / ボード {board} / アプリ {names}")
+    app = names[0]
+    client.set(app, "LONG_PRESS_TIME", 0.45)
+    print(f"set: {app}.LONG_PRESS_TIME = 0.45")
+    try:
+        client.set(app, "NO_SUCH_CONSTANT", 1)
+        print("set（存在しない定数）: エラーになりませんでした")
+        return 1
+    except LinkError as e:
+        print(f"set（存在しない定数）: {e}")
+    try:
+        client.preset("zoom_windows")
+        print("preset: zoom_windows")
+    except LinkError as e:
+        print(f"preset: {e}（プリセットを持つアプリではない）")
+    count = client.macro(parse_macro(["text:ok", "key:ENTER"]))
+    print(f"macro: {count} 手順を予約")
+    # 壊れたフレーム（CRC 不一致）には ERR_CRC が返り、次のフレームは正しく処理される
+    frame = bytearray(cuskey_link.encode_frame(cuskey_link.PING, 0x7F))
+    frame[-1] ^= 0xFF
+    os.write(client.fd, bytes(frame))
+    time.sleep(0.1)
+    stats = dict(client.stats())
+    print(f"stats: {len(stats)} 項目（link.errors = {stats.get('link.errors')}, macro.typed = {stats.get('macro.typed')}）")
+    try:
+        entries = client.trace()
+        print(f"trace: {len(entries)} 件")
+    except LinkError as e:
+        print(f"trace: {e}（TRACE_ENABLED = False）")
+    print(f"送信 {client.sent_bytes} bytes / 再送 {client.resent} 回")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="データチャンネル（cuskey_link）のクライアント")
+    parser.add_argument("words", nargs="*", metavar="[PORT] COMMAND [ARG]",
+                        help="ポート（--sim では省略）とコマンド: ping / set APP KEY VALUE / preset NAME / "
+                             "macro STEP... / play NAME / stats / trace / check")
+    parser.add_argument("--sim", metavar="APP", help="実機の代わりにシミュレーターを pty で起動して使う")
+    parser.add_argument("--timeout", type=float, default=1.0, help="応答を待つ秒数")
+    args = parser.parse_args(argv)
+
+    words = list(args.words)
+    process = None
+    if args.sim:
+        process, port = start_simulator(args.sim, ("--set", "TRACE_ENABLED=True"))
+    elif not words:
+        parser.error("ポートを指定してください（または --sim APP）")
+    else:
+        port = words.pop(0)
+    command = words.pop(0) if words else "ping"
+
+    client = LinkClient(port, timeout=args.timeout)
+    try:
+        if command == "ping":
+            version, max_payload, board, names = client.ping()
+            print(f"バージョン {version} / ペイロード上限 {max_payload} bytes / ボード {board} / "
+                  f"アプリ {', '.join(names)}")
+        elif command == "set":
+            app, key, value = words
+            client.set(app, key, parse_value(value))
+            print(f"{app}.{key} = {parse_value(value)!r}")
+        elif command == "preset":
+            client.preset(words[0])
+            print(f"プリセット: {words[0]}")
+        elif command == "macro":
+            print(f"{client.macro(parse_macro(words))} 手順を予約しました")
+        elif command == "play":
+            print(f"{client.play(words[0])} 手順を予約しました")
+        elif command == "stats":
+            for name, value in client.stats():
+                print(f"{name:<32} {value}")
+        elif command == "trace":
+            print(cuskey_trace.TRACE_HEADER)
+            print("# t_us,button,mode")
+            for t_us, state in client.trace():
+                print(f"{t_us},{state & 1},{(state >> 1) & 1}")
+            print(cuskey_trace.TRACE_FOOTER)
+        elif command == "check":
+            return check(client)
+        else:
+            print(f"不明なコマンド: {command}", file=sys.stderr)
+            return 2
+    except LinkError as e:
+        print(f"エラー: {e}", file=sys.stderr)
+        return 1
+    finally:
+        client.close()
+        if process is not None:
+            process.terminate()
+            process.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+マクロライブラリ（cuskey_macro）の大きさと解析コストのベンチマーク
+マクロの定義を tools/gen_macros.py と同じようにライブラリに変換し、マクロごとに
+1 手順あたりのバイト数と、1 レポートごとに 8 バイトのレポートを並べた場合との比、
+デバイスと同じ MacroStream で読み込みながら再生したときの 1 レポートあたりの解析時間を表示する
+
+解析時間は送信を数えるだけのキーボードで測る（HID の送信・フレーム待ちを含まない、CPython での値）
+実機の値はこの比率を目安にする（RP2040 の CircuitPython は CPython よりおおむね 2 桁遅い）
+
+使い方:
+    python tools/macro_bench.py
+    python tools/macro_bench.py tools/macros_sample.json --apps --stress long_text=20000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+TOOLS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(TOOLS)
+sys.path.insert(0, TOOLS)
+import gen_macros  # noqa: E402
+
+sys.path.insert(0, ROOT)
+import cuskey_macro  # noqa: E402
+
+# 比べる形式の 1 レポートの大きさ（修飾キー, 予約, キーコード 6 個）
+REPORT_SIZE = 8
+
+
+class CountingKeyboard:
+    """送ったレポート数だけを数えるキーボード"""
+
+    def __init__(self):
+        self.reports = 0
+
+    def send(self, *keycodes):
+        self.reports += 2
+
+    def press(self, *keycodes):
+        self.reports += 1
+
+    def release(self, *keycodes):
+        self.reports += 1
+
+    def release_all(self):
+        self.reports += 1
+
+
+class CountingHid:
+    """cuskey_hid.HidOutput の代わり（いつでも送信できる）"""
+
+    def __init__(self):
+        self.keyboard = CountingKeyboard()
+
+    def ready(self, target, now):
+        return True
+
+    def ready_time(self, target):
+        return 0.0
+
+
+def count_steps(steps):
+    """[(手順のバイト列, 回数)] の手順数（文字列は 1 文字 1 手順）と送るはずのレポート数"""
+    total = 0
+    reports = 0
+    for data, count in steps:
+        kind = data[0]
+        if kind == cuskey_macro.TEXT:
+            chars = len(data[2:].decode()) * count
+            total += chars
+            reports += 2 * chars
+        else:
+            total += count
+            if kind == cuskey_macro.KEY:
+                reports += 2 * count
+            elif kind in (cuskey_macro.PRESS, cuskey_macro.RELEASE):
+                reports += count
+    return total, reports
+
+
+def play(path, name, layout, buffer_size):
+    """ライブラリのマクロを最後まで再生し、(キーボード, 解析時間 ns, readinto の回数) を返す"""
+    hid = CountingHid()
+    player = cuskey_macro.MacroPlayer(hid, layout, 1e9, path, buffer_size)
+    if not player.play(name):
+        raise ValueError(f"{name} が見つかりません")
+    now = 0.0
+    start = time.perf_counter_ns()
+    while player.busy():
+        player.tick(now)
+        # 待機は時刻を進めて飛ばす
+        now = max(now, player.next_time)
+    elapsed = time.perf_counter_ns() - start
+    return hid.keyboard, elapsed, player.stream.reads
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="マクロライブラリの 1 手順あたりの大きさと解析コストを測る")
+    parser.add_argument("definitions", nargs="?", default=os.path.join(TOOLS, "macros_sample.json"),
+                        help="マクロの定義ファイル（JSON、既定: tools/macros_sample.json）")
+    parser.add_argument("--apps", action="store_true", help="examples/ のアプリのキー入力の手順も含める")
+    parser.add_argument("--stress", action="append", default=[], metavar="NAME=BYTES",
+                        help="試験用の長い文字列のマクロを追加")
+    parser.add_argument("--layout", default="us", choices=("us", "jis"), help="キーボード配列")
+    parser.add_argument("--buffer", type=int, default=128, help="読み込みバッファの大きさ（bytes）")
+    parser.add_argument("--repeat", type=int, default=20, help="解析時間を測る回数（最小値を使う）")
+    args = parser.parse_args(argv)
+
+    with open(args.definitions, encoding="utf-8") as f:
+        definitions = json.load(f)
+    if args.apps:
+        definitions.update(gen_macros.app_definitions())
+    for item in args.stress:
+        name, _, size = item.partition("=")
+        definitions[name] = ["text:" + gen_macros.stress_text(int(size))]
+    base = os.path.dirname(os.path.abspath(args.definitions))
+    parsed = {name: gen_macros.parse_steps(items, base) for name, items in definitions.items()}
+    macros = {name: gen_macros.encode_steps(steps) for name, steps in parsed.items()}
+    layout = cuskey_macro.load_layout(args.layout)
+
+    handle, path = tempfile.mkstemp(suffix=".bin")
+    try:
+        with os.fdopen(handle, "wb") as f:
+            f.write(gen_macros.build(macros))
+        print(f"{'マクロ':<24} {'手順':>6} {'レポート':>8} {'bytes':>7} {'bytes/手順':>10} {'bytes/レポート':>14} "
+              f"{'8B レポート比':>12} {'解析 us/レポート':>16} {'読込':>5}")
+        total_bytes = total_steps = total_reports = total_ns = 0
+        for name, data in macros.items():
+            steps, expected = count_steps(parsed[name])
+            best = None
+            for _ in range(args.repeat):
+                keyboard, elapsed, reads = play(path, name, layout, args.buffer)
+                best = elapsed if best is None else min(best, elapsed)
+            reports = keyboard.reports
+            if reports != expected:
+                print(f"[WARN] {name}: 送ったレポート数 {reports} が定義の {expected} と違います")
+            raw = REPORT_SIZE * reports
+            per_report = best / 1000 / reports if reports else 0.0
+            print(f"{name:<24} {steps:6d} {reports:8d} {len(data):7d} {len(data) / steps:10.2f} "
+                  f"{len(data) / max(reports, 1):14.2f} {len(data) / max(raw, 1):11.1%} {per_report:16.2f} {reads:5d}")
+            total_bytes += len(data)
+            total_steps += steps
+            total_reports += reports
+            total_ns += best
+        print()
+        print(f"合計: {total_steps} 手順 / {total_reports} レポート / {total_bytes} bytes"
+              f"（{total_bytes / total_steps:.2f} bytes/手順、8 バイトのレポートを並べると {REPORT_SIZE * total_reports} bytes）")
+        print(f"解析: {total_ns / 1000 / max(total_reports, 1):.2f} us/レポート（CPython、読み込みバッファ {args.buffer} bytes）")
+    finally:
+        os.remove(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+基本部品のマイクロベンチマーク（PC）
+cuskey_bench の計測をシミュレーターの仮想ピン・仮想 USB の上で CPython で実行し、
+部品ごとの 1 秒あたりの回数・1 回あたりの時間・1 回あたりに確保するメモリを表示する
+結果を保存しておけば、次回の計測と比べて遅くなった・メモリを多く確保するようになった部品を知らせる
+（1 回の時間が分解能より小さい部品は、空のループの時間を差し引く前の計測値で比べる）
+（実機の値は tools/bench_code.py を code.py として測る。CPython の値は部品どうしの比較と変化の確認用）
+
+使い方:
+    python tools/micro_bench.py
+    python tools/micro_bench.py --save bench.json            # 結果を保存
+    python tools/micro_bench.py --baseline bench.json        # 保存した結果と比べる（悪化があれば終了コード 1）
+    python tools/micro_bench.py --only gesture dispatch --count 100000
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+
+TOOLS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TOOLS)
+import cuskey_sim  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(TOOLS))
+
+
+def compare(results, baseline, tolerance, alloc_slack):
+    """保存した結果と比べて悪化した部品の説明を返す"""
+    problems = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if result is None or previous is None:
+            continue
+        rate, per_call, allocated, raw = result[:4]
+        previous_rate, previous_per_call, previous_allocated, previous_raw = previous[:4]
+        # どちらかが分解能より小さいときは、空のループの時間を差し引く前の計測値で比べる
+        if rate is None or previous_rate is None:
+            label = "計測値"
+            per_call, previous_per_call = raw, previous_raw
+        else:
+            label = "1 回"
+        if previous_per_call > 0 and per_call > previous_per_call * (1 + tolerance):
+            problems.append(f"{name}: {label} {previous_per_call / 1000:.3f}us → {per_call / 1000:.3f}us"
+                            f"（+{per_call / previous_per_call - 1:.0%}）")
+        if allocated is not None and previous_allocated is not None and allocated > previous_allocated + alloc_slack:
+            problems.append(f"{name}: 確保 {previous_allocated:.1f} → {allocated:.1f} bytes/回")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="基本部品のマイクロベンチマーク（シミュレーター上の CPython）")
+    parser.add_argument("--count", type=int, default=20000, help="1 部品あたりの呼び出し回数")
+    parser.add_argument("--repeat", type=int, default=5, help="計測の回数（1 回の時間が最も短いものを使う）")
+    parser.add_argument("--only", nargs="+", metavar="NAME", help="計測する部品（pin / debounce / gesture / "
+                        "dispatch / report / trace）")
+    parser.add_argument("--save", metavar="FILE", help="結果を JSON で保存")
+    parser.add_argument("--baseline", metavar="FILE", help="保存した結果と比べる")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="1 回の時間がこの割合を超えて増えたら悪化とみなす（既定 0.25 = 25%%）")
+    parser.add_argument("--alloc-slack", type=float, default=8.0,
+                        help="確保するメモリがこのバイト数を超えて増えたら悪化とみなす")
+    args = parser.parse_args(argv)
+
+    sim = cuskey_sim.Simulator()
+    sim._install_modules()
+    import cuskey_bench
+    names = tuple(args.only) if args.only else cuskey_bench.NAMES
+    for name in names:
+        if name not in cuskey_bench.CASES:
+            parser.error(f"不明な部品: {name}")
+
+    # ピン・HID 出力の初期化（起動メッセージなどは表示しない）
+    with contextlib.redirect_stdout(io.StringIO()):
+        import cuskey_runtime
+        ctx = cuskey_runtime.Context()
+    results = {}
+    for _ in range(args.repeat):
+        for name, result in cuskey_bench.run(ctx, args.count, names).items():
+            best = results.get(name)
+            if best is None or (result is not None and result[3] < best[3]):
+                results[name] = result
+
+    print(f"CPython {sys.version.split()[0]} / シミュレーター / {args.count} 回 × {args.repeat}")
+    cuskey_bench.report(results)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"{args.save} に保存しました")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        problems = compare(results, baseline, args.tolerance, args.alloc_slack)
+        print()
+        if problems:
+            print(f"{args.baseline} より悪化した部品:")
+            for problem in problems:
+                print(f"  {problem}")
+            return 1
+        print(f"{args.baseline} と比べて悪化した部品はありません")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+PTT 開始遅延ベンチマーク
+シミュレーター上の ptt_key（Mode A）に合成したボタン入力を与え、
+PTT_IMMEDIATE（押下と同時に PTT キーを押す）の有無で次の値を比べる
+    - 長押しで PTT キーが押されるまでの遅延（押した時刻から）
+    - シングル・ダブルクリックの判定結果（Enter / ESC が正しく送られたか）
+    - クリック中に一瞬だけ PTT が入った回数と長さ
+
+使い方:
+    python tools/ptt_bench.py
+    python tools/ptt_bench.py --profile cheap --presses 20 --set DEBOUNCE_STABLE_TIME=0.005
+"""
+
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import cuskey_sim  # noqa: E402
+import bounce_bench  # noqa: E402
+
+ENTER = cuskey_sim.KEYCODES["ENTER"]
+ESCAPE = cuskey_sim.KEYCODES["ESCAPE"]
+
+
+def analyze(expected, reports):
+    """スロットごとに PTT の開始遅延・クリック判定・PTT の混入を集計"""
+    result = {"ptt_latency": [], "click_ok": 0, "click_ng": 0, "blips": [], "ptt_missed": 0}
+    for slot_start, slot_end, gesture, reference in expected:
+        if gesture == "idle":
+            continue
+        ptt_on = None
+        first_on = None
+        blips = []
+        keys = []
+        previous = bytes(8)
+        for t, device, report in reports:
+            if device != "keyboard" or not slot_start <= t < slot_end:
+                continue
+            if report[0] and not previous[0]:
+                ptt_on = t
+                if first_on is None:
+                    first_on = t
+            elif previous[0] and not report[0] and ptt_on is not None:
+                blips.append(t - ptt_on)
+            for key in (ENTER, ESCAPE):
+                if key in report[2:] and key not in previous[2:]:
+                    keys.append(key)
+            previous = report
+
+        if gesture == "long":
+            if first_on is not None:
+                result["ptt_latency"].append(first_on - reference)
+            else:
+                result["ptt_missed"] += 1
+            continue
+
+        wanted = [ENTER] if gesture == "single" else [ESCAPE]
+        if keys == wanted:
+            result["click_ok"] += 1
+        else:
+            result["click_ng"] += 1
+        result["blips"] += blips
+    return result
+
+
+def run_case(overrides, profile_name, presses, seed):
+    rng = random.Random(seed)
+    plan = [g for g in bounce_bench.GESTURES for _ in range(presses)]
+    rng.shuffle(plan)
+    events, expected = bounce_bench.build_trace(plan, bounce_bench.PROFILES[profile_name], rng)
+    reports = cuskey_sim.Simulator(overrides=overrides, seed=seed).run("ptt_key", events, tail=bounce_bench.SLOT)
+    return analyze(expected, reports)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PTT_IMMEDIATE による PTT 開始遅延の比較")
+    parser.add_argument("--profile", action="append", choices=sorted(bounce_bench.PROFILES),
+                        help="バウンスのモデル（複数指定可、既定: clean, typical）")
+    parser.add_argument("--presses", type=int, default=10, help="ジェスチャー種類ごとの試行回数")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="両方の条件に共通の設定値の上書き（例: --set LONG_PRESS_TIME=0.4）")
+    args = parser.parse_args(argv)
+    profiles = args.profile or ["clean", "typical"]
+
+    try:
+        common = cuskey_sim.parse_overrides(args.set)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print(f"プロファイル: {', '.join(profiles)} / ジェスチャーごと {args.presses} 回")
+    print(f"{'PTT_IMMEDIATE':>13} | {'PTT開始 平均':>10} {'最大':>6} {'未検出':>4} |"
+          f" {'クリック正':>5} {'誤':>3} | {'PTT混入':>5} {'平均長さ':>6} (ms)")
+    latency = {}
+    for immediate in (False, True):
+        overrides = dict(common, PTT_IMMEDIATE=immediate)
+        total = {"ptt_latency": [], "click_ok": 0, "click_ng": 0, "blips": [], "ptt_missed": 0}
+        for profile_name in profiles:
+            result = run_case(overrides, profile_name, args.presses, args.seed)
+            for key, value in result.items():
+                total[key] += value
+        latency[immediate] = bounce_bench.mean(total["ptt_latency"])
+        worst = max(total["ptt_latency"]) if total["ptt_latency"] else float("nan")
+        print(f"{str(immediate):>13} | {latency[immediate] * 1000:12.1f} {worst * 1000:6.1f}"
+              f" {total['ptt_missed']:6d} | {total['click_ok']:9d} {total['click_ng']:3d} |"
+              f" {len(total['blips']):7d} {bounce_bench.mean(total['blips']) * 1000:8.1f}")
+
+    print()
+    print(f"PTT_IMMEDIATE = True で短縮される PTT 開始遅延: {(latency[False] - latency[True]) * 1000:.1f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
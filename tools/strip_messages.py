@@ -0,0 +1,299 @@
+"""
+表示文を取り除いたビルドの生成
+code.py・cuskey_*.py・examples/*.py の print("...") / print(f"...") を番号付きのメッセージに置き換え
+（cuskey_catalog.say）、docstring と説明用の文字列も取り除いたコピーを出力する。
+本文はカタログ（cuskey_catalog.bin、デバイスに置くと表示するときだけ読む）と
+catalog.json（PC で "#番号" の表示を本文に戻す）に書き出す
+
+cuskey_settings.py は CIRCUITPY で編集するファイルなので、コメントを残してそのままコピーする
+
+使い方:
+    python tools/strip_messages.py                        # build/ に出力して大きさを比較
+    python tools/strip_messages.py --no-catalog           # カタログをデバイスに置かない（番号だけ表示）
+    python tools/strip_messages.py --check ptt_key        # シミュレーターで元のファイルと表示・HID レポートを比較
+    python tools/strip_messages.py --decode build/catalog.json < serial.log
+"""
+
+import argparse
+import ast
+import glob
+import json
+import marshal
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+TOOLS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(TOOLS)
+sys.path.insert(0, ROOT)
+import cuskey_catalog  # noqa: E402
+import cuskey_trace  # noqa: E402
+
+# 置き換えずにそのままコピーするファイル
+KEEP_FILES = ("cuskey_settings.py", "cuskey_catalog.py")
+
+# 置き換えた print の呼び出し先（各モジュールの先頭で import する）
+SAY_NAME = "_say"
+SAY_IMPORT = f"from cuskey_catalog import say as {SAY_NAME}"
+
+# print のキーワード引数のうち say にそのまま渡せるもの
+PRINT_KEYWORDS = ("end", "file", "flush")
+
+CONVERSIONS = {-1: "", 115: "!s", 114: "!r", 97: "!a"}
+
+
+def source_files(root=ROOT):
+    """ビルドに含めるファイル（root からの相対パス）"""
+    files = ["code.py"]
+    files += sorted(os.path.basename(path) for path in glob.glob(os.path.join(root, "cuskey_*.py")))
+    files += sorted(os.path.join("examples", os.path.basename(path))
+                    for path in glob.glob(os.path.join(root, "examples", "*.py")))
+    return files
+
+
+def _escape(text):
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def message_format(node):
+    """print の引数を (str.format の書式, 値の式のリスト) にする（置き換えられなければ None）"""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return _escape(node.value), []
+    if not isinstance(node, ast.JoinedStr):
+        return None
+    parts = []
+    values = []
+    for item in node.values:
+        if isinstance(item, ast.Constant):
+            parts.append(_escape(item.value))
+            continue
+        spec = ""
+        if item.format_spec is not None:
+            # 書式指定の中に式がある（f"{x:{width}}"）ものは置き換えない
+            if not all(isinstance(part, ast.Constant) for part in item.format_spec.values):
+                return None
+            spec = ":" + "".join(part.value for part in item.format_spec.values)
+        parts.append("{" + CONVERSIONS[item.conversion] + spec + "}")
+        values.append(item.value)
+    return "".join(parts), values
+
+
+class Catalog:
+    """メッセージの書式に番号を付ける（同じ書式は同じ番号）"""
+
+    def __init__(self):
+        self.messages = []
+        self.numbers = {}
+
+    def number(self, text):
+        if text not in self.numbers:
+            self.numbers[text] = len(self.messages)
+            self.messages.append(text)
+        return self.numbers[text]
+
+    def pack(self):
+        """cuskey_catalog の形式のバイナリ"""
+        bodies = [text.encode() for text in self.messages]
+        position = cuskey_catalog.HEADER_SIZE + 4 * (len(bodies) + 1)
+        index = bytearray()
+        for body in bodies:
+            index += position.to_bytes(4, "little")
+            position += len(body)
+        index += position.to_bytes(4, "little")
+        return cuskey_catalog.MAGIC + len(bodies).to_bytes(2, "little") + bytes(index) + b"".join(bodies)
+
+
+class Stripper(ast.NodeTransformer):
+    """print を say に置き換え、docstring・説明用の文字列を取り除く"""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.replaced = 0
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if not (isinstance(node.func, ast.Name) and node.func.id == "print" and len(node.args) == 1):
+            return node
+        if any(keyword.arg not in PRINT_KEYWORDS for keyword in node.keywords):
+            return node
+        message = message_format(node.args[0])
+        if message is None:
+            return node
+        text, values = message
+        self.replaced += 1
+        number = ast.Constant(self.catalog.number(text))
+        return ast.copy_location(ast.Call(ast.Name(SAY_NAME, ast.Load()), [number] + values, node.keywords), node)
+
+    def _strip_body(self, node):
+        self.generic_visit(node)
+        node.body = [statement for statement in node.body
+                     if not (isinstance(statement, ast.Expr) and isinstance(statement.value, ast.Constant)
+                             and isinstance(statement.value.value, str))] or [ast.Pass()]
+        return node
+
+    visit_Module = visit_ClassDef = visit_FunctionDef = visit_If = _strip_body
+
+
+def strip_source(source, catalog):
+    """ソースを変換して (変換後のソース, 置き換えた print の数) を返す"""
+    tree = ast.parse(source)
+    stripper = Stripper(catalog)
+    tree = stripper.visit(tree)
+    if stripper.replaced:
+        tree.body.insert(0, ast.parse(SAY_IMPORT).body[0])
+    return ast.unparse(ast.fix_missing_locations(tree)) + "\n", stripper.replaced
+
+
+def code_size(source, path):
+    """CPython でコンパイルしたコードオブジェクトの大きさ（バイトコード・定数の目安）"""
+    return len(marshal.dumps(compile(source, path, "exec")))
+
+
+def mpy_size(path, work):
+    """mpy-cross で変換した .mpy の大きさ（mpy-cross がなければ None）"""
+    mpy_cross = shutil.which("mpy-cross")
+    if mpy_cross is None:
+        return None
+    output = os.path.join(work, os.path.basename(path)[:-3] + ".mpy")
+    subprocess.run([mpy_cross, "-o", output, path], check=True)
+    return os.path.getsize(output)
+
+
+def build(out, with_catalog=True):
+    """out にビルドを出力し、ファイルごとの大きさを表示"""
+    catalog = Catalog()
+    rows = []
+    for name in source_files():
+        source_path = os.path.join(ROOT, name)
+        target_path = os.path.join(out, name)
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        with open(source_path, encoding="utf-8") as f:
+            source = f.read()
+        if os.path.basename(name) in KEEP_FILES:
+            stripped, replaced = source, 0
+        else:
+            stripped, replaced = strip_source(source, catalog)
+        with open(target_path, "w", encoding="utf-8") as f:
+            f.write(stripped)
+        rows.append((name, source_path, target_path, source, stripped, replaced))
+
+    image = catalog.pack()
+    if with_catalog:
+        with open(os.path.join(out, "cuskey_catalog.bin"), "wb") as f:
+            f.write(image)
+    with open(os.path.join(out, "catalog.json"), "w", encoding="utf-8") as f:
+        json.dump(catalog.messages, f, ensure_ascii=False, indent=0)
+
+    print(f"{'ファイル':<34} {'置換':>4} {'.py':>14} {'コード（CPython）':>18} {'.mpy':>14}")
+    totals = [0, 0, 0, 0, 0, 0]
+    with tempfile.TemporaryDirectory() as work:
+        before = os.path.join(work, "before")
+        after = os.path.join(work, "after")
+        os.makedirs(before)
+        os.makedirs(after)
+        for name, source_path, target_path, source, stripped, replaced in rows:
+            sizes = (len(source.encode()), len(stripped.encode()),
+                     code_size(source, source_path), code_size(stripped, target_path),
+                     mpy_size(source_path, before), mpy_size(target_path, after))
+            for i, size in enumerate(sizes):
+                totals[i] += size or 0
+            mpy = f"{sizes[4]:>6}→{sizes[5]:<6}" if sizes[4] is not None else f"{'-':>14}"
+            print(f"{name:<34} {replaced:>4} {sizes[0]:>6}→{sizes[1]:<6} {sizes[2]:>8}→{sizes[3]:<8} {mpy}")
+    text_bytes = sum(len(text.encode()) for text in catalog.messages)
+    print(f"合計: .py {totals[0]} → {totals[1]} bytes、コード {totals[2]} → {totals[3]} bytes"
+          + (f"、.mpy {totals[4]} → {totals[5]} bytes" if shutil.which("mpy-cross") else
+             "（mpy-cross が見つからないので .mpy は省略）"))
+    print(f"メッセージ: {len(catalog.messages)} 件、本文 {text_bytes} bytes"
+          f"（カタログ {len(image)} bytes{'' if with_catalog else '、デバイスには置かない'}）")
+    return catalog
+
+
+def decode_line(line, messages):
+    """"#番号<TAB>値..." の行を本文に戻す（それ以外の行はそのまま）"""
+    if not line.startswith("#"):
+        return line
+    head, *values = line.rstrip("\n").split("\t")
+    if not head[1:].isdigit() or int(head[1:]) >= len(messages):
+        return line
+    converted = []
+    for value in values:
+        try:
+            converted.append(ast.literal_eval(value))
+        except (ValueError, SyntaxError):
+            converted.append(value)
+    text = messages[int(head[1:])]
+    for arguments in (converted, values):
+        try:
+            return text.format(*arguments) + "\n"
+        except (ValueError, TypeError, IndexError):
+            continue
+    return f"{text} {values}\n"
+
+
+def make_trace(path):
+    """比較用のトレース（短押し・長押し・ダブルクリック・モード切り替え）"""
+    events = [(0.0, 1, 1), (0.5, 0, 1), (0.6, 1, 1), (1.5, 0, 1), (2.5, 1, 1), (3.0, 0, 1), (3.08, 1, 1),
+              (3.2, 0, 1), (3.28, 1, 1), (4.0, 1, 0), (4.5, 0, 0), (4.6, 1, 0), (5.5, 0, 0), (6.5, 1, 0)]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(cuskey_trace.TRACE_HEADER + "\n# t_us,button,mode\n")
+        for t, button, mode in events:
+            f.write(f"{int(t * 1000000)},{button},{mode}\n")
+        f.write(cuskey_trace.TRACE_FOOTER + "\n")
+
+
+def check(app, out):
+    """元のファイルとビルドをシミュレーターで動かし、表示と HID レポートが同じか確かめる"""
+    with tempfile.TemporaryDirectory() as work:
+        trace = os.path.join(work, "trace.csv")
+        make_trace(trace)
+        results = []
+        for root, catalog in ((ROOT, None), (out, os.path.join(out, "cuskey_catalog.bin"))):
+            command = [sys.executable, os.path.join(TOOLS, "cuskey_sim.py"), trace, "--app", app,
+                       "--verbose", "--root", root, "--set", f"MESSAGE_CATALOG={catalog!r}"]
+            results.append(subprocess.run(command, capture_output=True, text=True, check=True).stdout)
+    original, stripped = (result.splitlines() for result in results)
+    if original == stripped:
+        print(f"{app}: 表示と HID レポートは同じです（{len(original)} 行）")
+        return 0
+    for a, b in zip(original, stripped):
+        if a != b:
+            print(f"{app}: 違いがあります\n  元:   {a}\n  変換: {b}")
+            break
+    else:
+        print(f"{app}: 行数が違います（{len(original)} / {len(stripped)}）")
+    return 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="表示文をメッセージ番号に置き換えたビルドを生成")
+    parser.add_argument("--out", default=os.path.join(ROOT, "build"), help="出力先（既定: build/）")
+    parser.add_argument("--no-catalog", action="store_true",
+                        help="カタログをデバイス用に出力しない（デバイスは番号だけを表示し、PC で --decode）")
+    parser.add_argument("--check", metavar="APP", action="append", default=[],
+                        help="シミュレーターで元のファイルと比較するアプリ（複数指定可）")
+    parser.add_argument("--decode", metavar="CATALOG_JSON", help="標準入力のシリアルログの \"#番号\" を本文に戻す")
+    args = parser.parse_args(argv)
+
+    if args.decode:
+        with open(args.decode, encoding="utf-8") as f:
+            messages = json.load(f)
+        for line in sys.stdin:
+            sys.stdout.write(decode_line(line, messages))
+        return 0
+
+    if os.path.exists(args.out):
+        # 前回のビルド（catalog.json がある）だけを消す
+        if os.listdir(args.out) and not os.path.exists(os.path.join(args.out, "catalog.json")):
+            parser.error(f"{args.out} はビルドの出力先ではありません（空でないディレクトリ）")
+        shutil.rmtree(args.out)
+    build(args.out, with_catalog=not args.no_catalog)
+    status = 0
+    for app in args.check:
+        status |= check(app, args.out)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
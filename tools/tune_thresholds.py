@@ -0,0 +1,280 @@
+"""
+ジェスチャー判定しきい値チューナー
+実際の利用者が記録したラベル付きトレースをシミュレーター上のアプリで再生し、
+LONG_PRESS_TIME・DOUBLE_CLICK_TIME・MIN_PRESS_TIME を総当たりで試して
+ジェスチャーごとの誤判定数と判定までの遅延を表示する
+最も良い設定は cuskey_settings.APP_SETTINGS の形で出力する
+
+ラベル付きトレースの作り方:
+    1. cuskey_settings.TRACE_ENABLED = True にして、シリアルで c を送って記録を消去
+    2. ジェスチャーを 1 回だけ行い、シリアルで t を送ってトレースを出力
+    3. 出力されたトレースの直前に "# label single"（single / double / long）の行を書き足す
+    1 つのファイルに複数のトレースを続けて書いてもよい
+
+使い方:
+    python tools/tune_thresholds.py traces/*.txt
+    python tools/tune_thresholds.py --app meeting_controller traces/*.txt
+    python tools/tune_thresholds.py --synthetic 20      # 合成トレースで動作確認
+"""
+
+import argparse
+import itertools
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import cuskey_sim  # noqa: E402
+import bounce_bench  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import cuskey_trace  # noqa: E402
+
+LABEL_PREFIX = "# label "
+
+# トレース 1 件の前後に空ける時間（秒）
+SLOT_MARGIN = 1.0
+SLOT_OFFSET = 0.2
+
+# 連続送信（音量変更など）を 1 回の長押しとみなす送信間隔の上限（秒）
+# cuskey_settings.REPEAT_SETTINGS["volume"] の初回遅延より長くする
+REPEAT_GAP = 0.6
+
+
+def detect_meeting(reports):
+    """meeting_controller（Mode A）のレポート列からジェスチャー [(時刻, 種類)] を取り出す"""
+    detected = []
+    previous = {"keyboard": bytes(8), "consumer_control": bytes(2)}
+    last_volume_time = None
+    for t, device, report in reports:
+        if device == "keyboard" and any(report[2:]) and not any(previous["keyboard"][2:]):
+            detected.append((t, "single"))
+        elif device == "consumer_control" and any(report) and not any(previous["consumer_control"]):
+            # 長押し中は音量変更が繰り返されるので、間隔が空いたときだけ新しい長押しとして数える
+            if last_volume_time is None or t - last_volume_time > REPEAT_GAP:
+                detected.append((t, "long"))
+            last_volume_time = t
+        if device in previous:
+            previous[device] = report
+    return detected
+
+
+def detect_ptt(reports):
+    """ptt_key（Mode A）のレポート列からジェスチャーを取り出す（ENTER / ESC / 修飾キー）"""
+    return bounce_bench.detect(reports)
+
+
+# アプリごとの判定方法と調整対象のしきい値（候補の既定値）
+# auto_keysend の短押しは HID レポートを出さないため対象外
+APPS = {
+    "ptt_key": {
+        "detect": detect_ptt,
+        "gestures": ("single", "double", "long"),
+        "params": {
+            "LONG_PRESS_TIME": (0.25, 0.3, 0.35, 0.4, 0.5),
+            "DOUBLE_CLICK_TIME": (0.2, 0.25, 0.3, 0.35),
+            "MIN_PRESS_TIME": (0.02, 0.03, 0.05),
+        },
+    },
+    "meeting_controller": {
+        "detect": detect_meeting,
+        "gestures": ("single", "long"),
+        "params": {
+            "LONG_PRESS_TIME": (0.2, 0.25, 0.3, 0.35, 0.4, 0.5, 0.6),
+        },
+    },
+}
+
+
+def parse_labelled(lines):
+    """ラベル付きトレースを [(ラベル, [(秒, ボタン, モード), ...]), ...] に変換"""
+    samples = []
+    label = None
+    block = None
+    for line in lines:
+        text = line.strip()
+        if text.startswith(LABEL_PREFIX):
+            label = text[len(LABEL_PREFIX):].strip()
+            continue
+        if text == cuskey_trace.TRACE_HEADER:
+            block = [text]
+            continue
+        if block is None:
+            continue
+        block.append(text)
+        if text == cuskey_trace.TRACE_FOOTER:
+            if label:
+                samples.append((label, cuskey_trace.parse_trace(block)))
+            label = None
+            block = None
+    return samples
+
+
+def load_samples(paths):
+    samples = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            samples += parse_labelled(f)
+    return samples
+
+
+def synthetic_samples(count, seed):
+    """動作確認用の合成サンプル（押し方の個人差を bounce_bench のモデルで再現）"""
+    rng = random.Random(seed)
+    profile = bounce_bench.PROFILES["typical"]
+    samples = []
+    for gesture in ("single", "double", "long"):
+        for _ in range(count):
+            events = [(0.0, True, False)]
+            for down, up in bounce_bench.gesture_presses(gesture, rng):
+                for t, level in bounce_bench.bounce_edges(0.1 + down, False, profile, rng):
+                    events.append((t, level, False))
+                for t, level in bounce_bench.bounce_edges(0.1 + up, True, profile, rng):
+                    events.append((t, level, False))
+            events.sort(key=lambda e: e[0])
+            samples.append((gesture, events))
+    return samples
+
+
+def normalize(events):
+    """サンプルを最初の押下を 0 秒とするボタン変化 [(秒, ボタン)] にする（押したまま終わるものは None）"""
+    first = next((t for t, button, _ in events if not button), None)
+    if first is None or not events[-1][1]:
+        return None
+    return [(t - first, button) for t, button, _ in events if t >= first]
+
+
+def build_trace(samples, slot):
+    """サンプルを 1 本のトレース（Mode A 固定）に並べ、期待値を返す"""
+    events = [(0.0, True, False)]
+    expected = []  # (スロット開始, スロット終了, ジェスチャー, 基準時刻)
+    for index, (gesture, edges) in enumerate(samples):
+        slot_start = SLOT_OFFSET + index * slot
+        for t, button in edges:
+            events.append((slot_start + t, button, False))
+        # 遅延の基準: 長押しは押した時刻、それ以外は最後に離した時刻
+        if gesture == "long":
+            reference = slot_start
+        else:
+            reference = slot_start + max(t for t, button in edges if button)
+        expected.append((slot_start, slot_start + slot, gesture, reference))
+    return events, expected
+
+
+def evaluate(app, overrides, events, expected, gestures, slot):
+    """1 つの設定でトレースを再生し、ジェスチャーごとの誤判定数と遅延を集計"""
+    reports = cuskey_sim.Simulator(overrides=overrides).run(app, events, tail=slot)
+    detected = APPS[app]["detect"](reports)
+    errors = {g: 0 for g in gestures}
+    latency = {g: [] for g in gestures}
+    for slot_start, slot_end, gesture, reference in expected:
+        found = [d for d in detected if slot_start <= d[0] < slot_end]
+        if len(found) != 1 or found[0][1] != gesture:
+            errors[gesture] += 1
+        else:
+            latency[gesture].append(found[0][0] - reference)
+    return errors, latency
+
+
+def mean(values):
+    return sum(values) / len(values) if values else float("nan")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ラベル付きトレースからジェスチャー判定しきい値を調整")
+    parser.add_argument("traces", nargs="*", help="ラベル付きトレースファイル")
+    parser.add_argument("--app", default="ptt_key", choices=sorted(APPS))
+    parser.add_argument("--synthetic", type=int, metavar="N", help="ジェスチャーごとに N 件の合成サンプルを使う")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--long-press", type=float, nargs="+", help="LONG_PRESS_TIME の候補")
+    parser.add_argument("--double-click", type=float, nargs="+", help="DOUBLE_CLICK_TIME の候補")
+    parser.add_argument("--min-press", type=float, nargs="+", help="MIN_PRESS_TIME の候補")
+    parser.add_argument("--top", type=int, default=15, help="表示する候補の数")
+    args = parser.parse_args(argv)
+
+    spec = APPS[args.app]
+    gestures = spec["gestures"]
+    if args.synthetic:
+        raw = synthetic_samples(args.synthetic, args.seed)
+    else:
+        raw = load_samples(args.traces)
+
+    samples = []
+    skipped = {}
+    for label, events in raw:
+        edges = normalize(events) if label in gestures else None
+        if edges is None:
+            skipped[label] = skipped.get(label, 0) + 1
+            continue
+        samples.append((label, edges))
+    for label, count in skipped.items():
+        print(f"[WARN] {label} のトレース {count} 件を除外（{args.app} で扱えないラベル、"
+              "または押下がない・押したまま終わるトレース）", file=sys.stderr)
+    if not samples:
+        print("ラベル付きトレースがありません", file=sys.stderr)
+        return 1
+
+    # 候補（コマンドライン指定があれば置き換え）
+    params = dict(spec["params"])
+    for name, values in (("LONG_PRESS_TIME", args.long_press), ("DOUBLE_CLICK_TIME", args.double_click),
+                         ("MIN_PRESS_TIME", args.min_press)):
+        if values and name in params:
+            params[name] = tuple(values)
+    names = sorted(params)
+
+    # スロット長: 最長のサンプル + 最大のしきい値 + 余裕
+    span = max(edges[-1][0] for _, edges in samples)
+    slot = span + max(max(v) for v in params.values()) + SLOT_MARGIN
+    events, expected = build_trace(samples, slot)
+
+    counts = {g: sum(1 for label, _ in samples if label == g) for g in gestures}
+    print(f"アプリ: {args.app} / サンプル: " + ", ".join(f"{g} {counts[g]}件" for g in gestures))
+    print()
+
+    rows = []
+    for values in itertools.product(*(params[name] for name in names)):
+        overrides = dict(zip(names, values))
+        errors, latency = evaluate(args.app, overrides, events, expected, gestures, slot)
+        total_errors = sum(errors.values())
+        # 平均遅延はサンプル数で重み付け（よく使うジェスチャーほど効く）
+        all_latency = [v for g in gestures for v in latency[g]]
+        rows.append((total_errors, mean(all_latency), overrides, errors, latency))
+
+    # 同点なら MIN_PRESS_TIME が大きい方（チャタリングに強い）を優先
+    rows.sort(key=lambda r: (r[0], round(r[1], 4), -r[2].get("MIN_PRESS_TIME", 0)))
+
+    # パレート最適（誤判定も遅延も他の候補に負けない）に印を付ける
+    pareto = []
+    best_latency = float("inf")
+    for row in sorted(rows, key=lambda r: (r[0], r[1])):
+        if row[1] < best_latency:
+            pareto.append(row)
+            best_latency = row[1]
+
+    header = " ".join(f"{name:>17}" for name in names)
+    columns = " ".join(f"{g + ' 誤/遅延ms':>14}" for g in gestures)
+    print(f"  {header} | {'誤判定':>4} {'平均遅延':>6} | {columns}")
+    for row in rows[:args.top]:
+        total_errors, average, overrides, errors, latency = row
+        mark = "*" if row in pareto else " "
+        cells = " ".join(f"{overrides[name]:17.3f}" for name in names)
+        per_gesture = " ".join(f"{errors[g]:6d} / {mean(latency[g]) * 1000:5.0f}" for g in gestures)
+        print(f"{mark} {cells} | {total_errors:6d} {average * 1000:8.0f} | {per_gesture}")
+    print("（* はパレート最適: 誤判定を減らすにはこれ以上の遅延が必要）")
+
+    best = rows[0]
+    print()
+    if best[0]:
+        print(f"※ すべての候補で誤判定が残りました（最小 {best[0]} 件）。候補を広げるかラベルを見直してください")
+    print("# 推奨設定（誤判定が最も少なく、その中で平均遅延が最小）: cuskey_settings.py に貼り付け")
+    print("APP_SETTINGS = {")
+    print(f'    "{args.app}": {{')
+    for name in names:
+        print(f'        "{name}": {best[2][name]},')
+    print("    },")
+    print("}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
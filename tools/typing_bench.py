@@ -0,0 +1,226 @@
+"""
+文字列入力（cuskey_macro）のスループットベンチマーク
+入力速度（文字/秒）を変えながらテスト文字列を送り、ホストが取りこぼさずに受け取れる上限を調べる
+
+シミュレーター（既定）:
+    仮想時刻の pin_sender にテスト文字列を送らせ、ホストが USB のポーリング間隔ごとに
+    1 レポートずつ受け取るモデルで文字列に戻して、抜けた文字数・実際の入力速度・
+    send_report の待ちでメインループが止まる時間を数える
+    デバイス側の上限（ループ間隔・フレームのペース配分）の確認用
+
+実機（--listen）:
+    ホスト側でこのツールを起動したままデバイスから文字列を入力させ、
+    受け取った文字と時刻から抜けた文字数と実際の入力速度を測る（ホストの OS・アプリを含めた上限）
+    1. 表示される APP_SETTINGS を cuskey_settings.py に貼り付け、DIGIT_INTERVAL を 1 / 入力速度 にする
+    2. このターミナルにフォーカスを置いたままボタンを押す（Enter で 1 回分の計測が終わる）
+    3. DIGIT_INTERVAL を変えて繰り返し、q で終了すると一覧を表示
+
+使い方:
+    python tools/typing_bench.py
+    python tools/typing_bench.py --rates 20 40 60 80 --set HID_FRAME_INTERVAL=0
+    python tools/typing_bench.py --listen --layout jis
+"""
+
+import argparse
+import difflib
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import cuskey_sim  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import cuskey_macro  # noqa: E402
+
+# 英字・数字・Shift が必要な記号を一通り含むテスト文字列（US・JIS の両方で入力できる文字のみ）
+TEST_TEXT = "The quick brown fox jumps over the lazy dog. 0123456789 !#$%&()-=[];,./ ABCxyz"
+
+# 計測開始（ボタンを押す）時刻と、最後の文字の後に待つ秒数
+PRESS_TIME = 0.2
+TAIL = 1.0
+
+DEFAULT_RATES = (10, 20, 30, 40, 50, 60, 80, 100)
+
+
+def reverse_layout(layout):
+    """配列表から (修飾キー, キーコード) → 文字 の対応を作る"""
+    table = {}
+    for code in range(128):
+        keycode = layout.KEYMAP[code * 2 + 1]
+        if keycode:
+            table.setdefault((layout.KEYMAP[code * 2], keycode), chr(code))
+    for code, keys in layout.EXTRA.items():
+        table.setdefault(keys, chr(code))
+    return table
+
+
+def host_receive(reports, poll_interval):
+    """ホストのポーリングを再現: エンドポイントはポーリングごとに 1 レポートずつ渡す
+
+    実機の send_report は前のレポートが受け取られるまで待つ（ブロックする）ので、レポートは失われない代わりに
+    ポーリングより速く送るとデバイスのメインループが止まる。[(受信時刻, レポート)] と止まった最大時間を返す
+    """
+    received = []
+    last_poll = None
+    max_block = 0.0
+    for t, device, report in reports:
+        if device != "keyboard":
+            continue
+        if last_poll is None:
+            poll = t
+        else:
+            # 送信後の最初のポーリング（前のレポートを渡したポーリングより後）
+            poll = max(last_poll + poll_interval, last_poll + poll_interval * math.ceil((t - last_poll) / poll_interval))
+        max_block = max(max_block, poll - t - poll_interval)
+        received.append((poll, report))
+        last_poll = poll
+    return received, max_block
+
+
+def decode(received, table):
+    """受け取ったレポート列を [(時刻, 文字)] にする（新しく押されたキーを 1 文字とする）"""
+    chars = []
+    previous = bytes(8)
+    for t, report in received:
+        modifier = 0xE1 if report[0] & 0x22 else 0
+        for keycode in report[2:]:
+            if keycode and keycode not in previous[2:]:
+                char = table.get((modifier, keycode))
+                if char is not None:
+                    chars.append((t, char))
+        previous = report
+    return chars
+
+
+def score(expected, chars):
+    """(一致した文字数, 抜けた文字数, 余分な文字数, 実際の入力速度 文字/秒)"""
+    text = "".join(c for _, c in chars)
+    matched = sum(block.size for block in difflib.SequenceMatcher(None, expected, text).get_matching_blocks())
+    if len(chars) > 1:
+        rate = (len(chars) - 1) / (chars[-1][0] - chars[0][0])
+    else:
+        rate = 0.0
+    return matched, len(expected) - matched, len(text) - matched, rate
+
+
+def simulate(rate, text, layout_name, poll_interval, common):
+    """pin_sender に text を rate 文字/秒で入力させ、ホストが受け取った [(時刻, 文字)] と
+    send_report でメインループが止まる最大時間を返す"""
+    overrides = dict(common, PIN_MODE_A=text, PRE_SEND_ESCAPE=False, POST_SEND_ENTER=False,
+                     DIGIT_INTERVAL=1.0 / rate, KEYBOARD_LAYOUT=layout_name)
+    # Mode A（モードのピンが Low）で 1 回押す
+    events = [(0.0, True, False), (PRESS_TIME, False, False), (PRESS_TIME + 0.1, True, False)]
+    until = PRESS_TIME + len(text) / rate + len(text) * 0.1 + TAIL
+    sim = cuskey_sim.Simulator(overrides=overrides)
+    reports = sim.run("pin_sender", events, until=until)
+    received, max_block = host_receive(reports, poll_interval)
+    return decode(received, reverse_layout(cuskey_macro.load_layout(layout_name))), max_block
+
+
+def run_simulation(args, common):
+    print(f"シミュレーター / 配列: {args.layout} / ホストのポーリング間隔: {args.poll_ms}ms / "
+          f"テスト文字列: {len(args.text)}文字")
+    print(f"{'設定(文字/秒)':>12} | {'実測(文字/秒)':>12} {'一致':>5} {'抜け':>5} {'余分':>5} | {'ループ停止(ms)':>12}")
+    best = None
+    for rate in args.rates:
+        chars, max_block = simulate(rate, args.text, args.layout, args.poll_ms / 1000, common)
+        matched, dropped, extra, measured = score(args.text, chars)
+        print(f"{rate:12.0f} | {measured:12.1f} {matched:5d} {dropped:5d} {extra:5d} | {max_block * 1000:12.1f}")
+        # 設定した速度に届かない（送信が追いつかない）もの、send_report の待ちが
+        # 1 ポーリングを超えてメインループが止まるものは持続できないとみなす
+        sustained = measured >= rate * 0.95 and max_block <= args.poll_ms / 1000 + 1e-6
+        if not dropped and not extra and sustained and (best is None or measured > best):
+            best = measured
+    print()
+    if best is None:
+        print("持続できた速度がありません")
+    else:
+        print(f"デバイス側で持続できた最高速度: {best:.1f} 文字/秒"
+              "（ホスト側の取りこぼしは --listen で実機を測る）")
+    return 0
+
+
+def read_line_timed():
+    """端末から 1 行を 1 文字ずつ読み、[(時刻, 文字)] を返す（Enter で終了、q だけなら None）"""
+    import termios
+    import tty
+    fd = sys.stdin.fileno()
+    saved = termios.tcgetattr(fd)
+    chars = []
+    try:
+        tty.setcbreak(fd)
+        while True:
+            char = sys.stdin.read(1)
+            if char in ("\n", "\r"):
+                break
+            if char == "q" and not chars:
+                return None
+            chars.append((time.monotonic(), char))
+            sys.stdout.write(char)
+            sys.stdout.flush()
+    finally:
+        termios.tcsetattr(fd, termios.TCSADRAIN, saved)
+    print()
+    return chars
+
+
+def run_listen(args):
+    print("cuskey_settings.py に次の設定を貼り付け、DIGIT_INTERVAL を 1 / 入力速度 にしてください")
+    print('APP_SETTINGS = {')
+    print('    "pin_sender": {')
+    print(f'        "PIN_MODE_A": {args.text!r},')
+    print('        "PRE_SEND_ESCAPE": False,')
+    print('        "POST_SEND_ENTER": True,')
+    print('        "DIGIT_INTERVAL": 0.05,')
+    print('    },')
+    print('}')
+    print(f'KEYBOARD_LAYOUT = "{args.layout}"')
+    print()
+    results = []
+    while True:
+        print("ボタンを押して入力させてください（q で終了）: ")
+        chars = read_line_timed()
+        if chars is None:
+            break
+        matched, dropped, extra, measured = score(args.text, chars)
+        print(f"  実測 {measured:.1f} 文字/秒 / 一致 {matched} / 抜け {dropped} / 余分 {extra}")
+        results.append((measured, dropped, extra))
+
+    if not results:
+        return 0
+    print()
+    print(f"{'実測(文字/秒)':>12} {'抜け':>5} {'余分':>5}")
+    for measured, dropped, extra in sorted(results):
+        print(f"{measured:12.1f} {dropped:5d} {extra:5d}")
+    clean = [measured for measured, dropped, extra in results if not dropped and not extra]
+    if clean:
+        print(f"取りこぼしなしで入力できた最高速度: {max(clean):.1f} 文字/秒"
+              "（cuskey_settings.TYPING_RATE はこれより少し低めに）")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="文字列入力のスループット（取りこぼしなしの最高速度）を測る")
+    parser.add_argument("--listen", action="store_true", help="実機の入力をこの端末で受け取って測る")
+    parser.add_argument("--layout", default="us", choices=("us", "jis"), help="キーボード配列")
+    parser.add_argument("--rates", type=float, nargs="+", default=DEFAULT_RATES, help="試す入力速度（文字/秒）")
+    parser.add_argument("--poll-ms", type=float, default=8.0, help="ホストのポーリング間隔（ミリ秒）")
+    parser.add_argument("--text", default=TEST_TEXT, help="テスト文字列")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="設定値の上書き（例: --set HID_FRAME_INTERVAL=0）")
+    args = parser.parse_args(argv)
+
+    if args.listen:
+        return run_listen(args)
+
+    try:
+        common = cuskey_sim.parse_overrides(args.set)
+    except ValueError as e:
+        parser.error(str(e))
+    return run_simulation(args, common)
+
+
+if __name__ == "__main__":
+    sys.exit(main())